@@ -0,0 +1,75 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the event throughput of the EventSubTranslator for different numbers of
+event workers, with the core replaced by a stand-in that simulates I/O latency.
+Registration and staging requests are consumed in alternation.
+"""
+
+import asyncio
+import time
+
+from tests.fixtures.fake_registry import (
+    EVENT_SUB_CONFIG,
+    FakeFileRegistry,
+    files_to_register_payload,
+    files_to_stage_payload,
+)
+
+from ifrs.adapters.inbound.event_sub import EventSubTranslator
+
+EVENTS = 2000
+DISTINCT_FILES = 500
+LATENCY = 0.005  # seconds per simulated core call
+WORKERS = (1, 8, 64)
+
+
+async def measure(workers: int) -> float:
+    """Consume the benchmark events with the given number of workers and return the
+    achieved throughput in events per second.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(
+        update={"event_workers": workers, "max_events_in_flight": max(64, workers)}
+    )
+    file_registry = FakeFileRegistry(latency=LATENCY)
+    # alternate between registration and staging requests:
+    events = [
+        (files_to_register_payload(file_id), config.files_to_register_type)
+        if index % 2
+        else (files_to_stage_payload(file_id), config.files_to_stage_type)
+        for index, file_id in (
+            (index, f"file{index % DISTINCT_FILES:05}") for index in range(EVENTS)
+        )
+    ]
+
+    start = time.perf_counter()
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for payload, type_ in events:
+            await translator.consume(payload=payload, type_=type_, topic="benchmark")
+    return EVENTS / (time.perf_counter() - start)
+
+
+async def main():
+    """Run the benchmark for all worker counts and print the results."""
+    print(f"{EVENTS} events, {DISTINCT_FILES} files, {LATENCY * 1000:.0f} ms latency")
+    for workers in WORKERS:
+        throughput = await measure(workers)
+        print(f"{workers:>3} workers: {throughput:>8.1f} events/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
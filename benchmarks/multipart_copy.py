@@ -0,0 +1,106 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Compares the duration of copying an object with a single request and in parallel
+parts of different concurrency. The object storage is replaced by an in-memory
+stand-in that simulates a fixed latency per request and a limited bandwidth per copy
+request, as is typical for server-side copies in S3.
+"""
+
+import asyncio
+import os
+import time
+
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import (
+    PERMANENT_BUCKET,
+    STAGING_BUCKET,
+    InMemoryMultipartObjectStorage,
+)
+
+from ifrs.core.multipart_copy import MultipartCopier, MultipartCopyConfig
+
+MiB = 1024**2
+OBJECT_SIZES = (64 * MiB, 256 * MiB)
+CONCURRENCIES = (1, 4, 16)
+PART_SIZE = 16 * MiB
+ENCRYPTED_PART_SIZE = 64 * 1024 + 28  # a crypt4gh segment including its overhead
+CONTENT_OFFSET = 124  # size of the crypt4gh envelope
+LATENCY = 0.02  # seconds per request
+BANDWIDTH = 256 * MiB  # bytes per second and copy request
+
+
+async def measure(content: bytes, concurrency: int) -> float:
+    """Copy the content and return the duration in seconds. A concurrency of 0 means
+    that a single copy request is used.
+    """
+    storage = InMemoryMultipartObjectStorage(latency=LATENCY, bandwidth=BANDWIDTH)
+    storage.buckets = {STAGING_BUCKET: {"source": content}, PERMANENT_BUCKET: {}}
+    copier = MultipartCopier(
+        config=MultipartCopyConfig(
+            multipart_copy_threshold=PART_SIZE if concurrency else len(content),
+            multipart_copy_part_size=PART_SIZE,
+            multipart_copy_concurrency_per_object=max(concurrency, 1),
+        )
+    )
+    file = EXAMPLE_METADATA_BASE.model_copy(
+        update={
+            "decrypted_size": len(content) - CONTENT_OFFSET,
+            "content_offset": CONTENT_OFFSET,
+            "encrypted_part_size": ENCRYPTED_PART_SIZE,
+        }
+    )
+
+    start = time.perf_counter()
+    await copier.copy_object(
+        file=file,
+        object_storage=storage,
+        source_bucket_id=STAGING_BUCKET,
+        source_object_id="source",
+        dest_bucket_id=PERMANENT_BUCKET,
+        dest_object_id="dest",
+    )
+    duration = time.perf_counter() - start
+
+    if storage.buckets[PERMANENT_BUCKET]["dest"] != content:
+        raise RuntimeError("The copy must be identical to the source.")
+    return duration
+
+
+async def main():
+    """Run the benchmark for all object sizes and concurrencies and print the
+    results.
+    """
+    print(
+        f"{LATENCY * 1000:.0f} ms latency per request,"
+        + f" {BANDWIDTH // MiB} MiB/s per copy request,"
+        + f" {PART_SIZE // MiB} MiB parts"
+    )
+    headers = "".join(f"{f'{c} parallel [s]':>16}" for c in CONCURRENCIES)
+    print(f"{'size [MiB]':>10} {'single [s]':>12}{headers}")
+    for size in OBJECT_SIZES:
+        content = os.urandom(size)
+        single = await measure(content, concurrency=0)
+        parallel = [
+            await measure(content, concurrency=concurrency)
+            for concurrency in CONCURRENCIES
+        ]
+        timings = "".join(f"{duration:>16.2f}" for duration in parallel)
+        print(f"{size // MiB:>10} {single:>12.2f}{timings}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Compares the CPU time needed to translate a files_to_register payload into a
+registration request for the core when validating it twice (first against the event
+schema and then again as core model) and when validating it in a single pass.
+"""
+
+import hashlib
+import timeit
+from typing import Callable
+
+from ghga_event_schemas import pydantic_ as event_schemas
+from ghga_event_schemas.validation import get_validated_payload
+from hexkit.custom_types import JsonObject
+from tests.fixtures.fake_registry import files_to_register_payload
+
+from ifrs.adapters.inbound.event_sub import EventSubTranslator
+from ifrs.core import models
+
+PART_COUNTS = (10, 1_000, 100_000)
+TOTAL_PARTS = 1_000_000  # per measurement, to get comparable timings
+
+
+def payload_with_parts(parts: int) -> JsonObject:
+    """Get a files_to_register payload with the given number of part checksums."""
+    payload = files_to_register_payload("examplefile001")
+    payload["encrypted_parts_md5"] = [
+        hashlib.md5(str(index).encode(), usedforsecurity=False).hexdigest()
+        for index in range(parts)
+    ]
+    payload["encrypted_parts_sha256"] = [
+        hashlib.sha256(str(index).encode()).hexdigest() for index in range(parts)
+    ]
+    return payload
+
+
+def validate_twice(payload: JsonObject) -> models.FileRegistrationRequest:
+    """Translate the payload by validating against the event schema and then
+    copying the fields into the core model.
+    """
+    validated_payload = get_validated_payload(
+        payload=payload, schema=event_schemas.FileUploadValidationSuccess
+    )
+    file_without_object_id = models.FileMetadataBase(
+        file_id=validated_payload.file_id,
+        decrypted_sha256=validated_payload.decrypted_sha256,
+        decrypted_size=validated_payload.decrypted_size,
+        upload_date=validated_payload.upload_date,
+        decryption_secret_id=validated_payload.decryption_secret_id,
+        encrypted_part_size=validated_payload.encrypted_part_size,
+        encrypted_parts_md5=validated_payload.encrypted_parts_md5,
+        encrypted_parts_sha256=validated_payload.encrypted_parts_sha256,
+        content_offset=validated_payload.content_offset,
+        storage_alias=validated_payload.s3_endpoint_alias,
+    )
+    return models.FileRegistrationRequest(
+        file_without_object_id=file_without_object_id,
+        staging_object_id=validated_payload.object_id,
+        staging_bucket_id=validated_payload.bucket_id,
+    )
+
+
+def validate_once(payload: JsonObject) -> models.FileRegistrationRequest:
+    """Translate the payload in a single validation pass as done by the translator."""
+    return EventSubTranslator._get_registration_request(payload=payload)
+
+
+def time_translation(
+    translate: Callable[[JsonObject], models.FileRegistrationRequest],
+    payload: JsonObject,
+    repetitions: int,
+) -> float:
+    """Get the best time in microseconds needed for translating the payload once."""
+    best = min(timeit.repeat(lambda: translate(payload), number=repetitions, repeat=5))
+    return best / repetitions * 1e6
+
+
+def main():
+    """Run the benchmark for all part counts and print the results."""
+    print(f"{'parts':>8} {'twice [µs]':>12} {'once [µs]':>12} {'saved':>7}")
+    for parts in PART_COUNTS:
+        payload = payload_with_parts(parts)
+        if validate_once(payload) != validate_twice(payload):
+            raise RuntimeError("Both translations must yield the same request.")
+
+        repetitions = max(1, TOTAL_PARTS // parts)
+        timings = [
+            time_translation(translate, payload, repetitions)
+            for translate in (validate_twice, validate_once)
+        ]
+        saved = 1 - timings[1] / timings[0]
+        print(f"{parts:>8} {timings[0]:>12.1f} {timings[1]:>12.1f} {saved:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Compares the latency of `FileRegistry.register_file` when the database lookup and
+the check of the staging bucket are awaited one after the other and when they are
+awaited concurrently. The database and the storage are replaced by in-memory
+stand-ins with a fixed latency plus an exponentially distributed jitter per call.
+"""
+
+import asyncio
+import statistics
+import time
+
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import STAGING_BUCKET, InMemoryCore
+
+from ifrs.core import models
+from ifrs.core.file_registry import FileRegistry
+
+REGISTRATIONS = 500
+CONCURRENCY = 16
+DB_LATENCY = 0.002  # seconds per database call
+STORAGE_LATENCY = 0.004  # seconds per storage call
+JITTER = 0.002  # mean extra seconds per call
+
+
+class SequentialFileRegistry(FileRegistry):
+    """The file registry with the lookups of `register_file` awaited in sequence."""
+
+    async def register_file(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+    ) -> None:
+        """Register a file, checking the staging bucket after the database lookup."""
+        permanent_bucket_id, _ = self._get_permanent_storage(
+            file_without_object_id.storage_alias
+        )
+        if await self._is_file_registered(
+            file_without_object_id=file_without_object_id
+        ):
+            return
+        if not await self._is_in_staging(
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            storage_alias=file_without_object_id.storage_alias,
+        ):
+            raise self._content_not_in_staging(file_id=file_without_object_id.file_id)
+
+        file = await self._copy_to_permanent_storage(
+            file_without_object_id=file_without_object_id,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            permanent_bucket_id=permanent_bucket_id,
+        )
+        await self._file_metadata_dao.insert(file)
+        await self._event_publisher.file_internally_registered(
+            file=file, bucket_id=permanent_bucket_id
+        )
+
+
+async def measure(sequential: bool) -> list[float]:
+    """Register files with the given variant of the registry and return the latency
+    of each registration in milliseconds.
+    """
+    core = InMemoryCore(
+        db_latency=DB_LATENCY, storage_latency=STORAGE_LATENCY, jitter=JITTER
+    )
+    if sequential:
+        core.file_registry.__class__ = SequentialFileRegistry
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    for index in range(REGISTRATIONS):
+        storage.put_object(
+            bucket_id=STAGING_BUCKET, object_id=f"object{index}", content=b"content"
+        )
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: list[float] = []
+
+    async def register(index: int) -> None:
+        file = EXAMPLE_METADATA_BASE.model_copy(update={"file_id": f"file{index}"})
+        async with semaphore:
+            start = time.perf_counter()
+            await core.file_registry.register_file(
+                file_without_object_id=file,
+                staging_object_id=f"object{index}",
+                staging_bucket_id=STAGING_BUCKET,
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(register(index) for index in range(REGISTRATIONS)))
+    return latencies
+
+
+def percentile(latencies: list[float], percent: int) -> float:
+    """Get the given percentile of the latencies."""
+    return statistics.quantiles(latencies, n=100)[percent - 1]
+
+
+async def main():
+    """Run the benchmark for both variants and print the results."""
+    print(
+        f"{REGISTRATIONS} registrations, {CONCURRENCY} concurrent,"
+        + f" {DB_LATENCY * 1000:.0f} ms database and"
+        + f" {STORAGE_LATENCY * 1000:.0f} ms storage latency,"
+        + f" {JITTER * 1000:.0f} ms mean jitter"
+    )
+    print(f"{'lookups':>10} {'p50 [ms]':>10} {'p99 [ms]':>10}")
+    for name, sequential in (("sequential", True), ("concurrent", False)):
+        latencies = await measure(sequential)
+        print(
+            f"{name:>10} {percentile(latencies, 50):>10.1f}"
+            + f" {percentile(latencies, 99):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
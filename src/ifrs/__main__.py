@@ -15,15 +15,187 @@
 
 """Entrypoint of the package"""
 
+import argparse
 import asyncio
+import sys
+from collections.abc import Iterable
+from typing import Optional
 
-from ifrs.main import consume_events
+from ifrs.main import (
+    consume_events,
+    register_files,
+    replay_dead_letters,
+    stage_file_range,
+    store_missing_fingerprints,
+)
+from ifrs.ports.inbound.file_registry import FileRegistryPort
 
 
 def run_forever():
-    """Main entrypoint for setup.cfg"""
+    """Consume events forever."""
     asyncio.run(consume_events(run_forever=True))
 
 
+def get_parser() -> argparse.ArgumentParser:
+    """Get the parser for the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="ifrs", description="The Internal File Registry Service."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("consume", help="Consume events forever (the default).")
+
+    replay = subparsers.add_parser(
+        "replay-dead-letters",
+        help="Replay the events of the dead-letter topic through the regular"
+        + " processing until the topic is drained.",
+    )
+    replay.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="The maximum number of events replayed concurrently.",
+    )
+    replay.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="The maximum number of events replayed per second. Unlimited if omitted.",
+    )
+    replay.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=10,
+        help="Stop after no further event arrived for this many seconds.",
+    )
+
+    register = subparsers.add_parser(
+        "register-files",
+        help="Register the files of registration requests given as one JSON object"
+        + " per line, with the fields file_without_object_id, staging_object_id and"
+        + " staging_bucket_id. The outcome per request is printed as one JSON object"
+        + " per line.",
+    )
+    register.add_argument(
+        "path",
+        help="The file containing the registration requests or '-' for stdin.",
+    )
+    register.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="The maximum number of files registered with a single bulk registration.",
+    )
+
+    stage_range = subparsers.add_parser(
+        "stage-range",
+        help="Stage an inclusive byte range of the decrypted content of a registered"
+        + " file to the outbox. The staged ranges of the decrypted and encrypted"
+        + " content are printed as JSON object.",
+    )
+    stage_range.add_argument("file_id", help="The ID of the file.")
+    stage_range.add_argument(
+        "decrypted_sha256", help="The checksum of the decrypted content of the file."
+    )
+    stage_range.add_argument(
+        "--outbox-bucket-id", required=True, help="The S3 bucket ID for the outbox."
+    )
+    stage_range.add_argument(
+        "--outbox-object-id",
+        required=True,
+        help="The S3 object ID for the staged range in the outbox bucket.",
+    )
+    stage_range.add_argument(
+        "--first-byte",
+        type=int,
+        required=True,
+        help="The first byte of the requested decrypted content.",
+    )
+    stage_range.add_argument(
+        "--last-byte",
+        type=int,
+        required=True,
+        help="The last byte of the requested decrypted content.",
+    )
+
+    subparsers.add_parser(
+        "backfill-fingerprints",
+        help="Store the metadata fingerprints of files registered by earlier versions"
+        + " of the service. Can be run while the service is running.",
+    )
+    return parser
+
+
+async def print_registration_outcomes(*, lines: Iterable[str], batch_size: int) -> bool:
+    """Register the files of the given requests, print the outcomes of each batch as
+    soon as it has been processed, and return whether all files are registered.
+    """
+    all_registered = True
+    async for outcomes in register_files(lines=lines, batch_size=batch_size):
+        for outcome in outcomes:
+            print(outcome.model_dump_json())
+            all_registered &= outcome.outcome in ("registered", "already_registered")
+        sys.stdout.flush()
+    return all_registered
+
+
+def run_registration(*, path: str, batch_size: int) -> bool:
+    """Register the files of the requests in the given file, print the outcomes, and
+    return whether all files are registered.
+    """
+    if path == "-":
+        return asyncio.run(
+            print_registration_outcomes(lines=sys.stdin, batch_size=batch_size)
+        )
+    with open(path, encoding="utf-8") as lines:
+        return asyncio.run(
+            print_registration_outcomes(lines=lines, batch_size=batch_size)
+        )
+
+
+def run_range_staging(arguments: argparse.Namespace) -> bool:
+    """Stage the requested range of a file, print the staged ranges, and return
+    whether the range has been staged. Invalid requests are printed to stderr.
+    """
+    try:
+        staged_range = asyncio.run(
+            stage_file_range(
+                file_id=arguments.file_id,
+                decrypted_sha256=arguments.decrypted_sha256,
+                outbox_object_id=arguments.outbox_object_id,
+                outbox_bucket_id=arguments.outbox_bucket_id,
+                first_byte=arguments.first_byte,
+                last_byte=arguments.last_byte,
+            )
+        )
+    except FileRegistryPort.InvalidRequestError as error:
+        print(error, file=sys.stderr)
+        return False
+    print(staged_range.model_dump_json())
+    return True
+
+
+def cli(args: Optional[list[str]] = None):
+    """Main entrypoint for setup.cfg"""
+    arguments = get_parser().parse_args(args)
+    if arguments.command == "replay-dead-letters":
+        asyncio.run(
+            replay_dead_letters(
+                concurrency=arguments.concurrency,
+                rate=arguments.rate,
+                idle_timeout=arguments.idle_timeout,
+            )
+        )
+    elif arguments.command == "register-files":
+        if not run_registration(path=arguments.path, batch_size=arguments.batch_size):
+            sys.exit(1)
+    elif arguments.command == "stage-range":
+        if not run_range_staging(arguments):
+            sys.exit(1)
+    elif arguments.command == "backfill-fingerprints":
+        asyncio.run(store_missing_fingerprints())
+    else:
+        run_forever()
+
+
 if __name__ == "__main__":
-    run_forever()
+    cli()
@@ -0,0 +1,117 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Acknowledgement of consumed events whose processing completes after the consumer
+has moved on to later events, so that their offsets are not committed before they
+have been processed.
+"""
+
+from collections import defaultdict, deque
+from collections.abc import Hashable, Iterable
+from contextvars import ContextVar
+from typing import Callable, Generic, Optional, TypeVar
+
+Acknowledge = Callable[[], None]
+
+Partition = TypeVar("Partition", bound=Hashable)
+
+
+class Delivery:
+    """A consumed event that counts as acknowledged once all holds on it have been
+    released. The consumer holds the event until it has been passed on to the
+    translator.
+    """
+
+    def __init__(self, *, offset: int):
+        """Initialize with the offset of the event within its partition."""
+        self.offset = offset
+        self._holds = 0
+        self.release = self.hold()
+
+    @property
+    def acknowledged(self) -> bool:
+        """Whether all holds on the event have been released."""
+        return self._holds == 0
+
+    def hold(self) -> Acknowledge:
+        """Hold back the acknowledgement of the event until the returned callback is
+        called. Calling the callback more than once has no further effect.
+        """
+        self._holds += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._holds -= 1
+
+        return release
+
+
+current_delivery: ContextVar[Optional[Delivery]] = ContextVar(
+    "current_delivery", default=None
+)
+
+
+def defer_acknowledgement() -> Acknowledge:
+    """Hold back the acknowledgement of the event currently being consumed until the
+    returned callback is called, e.g. once the event has been processed in the
+    background. If the consumer does not track acknowledgements, the callback has no
+    effect.
+    """
+    delivery = current_delivery.get()
+    if delivery is None:
+        return lambda: None
+    return delivery.hold()
+
+
+class DeliveryTracker(Generic[Partition]):
+    """Keeps track of the consumed events per partition to determine the offsets up
+    to which all events have been acknowledged and may thus be committed.
+    """
+
+    def __init__(self):
+        """Initialize without any tracked events."""
+        self._deliveries: defaultdict[Partition, deque[Delivery]] = defaultdict(deque)
+
+    def start(self, *, partition: Partition, offset: int) -> Delivery:
+        """Track an event that has just been consumed and make it the current one in
+        the context of the consumer.
+        """
+        delivery = Delivery(offset=offset)
+        self._deliveries[partition].append(delivery)
+        current_delivery.set(delivery)
+        return delivery
+
+    def retain(self, partitions: Iterable[Partition]) -> None:
+        """Stop tracking the events of all partitions except for the given ones, e.g.
+        after partitions have been revoked from the consumer.
+        """
+        retained = set(partitions)
+        for partition in list(self._deliveries):
+            if partition not in retained:
+                del self._deliveries[partition]
+
+    def get_committable(self) -> dict[Partition, int]:
+        """Get the offsets to commit for the partitions in which further events have
+        been acknowledged since the last call. The offset to commit is the one after
+        the last event that is not preceded by an unacknowledged event.
+        """
+        offsets: dict[Partition, int] = {}
+        for partition, deliveries in self._deliveries.items():
+            while deliveries and deliveries[0].acknowledged:
+                offsets[partition] = deliveries.popleft().offset + 1
+        return offsets
@@ -0,0 +1,184 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A Kafka event subscriber recording metrics on the consumed events and committing
+their offsets only once they have been acknowledged.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional, cast
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from hexkit.protocols.eventsub import EventSubscriberProtocol
+from hexkit.providers.akafka import KafkaConfig, KafkaEventSubscriber
+from hexkit.providers.akafka.provider import (
+    ConsumerEvent,
+    KafkaConsumerCompatible,
+    headers_as_dict,
+)
+
+from ifrs.adapters.inbound.acknowledgement import Delivery, DeliveryTracker
+from ifrs.ports.outbound.metrics import CONSUMER_LAG, EVENTS_CONSUMED, MetricsSinkPort
+
+
+class TrackingKafkaConsumer:
+    """Wraps a Kafka consumer to count the consumed events per topic and type, to
+    record the consumer lag per partition in a metrics sink, and to commit offsets
+    only up to the first event that has not been acknowledged yet.
+
+    The lag of a partition is derived from the last known highwater offset of that
+    partition and the offset of the last consumed event. An event is acknowledged
+    once the subscriber has passed it on, unless the translator deferred its
+    acknowledgement, e.g. to process it in the background. If an idle timeout is
+    given, the iteration over the consumed events stops once no event arrives within
+    that time. The wrapper is handed to hexkit's subscriber as consumer class, so that
+    the subscriber itself is used through its public interface only.
+    """
+
+    def __init__(
+        self,
+        *topics: str,
+        consumer_cls: type[KafkaConsumerCompatible],
+        metrics_sink: Optional[MetricsSinkPort],
+        idle_timeout: Optional[float] = None,
+        **kwargs,
+    ):
+        """Create the wrapped consumer of the given class with the given topics and
+        arguments, record metrics in the given sink, if any, and stop once no event
+        arrives within the given idle timeout in seconds, if any.
+        """
+        self._consumer = consumer_cls(*topics, **kwargs)
+        self._metrics_sink = metrics_sink
+        self._idle_timeout = idle_timeout
+        self._tracker: DeliveryTracker[TopicPartition] = DeliveryTracker()
+        self._last_delivery: Optional[Delivery] = None
+
+    async def start(self) -> None:
+        """Start the wrapped consumer."""
+        await self._consumer.start()
+
+    async def stop(self) -> None:
+        """Stop the wrapped consumer."""
+        await self._consumer.stop()
+
+    async def commit(self, offsets=None) -> None:
+        """Commit the given offsets or, by default, the offsets up to which all
+        consumed events have been acknowledged, counting the event consumed last as
+        passed on.
+        """
+        if offsets is not None:
+            await self._consumer.commit(offsets)
+            return
+
+        if self._last_delivery is not None:
+            self._last_delivery.release()
+            self._last_delivery = None
+        assignment = getattr(self._consumer, "assignment", None)
+        if assignment is not None:
+            self._tracker.retain(assignment())
+        committable = self._tracker.get_committable()
+        if committable:
+            await self._consumer.commit(committable)
+
+    def __aiter__(self) -> "TrackingKafkaConsumer":
+        """Iterate over the consumed events."""
+        return self
+
+    async def __anext__(self) -> ConsumerEvent:
+        """Consume the next event, track it until it is acknowledged, and record
+        metrics for it. Only waiting for the event counts towards the idle timeout.
+        """
+        try:
+            event = await asyncio.wait_for(
+                self._consumer.__anext__(), timeout=self._idle_timeout
+            )
+        except asyncio.TimeoutError as error:
+            raise StopAsyncIteration() from error
+        self._last_delivery = self._tracker.start(
+            partition=TopicPartition(event.topic, event.partition),
+            offset=event.offset,
+        )
+        self._record(event)
+        return event
+
+    def _get_lag(self, event: ConsumerEvent) -> Optional[int]:
+        """Get the number of events after the given one in its partition, if known."""
+        highwater = getattr(self._consumer, "highwater", None)
+        if highwater is None:
+            return None
+        partition_highwater = highwater(TopicPartition(event.topic, event.partition))
+        if partition_highwater is None:
+            return None
+        return max(0, partition_highwater - event.offset - 1)
+
+    def _record(self, event: ConsumerEvent) -> None:
+        """Record the metrics for a consumed event."""
+        if self._metrics_sink is None:
+            return
+
+        self._metrics_sink.increment_counter(
+            EVENTS_CONSUMED,
+            labels={
+                "topic": event.topic,
+                "type": headers_as_dict(event).get("type", ""),
+            },
+        )
+        lag = self._get_lag(event)
+        if lag is not None:
+            self._metrics_sink.set_gauge(
+                CONSUMER_LAG,
+                labels={"topic": event.topic, "partition": str(event.partition)},
+                value=lag,
+            )
+
+
+class InstrumentedKafkaEventSubscriber(KafkaEventSubscriber):
+    """A Kafka event subscriber that counts the consumed events per topic and type,
+    records the consumer lag per partition in a metrics sink, and commits the offsets
+    of events only once they have been acknowledged.
+    """
+
+    @classmethod
+    @asynccontextmanager
+    async def construct(  # noqa: PLR0913
+        cls,
+        *,
+        config: KafkaConfig,
+        translator: EventSubscriberProtocol,
+        kafka_consumer_cls: type[KafkaConsumerCompatible] = AIOKafkaConsumer,
+        metrics_sink: Optional[MetricsSinkPort] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> AsyncGenerator["InstrumentedKafkaEventSubscriber", None]:
+        """Setup and teardown an InstrumentedKafkaEventSubscriber recording metrics in
+        the given sink, if any. If an idle timeout in seconds is given, running the
+        subscriber returns once no event arrives within that time.
+        """
+        tracking_consumer_cls = partial(
+            TrackingKafkaConsumer,
+            consumer_cls=kafka_consumer_cls,
+            metrics_sink=metrics_sink,
+            idle_timeout=idle_timeout,
+        )
+        async with super().construct(
+            config=config,
+            translator=translator,
+            kafka_consumer_cls=cast(
+                type[KafkaConsumerCompatible], tracking_consumer_cls
+            ),
+        ) as event_subscriber:
+            yield cast(InstrumentedKafkaEventSubscriber, event_subscriber)
@@ -0,0 +1,91 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Collects items into micro-batches that are flushed by size or age."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable
+from typing import Callable, Generic, Optional, TypeVar
+
+log = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+
+
+class MicroBatcher(Generic[Item]):
+    """Collects items and hands them to a flush callback in batches.
+
+    A batch is flushed as soon as it contains `max_size` items or when its oldest item
+    has been waiting for `max_wait` seconds, whichever comes first. Only one batch is
+    flushed at a time, so adding items blocks while a full batch is being flushed.
+    The flush callback may thus hand the batch on to be processed elsewhere.
+
+    The flush callback is expected to handle the failures of a batch, e.g. by
+    processing its items one by one. Errors that escape a flush are logged, but do not
+    affect later batches.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush: Callable[[list[Item]], Awaitable[None]],
+        max_size: int,
+        max_wait: float,
+    ):
+        """Initialize with the flush callback and the batch limits."""
+        self._flush = flush
+        self._max_size = max_size
+        self._max_wait = max_wait
+        self._items: list[Item] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def _flush_pending(self) -> None:
+        """Flush all items collected so far."""
+        async with self._lock:
+            items, self._items = self._items, []
+            if not items:
+                return
+            try:
+                await self._flush(items)
+            except Exception as error:  # pylint: disable=broad-except
+                log.error("Flushing a batch of %i items failed: %s", len(items), error)
+
+    async def _flush_when_due(self) -> None:
+        """Flush the current batch once it has reached its maximum age."""
+        await asyncio.sleep(self._max_wait)
+        self._timer = None
+        await self._flush_pending()
+
+    async def add(self, item: Item) -> None:
+        """Add an item to the current batch."""
+        self._items.append(item)
+
+        if len(self._items) >= self._max_size:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            await self._flush_pending()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_when_due())
+
+    async def close(self) -> None:
+        """Flush the remaining items."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self._flush_pending()
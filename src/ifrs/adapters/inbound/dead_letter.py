@@ -0,0 +1,220 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Events that failed permanently and their replay from the dead-letter topic."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ghga_service_commons.utils.utc_dates import UTCDatetime, now_as_utc
+from hexkit.custom_types import Ascii, JsonObject
+from hexkit.protocols.eventsub import EventSubscriberProtocol
+from pydantic import BaseModel, Field
+
+from ifrs.adapters.inbound.acknowledgement import Acknowledge, defer_acknowledgement
+
+log = logging.getLogger(__name__)
+
+
+class DeadLetterEvent(BaseModel):
+    """The payload of an event on the dead-letter topic. The event keeps the type of
+    the original event, while the original topic and payload as well as the error and
+    its timing are recorded in this payload.
+    """
+
+    original_topic: str = Field(
+        ..., description="The topic from which the original event was consumed."
+    )
+    original_payload: dict[str, Any] = Field(
+        ..., description="The payload of the original event."
+    )
+    error_class: str = Field(
+        ..., description="The class name of the error that made the event fail."
+    )
+    error_message: str = Field(..., description="The message of that error.")
+    consumed_at: UTCDatetime = Field(
+        ..., description="The time at which the original event was consumed."
+    )
+    dead_lettered_at: UTCDatetime = Field(
+        ..., description="The time at which the event was moved to this topic."
+    )
+
+
+class ReplayCaughtUpError(RuntimeError):
+    """Raised when the replay reaches events that have been dead-lettered after it
+    started, i.e. by the replay itself. These events are not acknowledged, so that
+    they are replayed by the next run.
+    """
+
+    def __init__(self):
+        super().__init__("Reached events dead-lettered after the replay started.")
+
+
+@dataclass
+class DeadLetterReplayStats:
+    """Statistics on a replay of the dead-letter topic."""
+
+    replayed: int = 0
+    failed: int = 0
+
+
+class DeadLetterReplayTranslator(EventSubscriberProtocol):
+    """A translator consuming the dead-letter topic and passing the original events
+    on to another translator, with bounded concurrency and an optional rate limit.
+
+    An event counts as failed if the other translator raised an error for it. If that
+    translator itself moves failing events to the dead-letter topic, this only
+    happens for fatal errors. The first fatal error is raised on `close`. The
+    acknowledgement of an event is deferred until it has been replayed successfully.
+    """
+
+    def __init__(
+        self,
+        *,
+        dead_letter_topic: str,
+        target: EventSubscriberProtocol,
+        concurrency: int,
+        rate: Optional[float] = None,
+    ):
+        """Initialize with the dead-letter topic, the translator to replay the events
+        to, the maximum number of events replayed concurrently, and optionally the
+        maximum number of events replayed per second.
+        """
+        if concurrency < 1:
+            raise ValueError("The concurrency must be at least one.")
+
+        self.topics_of_interest = [dead_letter_topic]
+        self.types_of_interest = target.types_of_interest
+
+        self._target = target
+        self._slots = asyncio.Semaphore(concurrency)
+        self._interval = 1 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._started_at = now_as_utc()
+        self._tasks: set[asyncio.Task] = set()
+        self._failure: Optional[BaseException] = None
+        self._stats = DeadLetterReplayStats()
+
+    @classmethod
+    @asynccontextmanager
+    async def construct(
+        cls,
+        *,
+        dead_letter_topic: str,
+        target: EventSubscriberProtocol,
+        concurrency: int,
+        rate: Optional[float] = None,
+    ) -> AsyncGenerator["DeadLetterReplayTranslator", None]:
+        """Setup and teardown a DeadLetterReplayTranslator. On teardown, waits for all
+        started replays to complete.
+        """
+        translator = cls(
+            dead_letter_topic=dead_letter_topic,
+            target=target,
+            concurrency=concurrency,
+            rate=rate,
+        )
+        try:
+            yield translator
+        finally:
+            await translator.close()
+
+    @property
+    def stats(self) -> DeadLetterReplayStats:
+        """A snapshot of the current statistics of the replay."""
+        return DeadLetterReplayStats(**vars(self._stats))
+
+    async def _wait_for_rate_limit(self) -> None:
+        """Wait until the next event may be started according to the rate limit."""
+        if not self._interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        await asyncio.sleep(start - now)
+
+    async def _replay(
+        self, *, event: DeadLetterEvent, type_: Ascii, acknowledge: Acknowledge
+    ) -> None:
+        """Pass an event on to the target translator and acknowledge it if that
+        succeeds.
+        """
+        try:
+            await self._target.consume(
+                payload=event.original_payload,
+                type_=type_,
+                topic=event.original_topic,
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            log.error(
+                "Replaying the event of type '%s' for file ID '%s' failed: %s",
+                type_,
+                event.original_payload.get("file_id"),
+                error,
+            )
+            self._stats.failed += 1
+            if self._failure is None:
+                self._failure = error
+        else:
+            self._stats.replayed += 1
+            acknowledge()
+        finally:
+            self._slots.release()
+
+    def _track(self, task: asyncio.Task) -> None:
+        """Keep track of a task until it is done."""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _admit(
+        self, *, event: DeadLetterEvent, type_: Ascii, acknowledge: Acknowledge
+    ) -> None:
+        """Start the replay of an event once the concurrency and rate limits allow."""
+        await self._slots.acquire()
+        await self._wait_for_rate_limit()
+        self._track(
+            asyncio.create_task(
+                self._replay(event=event, type_=type_, acknowledge=acknowledge)
+            )
+        )
+
+    async def _consume_validated(
+        self,
+        *,
+        payload: JsonObject,
+        type_: Ascii,
+        topic: Ascii,  # pylint: disable=unused-argument
+    ) -> None:
+        """Replay an event from the dead-letter topic."""
+        event = DeadLetterEvent.model_validate(payload)
+        if event.dead_lettered_at >= self._started_at:
+            raise ReplayCaughtUpError()
+
+        await self._admit(event=event, type_=type_, acknowledge=defer_acknowledgement())
+
+    async def close(self) -> None:
+        """Wait for all started replays to complete.
+
+        Raises the first error of a failed replay, if any.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+        if self._failure is not None:
+            raise self._failure
@@ -15,15 +15,58 @@
 
 """Adapter for receiving events providing metadata on files"""
 
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
 from ghga_event_schemas import pydantic_ as event_schemas
-from ghga_event_schemas.validation import get_validated_payload
+from ghga_event_schemas.validation import (
+    EventSchemaValidationError,
+    get_validated_payload,
+    validated_upload_date,
+)
+from ghga_service_commons.utils.utc_dates import now_as_utc
+from hexkit.correlation import correlation_id_var, set_correlation_id
 from hexkit.custom_types import Ascii, JsonObject
+from hexkit.protocols.eventpub import EventPublisherProtocol
 from hexkit.protocols.eventsub import EventSubscriberProtocol
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+from ifrs.adapters.inbound.acknowledgement import Acknowledge, defer_acknowledgement
+from ifrs.adapters.inbound.batching import MicroBatcher
+from ifrs.adapters.inbound.dead_letter import DeadLetterEvent
+from ifrs.adapters.inbound.idempotency import (
+    IdempotencyCache,
+    IdempotencyCacheStats,
+    fingerprint_event,
+)
+from ifrs.adapters.inbound.retry import (
+    FailureHandler,
+    RetryScheduler,
+    RetrySchedulerStats,
+)
+from ifrs.adapters.inbound.worker_pool import (
+    Job,
+    KeyedWorkerPool,
+    WorkerPoolStats,
+    split_capacity,
+)
 from ifrs.core import models
+from ifrs.core.storage_budget import StorageBudget, StorageBudgetUsage
 from ifrs.ports.inbound.file_registry import FileRegistryPort
+from ifrs.ports.outbound.metrics import (
+    EVENT_PROCESSING_SECONDS,
+    EVENTS_PROCESSED,
+    MetricsSinkPort,
+)
+
+log = logging.getLogger(__name__)
 
 
 class EventSubTranslatorConfig(BaseSettings):
@@ -63,18 +106,217 @@ class EventSubTranslatorConfig(BaseSettings):
         examples=["file_deletion_requested"],
     )
 
+    event_workers: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "The number of workers processing consumed events concurrently. Each event"
+            + " type is processed in its own lane with a share of the workers. Within a"
+            + " lane, events are distributed over the workers by their file ID, so that"
+            + " events of the same type concerning the same file are processed in"
+            + " order. With a single worker, each event is processed completely before"
+            + " the next one is consumed. With multiple workers, the next event is"
+            + " consumed once an event has been accepted by a worker. Either way, the"
+            + " offset of an event is only committed once it and all events before it"
+            + " in its partition have been processed or dead-lettered. Events that"
+            + " failed in a worker without being dead-lettered are therefore consumed"
+            + " again after a restart."
+        ),
+        examples=[1, 8],
+    )
+    max_events_in_flight: int = Field(
+        default=64,
+        ge=1,
+        description=(
+            "The maximum number of accepted events that may be queued or processed at"
+            + " the same time when using multiple event workers. Consumption pauses"
+            + " while the share of a lane is exhausted."
+        ),
+        examples=[64],
+    )
+    files_to_register_lane_weight: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "When using multiple event workers, each event type is processed in its"
+            + " own lane. This weight determines the share of the event workers and of"
+            + " the events in flight that is reserved for files_to_register events."
+        ),
+        examples=[1],
+    )
+    files_to_stage_lane_weight: int = Field(
+        default=2,
+        ge=1,
+        description=(
+            "The weight determining the share of the event workers and of the events"
+            + " in flight that is reserved for files_to_stage events."
+        ),
+        examples=[2],
+    )
+    files_to_delete_lane_weight: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "The weight determining the share of the event workers and of the events"
+            + " in flight that is reserved for files_to_delete events."
+        ),
+        examples=[1],
+    )
+    registration_batch_size: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "The maximum number of files_to_register events that are collected and"
+            + " registered together. Batching combines the database lookups of all"
+            + " files in a batch. If a batch fails, its files are registered one by one"
+            + " afterwards. With multiple event workers, batches are registered one"
+            + " after another in the lane of files_to_register events. A value of 1"
+            + " disables batching."
+        ),
+        examples=[1, 100],
+    )
+    registration_batch_timeout_ms: int = Field(
+        default=100,
+        ge=0,
+        description=(
+            "The maximum time in milliseconds a files_to_register event waits for its"
+            + " batch to fill up before the batch is registered anyway. Only used if"
+            + " registration_batch_size is greater than 1."
+        ),
+        examples=[100],
+    )
+    staging_batch_size: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "The maximum number of files_to_stage events that are collected and staged"
+            + " together. Batching looks up the metadata of all files in a batch with"
+            + " a single database query. Files that fail to be staged as part of a"
+            + " batch are staged one by one afterwards. With multiple event workers,"
+            + " batches are staged one after another in the lane of files_to_stage"
+            + " events. A value of 1 disables batching."
+        ),
+        examples=[1, 100],
+    )
+    staging_batch_timeout_ms: int = Field(
+        default=100,
+        ge=0,
+        description=(
+            "The maximum time in milliseconds a files_to_stage event waits for its"
+            + " batch to fill up before the batch is staged anyway. Only used if"
+            + " staging_batch_size is greater than 1."
+        ),
+        examples=[100],
+    )
+    idempotency_cache_size: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The maximum number of recently processed events that are remembered by"
+            + " their type and payload, so that exact redeliveries are skipped without"
+            + " any database or storage access. Each entry takes roughly 200 bytes."
+            + " The least recently seen events are forgotten first. A value of 0"
+            + " disables the cache."
+        ),
+        examples=[0, 100000],
+    )
+    idempotency_cache_ttl_seconds: int = Field(
+        default=600,
+        ge=1,
+        description=(
+            "The time in seconds a processed event is remembered by the idempotency"
+            + " cache. Should be shorter than the time staged files are kept in the"
+            + " outbox, so that a repeated staging request for a file that has been"
+            + " removed from the outbox in the meantime is not skipped."
+        ),
+        examples=[600],
+    )
+    max_retries: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The number of delayed retries of events that failed due to a presumably"
+            + " transient error, e.g. of the object storage or the database. Failed"
+            + " events are parked in a local delay queue while the consumption"
+            + " continues. Their offsets are only committed once their retries"
+            + " succeeded or they have been dead-lettered."
+            + " Events rejected as invalid requests are never retried. A value of 0"
+            + " disables retries, so that any error is raised right away."
+        ),
+        examples=[0, 5],
+    )
+    retry_initial_delay_ms: int = Field(
+        default=1000,
+        ge=0,
+        description=(
+            "The upper bound of the randomized delay in milliseconds before the first"
+            + " retry. The bound doubles with each further retry."
+        ),
+        examples=[1000],
+    )
+    retry_max_delay_ms: int = Field(
+        default=60000,
+        ge=0,
+        description="The maximum delay in milliseconds before any retry.",
+        examples=[60000],
+    )
+    max_pending_retries: int = Field(
+        default=1000,
+        ge=1,
+        description=(
+            "The maximum number of failed events waiting for their retry. Once"
+            + " reached, the consumption blocks until a retry has completed."
+        ),
+        examples=[1000],
+    )
+    dead_letter_topic: Optional[str] = Field(
+        default=None,
+        description=(
+            "The topic to which events are moved that failed permanently, i.e. that"
+            + " were rejected as invalid or still failed after their last retry, so"
+            + " that they do not block the consumption. The dead-letter events keep"
+            + " their original type and carry the original topic and payload as well"
+            + " as the error and its timing in their payload. Fatal errors are never"
+            + " dead-lettered. If not set, failing events are raised."
+        ),
+        examples=[None, "ifrs_dead_letters"],
+    )
+
+
+@dataclass
+class ConsumedEvent:
+    """An event accepted by the translator along with the context of its consumption."""
+
+    payload: JsonObject
+    type_: Ascii
+    topic: Ascii
+    fingerprint: Optional[bytes]
+    consumed_at: datetime
+    correlation_id: str
+    acknowledge: Acknowledge
+
 
 class EventSubTranslator(EventSubscriberProtocol):
     """A triple hexagonal translator compatible with the EventSubscriberProtocol that
     is used to receive metadata on new files to register.
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         config: EventSubTranslatorConfig,
         file_registry: FileRegistryPort,
+        storage_budget: Optional[StorageBudget] = None,
+        dead_letter_publisher: Optional[EventPublisherProtocol] = None,
+        metrics_sink: Optional[MetricsSinkPort] = None,
     ):
-        """Initialize with config parameters and core dependencies."""
+        """Initialize with config parameters and core dependencies.
+
+        If a storage budget shared with the core is provided, the consumption of events
+        that lead to copies is paused while the budget of a storage is exceeded. If a
+        publisher is provided and a dead-letter topic is configured, events that fail
+        permanently are moved to that topic. If a metrics sink is provided, the
+        outcome and duration of processing attempts are recorded in it.
+        """
         self.topics_of_interest = [
             config.files_to_register_topic,
             config.files_to_stage_topic,
@@ -86,45 +328,529 @@ class EventSubTranslator(EventSubscriberProtocol):
 
         self._file_registry = file_registry
         self._config = config
+        self._storage_budget = storage_budget
+        self._dead_letter_publisher = (
+            dead_letter_publisher if config.dead_letter_topic else None
+        )
+        self._metrics_sink = metrics_sink
+        self._lanes: dict[str, KeyedWorkerPool] = (
+            self._create_lanes(config) if config.event_workers > 1 else {}
+        )
+        self._idempotency_cache: Optional[IdempotencyCache] = (
+            IdempotencyCache(
+                max_entries=config.idempotency_cache_size,
+                ttl_seconds=config.idempotency_cache_ttl_seconds,
+            )
+            if config.idempotency_cache_size > 0
+            else None
+        )
+        self._retry_scheduler: Optional[RetryScheduler] = (
+            RetryScheduler(
+                max_retries=config.max_retries,
+                initial_delay=config.retry_initial_delay_ms / 1000,
+                max_delay=config.retry_max_delay_ms / 1000,
+                max_pending=config.max_pending_retries,
+                is_retryable=self._is_retryable,
+            )
+            if config.max_retries > 0
+            else None
+        )
+        self._registration_batcher: Optional[
+            MicroBatcher[tuple[ConsumedEvent, models.FileRegistrationRequest]]
+        ] = (
+            MicroBatcher(
+                flush=lambda items: self._dispatch_batch(
+                    type_=config.files_to_register_type,
+                    job=lambda: self._flush_registrations(items),
+                ),
+                max_size=config.registration_batch_size,
+                max_wait=config.registration_batch_timeout_ms / 1000,
+            )
+            if config.registration_batch_size > 1
+            else None
+        )
+        self._staging_batcher: Optional[
+            MicroBatcher[tuple[ConsumedEvent, models.FileStagingRequest]]
+        ] = (
+            MicroBatcher(
+                flush=lambda items: self._dispatch_batch(
+                    type_=config.files_to_stage_type,
+                    job=lambda: self._flush_stagings(items),
+                ),
+                max_size=config.staging_batch_size,
+                max_wait=config.staging_batch_timeout_ms / 1000,
+            )
+            if config.staging_batch_size > 1
+            else None
+        )
+        self._fatal_error: Optional[Exception] = None
 
-    async def _consume_files_to_register(self, *, payload: JsonObject) -> None:
-        """Consume file registration events."""
-        validated_payload = get_validated_payload(
-            payload=payload, schema=event_schemas.FileUploadValidationSuccess
+    @staticmethod
+    def _create_lanes(config: EventSubTranslatorConfig) -> dict[str, KeyedWorkerPool]:
+        """Create one worker pool per event type sharing the configured capacity
+        according to the lane weights.
+        """
+        weights = {
+            config.files_to_register_type: config.files_to_register_lane_weight,
+            config.files_to_stage_type: config.files_to_stage_lane_weight,
+            config.files_to_delete_type: config.files_to_delete_lane_weight,
+        }
+        workers = split_capacity(config.event_workers, list(weights.values()))
+        in_flight = split_capacity(config.max_events_in_flight, list(weights.values()))
+        return {
+            type_: KeyedWorkerPool(
+                workers=lane_workers, max_in_flight=max(lane_workers, lane_in_flight)
+            )
+            for type_, lane_workers, lane_in_flight in zip(weights, workers, in_flight)
+        }
+
+    def lane_stats(self) -> dict[str, WorkerPoolStats]:
+        """Get the current queue depth and wait time statistics per event type. Empty
+        if events are processed without workers.
+        """
+        return {type_: lane.stats for type_, lane in self._lanes.items()}
+
+    def idempotency_cache_stats(self) -> Optional[IdempotencyCacheStats]:
+        """Get the current hit and miss statistics of the idempotency cache or `None`
+        if the cache is disabled.
+        """
+        if self._idempotency_cache is None:
+            return None
+        return self._idempotency_cache.stats
+
+    def retry_stats(self) -> Optional[RetrySchedulerStats]:
+        """Get the current statistics on delayed retries or `None` if retries are
+        disabled.
+        """
+        if self._retry_scheduler is None:
+            return None
+        return self._retry_scheduler.stats
+
+    def storage_budget_usage(self) -> dict[str, StorageBudgetUsage]:
+        """Get the current copies and bytes in flight per storage alias. Empty if no
+        storage budget is used.
+        """
+        if self._storage_budget is None:
+            return {}
+        return self._storage_budget.usage()
+
+    @classmethod
+    @asynccontextmanager
+    async def construct(  # noqa: PLR0913
+        cls,
+        *,
+        config: EventSubTranslatorConfig,
+        file_registry: FileRegistryPort,
+        storage_budget: Optional[StorageBudget] = None,
+        dead_letter_publisher: Optional[EventPublisherProtocol] = None,
+        metrics_sink: Optional[MetricsSinkPort] = None,
+    ) -> AsyncGenerator["EventSubTranslator", None]:
+        """Setup and teardown an EventSubTranslator. On teardown, waits for all
+        accepted events to be processed.
+        """
+        translator = cls(
+            config=config,
+            file_registry=file_registry,
+            storage_budget=storage_budget,
+            dead_letter_publisher=dead_letter_publisher,
+            metrics_sink=metrics_sink,
         )
+        try:
+            yield translator
+        finally:
+            await translator._close()
 
-        file_without_object_id = models.FileMetadataBase(
-            file_id=validated_payload.file_id,
-            decrypted_sha256=validated_payload.decrypted_sha256,
-            decrypted_size=validated_payload.decrypted_size,
-            upload_date=validated_payload.upload_date,
-            decryption_secret_id=validated_payload.decryption_secret_id,
-            encrypted_part_size=validated_payload.encrypted_part_size,
-            encrypted_parts_md5=validated_payload.encrypted_parts_md5,
-            encrypted_parts_sha256=validated_payload.encrypted_parts_sha256,
-            content_offset=validated_payload.content_offset,
-            storage_alias=validated_payload.s3_endpoint_alias,
+    async def _close(self) -> None:
+        """Process the pending registration and staging batches and wait for all
+        workers and for the retries of failed events.
+        """
+        try:
+            if self._registration_batcher is not None:
+                await self._registration_batcher.close()
+        finally:
+            try:
+                if self._staging_batcher is not None:
+                    await self._staging_batcher.close()
+            finally:
+                await self._close_workers()
+
+    async def _close_workers(self) -> None:
+        """Wait for all workers and for the retries of failed events. Raises the
+        first fatal error encountered by a worker, if any.
+        """
+        failures = [
+            result
+            for result in await asyncio.gather(
+                *(lane.close() for lane in self._lanes.values()),
+                return_exceptions=True,
+            )
+            if isinstance(result, BaseException)
+        ]
+        if self._retry_scheduler is not None:
+            try:
+                await self._retry_scheduler.close()
+            except Exception as error:  # pylint: disable=broad-except
+                failures.append(error)
+        if self._fatal_error is not None:
+            failures.insert(0, self._fatal_error)
+        if failures:
+            raise failures[0]
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Decide whether an error is presumably transient. Invalid requests, fatal
+        errors, and invalid payloads or configuration are never retried.
+        """
+        return not isinstance(
+            error,
+            (
+                FileRegistryPort.InvalidRequestError,
+                FileRegistryPort.FatalError,
+                ValueError,
+            ),
+        )
+
+    async def _run_guarded(
+        self,
+        job: Job,
+        *,
+        on_failure: Optional[FailureHandler],
+        key: Optional[str] = None,
+    ) -> None:
+        """Run a job with delayed retries on transient errors, if enabled, and pass
+        permanent failures to the given handler, if any, instead of raising them.
+        While a job with the given key awaits its retry, later jobs with the same key
+        are held back behind it, so that the events of a file stay in order.
+        """
+        if self._retry_scheduler is None:
+            try:
+                await job()
+            except Exception as error:
+                if on_failure is None:
+                    raise
+                await on_failure(error)
+            return
+
+        self._retry_scheduler.raise_failure()
+        try:
+            await self._retry_scheduler.run(job, key=key, on_failure=on_failure)
+        except Exception as error:
+            if on_failure is None:
+                raise
+            await on_failure(error)
+
+    def _get_dead_letter_handler(
+        self, event: ConsumedEvent
+    ) -> Optional[FailureHandler]:
+        """Get a handler moving the given event to the dead-letter topic or `None` if
+        dead-lettering is disabled.
+        """
+        if self._dead_letter_publisher is None:
+            return None
+        return lambda error: self._dead_letter(event=event, error=error)
+
+    async def _dead_letter(self, *, event: ConsumedEvent, error: Exception) -> None:
+        """Move an event that failed permanently to the dead-letter topic. Fatal
+        errors are raised instead, since they should terminate the service.
+        """
+        if (
+            isinstance(error, FileRegistryPort.FatalError)
+            or self._dead_letter_publisher is None
+            or not self._config.dead_letter_topic
+        ):
+            raise error
+
+        self._record_processing(type_=event.type_, outcome="dead_lettered")
+        log.error(
+            "Moving event of type '%s' for file ID '%s' to the dead-letter topic: %s",
+            event.type_,
+            event.payload.get("file_id"),
+            error,
+        )
+        dead_letter_event = DeadLetterEvent(
+            original_topic=event.topic,
+            original_payload=event.payload,
+            error_class=type(error).__name__,
+            error_message=str(error),
+            consumed_at=event.consumed_at,
+            dead_lettered_at=now_as_utc(),
+        )
+        await self._dead_letter_publisher.publish(
+            payload=dead_letter_event.model_dump(mode="json"),
+            type_=event.type_,
+            key=str(event.payload.get("file_id") or event.type_),
+            topic=self._config.dead_letter_topic,
+        )
+        event.acknowledge()
+
+    @staticmethod
+    async def _in_context(event: ConsumedEvent, job: Job) -> None:
+        """Run a job in the correlation context of the event it belongs to, since jobs
+        may be run by worker tasks that outlive the consumption of a single event.
+        """
+        if not event.correlation_id or correlation_id_var.get() == event.correlation_id:
+            await job()
+            return
+
+        async with set_correlation_id(event.correlation_id):
+            await job()
+
+    async def _handle(self, event: ConsumedEvent) -> None:
+        """Process an event with retries and dead-lettering, if enabled."""
+        await self._in_context(
+            event,
+            lambda: self._run_guarded(
+                lambda: self._process(event),
+                on_failure=self._get_dead_letter_handler(event),
+                key=str(event.payload.get("file_id") or "") or None,
+            ),
+        )
+
+    async def _run_contained(self, job: Job, *, description: str) -> None:
+        """Run a job processing events in a worker or in a batch without letting its
+        errors escape. Fatal errors are kept to be raised by the next consumption, so
+        that the service terminates. Other errors that are not handled by retries or
+        dead-lettering leave the events unacknowledged, so that they are consumed
+        again after a restart.
+        """
+        try:
+            await job()
+        except FileRegistryPort.FatalError as error:
+            if self._fatal_error is None:
+                self._fatal_error = error
+        except Exception as error:  # pylint: disable=broad-except
+            log.error("%s failed, leaving it unacknowledged: %s", description, error)
+
+    async def _handle_in_worker(self, event: ConsumedEvent) -> None:
+        """Process an event in a worker without letting its errors escape."""
+        await self._run_contained(
+            lambda: self._handle(event),
+            description=(
+                f"Processing the event of type '{event.type_}' for file ID"
+                + f" '{event.payload.get('file_id')}'"
+            ),
         )
 
+    async def _dispatch_batch(self, *, type_: Ascii, job: Job) -> None:
+        """Process a batch of events in the lane of their type, if enabled, so that a
+        slow batch does not hold back events of other types. The batches of a type are
+        processed one after another in their lane to keep the events of a file in
+        order. Without lanes, the batch is processed right away.
+        """
+        lane = self._lanes.get(type_)
+
+        async def contained_job() -> None:
+            await self._run_contained(
+                job, description=f"Processing a batch of events of type '{type_}'"
+            )
+
+        if lane is None:
+            await contained_job()
+            return
+        await lane.submit(key=type_, job=contained_job)
+
+    def _record_processing(
+        self,
+        *,
+        type_: Ascii,
+        outcome: str,
+        duration: Optional[float] = None,
+        count: int = 1,
+    ) -> None:
+        """Record the outcome and, if given, the duration of a processing attempt."""
+        if self._metrics_sink is None:
+            return
+
+        self._metrics_sink.increment_counter(
+            EVENTS_PROCESSED, labels={"type": type_, "outcome": outcome}, value=count
+        )
+        if duration is not None:
+            self._metrics_sink.observe_histogram(
+                EVENT_PROCESSING_SECONDS, labels={"type": type_}, value=duration
+            )
+
+    def _complete(self, event: ConsumedEvent) -> None:
+        """Acknowledge a successfully processed event and remember it in the
+        idempotency cache.
+        """
+        event.acknowledge()
+        if self._idempotency_cache is not None and event.fingerprint is not None:
+            self._idempotency_cache.add(event.fingerprint)
+
+    async def _register_batch(
+        self, items: list[tuple[ConsumedEvent, models.FileRegistrationRequest]]
+    ) -> None:
+        """Register a batch of files collected from files_to_register events."""
+        started_at = time.monotonic()
+        try:
+            await self._file_registry.register_files(
+                requests=[request for _, request in items]
+            )
+        except Exception:
+            self._record_processing(
+                type_=self._config.files_to_register_type,
+                outcome="failure",
+                duration=time.monotonic() - started_at,
+                count=len(items),
+            )
+            raise
+
+        self._record_processing(
+            type_=self._config.files_to_register_type,
+            outcome="success",
+            duration=time.monotonic() - started_at,
+            count=len(items),
+        )
+        for event, _ in items:
+            self._complete(event)
+
+    async def _flush_registrations(
+        self, items: list[tuple[ConsumedEvent, models.FileRegistrationRequest]]
+    ) -> None:
+        """Register a batch of files. If the batch fails, its events are processed one
+        by one with retries and dead-lettering, if enabled, so that only the failing
+        ones are retried or moved to the dead-letter topic.
+        """
+        try:
+            await self._register_batch(items)
+        except Exception as error:  # pylint: disable=broad-except
+            await self._process_individually(items=items, error=error)
+
+    async def _process_individually(
+        self,
+        *,
+        items: list[tuple[ConsumedEvent, models.FileRegistrationRequest]],
+        error: Exception,
+    ) -> None:
+        """Process the events of a failed registration batch one by one."""
+        if isinstance(error, FileRegistryPort.FatalError):
+            raise error
+
+        log.warning(
+            "Registering a batch of %i files failed, registering them one by one: %s",
+            len(items),
+            error,
+        )
+        for failure in await asyncio.gather(
+            *(self._handle(event) for event, _ in items), return_exceptions=True
+        ):
+            if isinstance(failure, BaseException):
+                raise failure
+
+    async def _flush_stagings(
+        self, items: list[tuple[ConsumedEvent, models.FileStagingRequest]]
+    ) -> None:
+        """Stage a batch of files collected from files_to_stage events. The events of
+        files that could not be staged as part of the batch, or of all files if the
+        batch failed as a whole, are processed one by one with retries and
+        dead-lettering, if enabled.
+        """
+        started_at = time.monotonic()
+        staged: list[ConsumedEvent] = []
+        failed: list[ConsumedEvent] = []
+        try:
+            outcomes = await self._file_registry.stage_registered_files(
+                requests=[request for _, request in items], raise_on_failure=False
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Staging a batch of %i files failed, staging them one by one: %s",
+                len(items),
+                error,
+            )
+            failed = [event for event, _ in items]
+        else:
+            for (event, _), outcome in zip(items, outcomes):
+                if outcome.outcome in ("staged", "already_staged"):
+                    staged.append(event)
+                else:
+                    failed.append(event)
+
+        duration = time.monotonic() - started_at
+        if staged:
+            self._record_processing(
+                type_=self._config.files_to_stage_type,
+                outcome="success",
+                duration=duration,
+                count=len(staged),
+            )
+            for event in staged:
+                self._complete(event)
+        if not failed:
+            return
+
+        self._record_processing(
+            type_=self._config.files_to_stage_type,
+            outcome="failure",
+            duration=None if staged else duration,
+            count=len(failed),
+        )
+        for failure in await asyncio.gather(
+            *(self._handle(event) for event in failed), return_exceptions=True
+        ):
+            if isinstance(failure, BaseException):
+                raise failure
+
+    @staticmethod
+    def _get_registration_request(
+        *, payload: JsonObject
+    ) -> models.FileRegistrationRequest:
+        """Translate the payload of a files_to_register event into a request."""
+        # The event schema and the core model share their fields except for the
+        # storage location, so the payload is reshaped and validated in a single pass
+        # instead of validating it against the event schema and then again as core
+        # model, which matters for files with many parts:
+        try:
+            validated_upload_date(payload.get("upload_date"))
+            return models.FileRegistrationRequest.model_validate(
+                {
+                    "file_without_object_id": {
+                        **payload,
+                        "storage_alias": payload.get("s3_endpoint_alias"),
+                    },
+                    "staging_object_id": payload.get("object_id"),
+                    "staging_bucket_id": payload.get("bucket_id"),
+                }
+            )
+        except (TypeError, ValueError) as error:
+            raise EventSchemaValidationError(
+                payload=payload, schema=event_schemas.FileUploadValidationSuccess
+            ) from error
+
+    async def _consume_files_to_register(self, *, payload: JsonObject) -> None:
+        """Consume file registration events."""
+        request = self._get_registration_request(payload=payload)
+
         await self._file_registry.register_file(
-            file_without_object_id=file_without_object_id,
-            staging_object_id=validated_payload.object_id,
-            staging_bucket_id=validated_payload.bucket_id,
+            file_without_object_id=request.file_without_object_id,
+            staging_object_id=request.staging_object_id,
+            staging_bucket_id=request.staging_bucket_id,
         )
 
-    async def _consume_file_downloads(self, *, payload: JsonObject) -> None:
-        """Consume file download events."""
+    @staticmethod
+    def _get_staging_request(*, payload: JsonObject) -> models.FileStagingRequest:
+        """Translate the payload of a files_to_stage event into a request."""
         validated_payload = get_validated_payload(
             payload=payload, schema=event_schemas.NonStagedFileRequested
         )
-
-        await self._file_registry.stage_registered_file(
+        return models.FileStagingRequest(
             file_id=validated_payload.file_id,
             decrypted_sha256=validated_payload.decrypted_sha256,
             outbox_object_id=validated_payload.target_object_id,
             outbox_bucket_id=validated_payload.target_bucket_id,
         )
 
+    async def _consume_file_downloads(self, *, payload: JsonObject) -> None:
+        """Consume file download events."""
+        request = self._get_staging_request(payload=payload)
+
+        await self._file_registry.stage_registered_file(
+            file_id=request.file_id,
+            decrypted_sha256=request.decrypted_sha256,
+            outbox_object_id=request.outbox_object_id,
+            outbox_bucket_id=request.outbox_bucket_id,
+        )
+
     async def _consume_file_deletions(self, *, payload: JsonObject) -> None:
         """Consume file deletion events."""
         validated_payload = get_validated_payload(
@@ -133,19 +859,153 @@ class EventSubTranslator(EventSubscriberProtocol):
 
         await self._file_registry.delete_file(file_id=validated_payload.file_id)
 
+    async def _dispatch(self, event: ConsumedEvent) -> None:
+        """Pass an event on to the core according to its type."""
+        if event.type_ == self._config.files_to_register_type:
+            await self._consume_files_to_register(payload=event.payload)
+        elif event.type_ == self._config.files_to_stage_type:
+            await self._consume_file_downloads(payload=event.payload)
+        elif event.type_ == self._config.files_to_delete_type:
+            await self._consume_file_deletions(payload=event.payload)
+        else:
+            raise RuntimeError(f"Unexpected event of type: {event.type_}")
+
+    async def _process(self, event: ConsumedEvent) -> None:
+        """Process an event and record the outcome of this attempt."""
+        started_at = time.monotonic()
+        try:
+            await self._dispatch(event)
+        except Exception:
+            self._record_processing(
+                type_=event.type_,
+                outcome="failure",
+                duration=time.monotonic() - started_at,
+            )
+            raise
+
+        self._record_processing(
+            type_=event.type_,
+            outcome="success",
+            duration=time.monotonic() - started_at,
+        )
+        self._complete(event)
+
+    async def _wait_for_storage_headroom(
+        self, *, payload: JsonObject, type_: Ascii
+    ) -> None:
+        """Hold back an event that leads to a copy while the budget of the storage it
+        targets is exceeded. As the next event is only fetched once this one has been
+        accepted, this pauses the consumption until the budget has drained. Both
+        files_to_register and files_to_stage events name the storage of the file,
+        which the copies are accounted for. Events without a valid storage alias are
+        not held back, since they are rejected anyway.
+        """
+        if self._storage_budget is None or type_ not in (
+            self._config.files_to_register_type,
+            self._config.files_to_stage_type,
+        ):
+            return
+
+        storage_alias = payload.get("s3_endpoint_alias")
+        if not isinstance(storage_alias, str) or not self._storage_budget.is_exceeded(
+            storage_alias
+        ):
+            return
+
+        log.warning(
+            "Pausing consumption as the storage budget of storage '%s' is exceeded.",
+            storage_alias,
+        )
+        paused_at = time.monotonic()
+        await self._storage_budget.wait_for_headroom(storage_alias)
+        log.info(
+            "Resuming consumption after a pause of %.1f seconds.",
+            time.monotonic() - paused_at,
+        )
+
+    async def _add_to_batch(self, event: ConsumedEvent) -> bool:
+        """Add an event to the batch of its type, if batching is enabled for that type,
+        and return whether it has been added. Events with an invalid payload are
+        dead-lettered right away, if enabled, and count as added.
+        """
+        if (
+            self._registration_batcher is not None
+            and event.type_ == self._config.files_to_register_type
+        ):
+            try:
+                request = self._get_registration_request(payload=event.payload)
+            except EventSchemaValidationError as error:
+                on_failure = self._get_dead_letter_handler(event)
+                if on_failure is None:
+                    raise
+                await on_failure(error)
+                return True
+            await self._registration_batcher.add((event, request))
+            return True
+
+        if (
+            self._staging_batcher is not None
+            and event.type_ == self._config.files_to_stage_type
+        ):
+            try:
+                staging_request = self._get_staging_request(payload=event.payload)
+            except EventSchemaValidationError as error:
+                on_failure = self._get_dead_letter_handler(event)
+                if on_failure is None:
+                    raise
+                await on_failure(error)
+                return True
+            await self._staging_batcher.add((event, staging_request))
+            return True
+
+        return False
+
     async def _consume_validated(
         self,
         *,
         payload: JsonObject,
         type_: Ascii,
-        topic: Ascii,  # pylint: disable=unused-argument
+        topic: Ascii,
     ) -> None:
-        """Consume events from the topics of interest."""
-        if type_ == self._config.files_to_register_type:
-            await self._consume_files_to_register(payload=payload)
-        elif type_ == self._config.files_to_stage_type:
-            await self._consume_file_downloads(payload=payload)
-        elif type_ == self._config.files_to_delete_type:
-            await self._consume_file_deletions(payload=payload)
-        else:
-            raise RuntimeError(f"Unexpected event of type: {type_}")
+        """Consume events from the topics of interest. The acknowledgement of an
+        event is deferred until it has been processed or dead-lettered.
+        """
+        if self._fatal_error is not None:
+            raise self._fatal_error
+
+        fingerprint: Optional[bytes] = None
+        if self._idempotency_cache is not None:
+            fingerprint = fingerprint_event(type_=type_, payload=payload)
+            if self._idempotency_cache.contains(fingerprint):
+                self._record_processing(type_=type_, outcome="skipped")
+                log.info(
+                    "Skipping already processed event of type '%s' for file ID '%s'.",
+                    type_,
+                    payload.get("file_id"),
+                )
+                return
+
+        await self._wait_for_storage_headroom(payload=payload, type_=type_)
+
+        event = ConsumedEvent(
+            payload=payload,
+            type_=type_,
+            topic=topic,
+            fingerprint=fingerprint,
+            consumed_at=now_as_utc(),
+            correlation_id=correlation_id_var.get(),
+            acknowledge=defer_acknowledgement(),
+        )
+
+        if await self._add_to_batch(event):
+            return
+
+        lane = self._lanes.get(type_)
+        if lane is None:
+            await self._handle(event)
+            return
+
+        await lane.submit(
+            key=str(payload.get("file_id", "")),
+            job=lambda: self._handle_in_worker(event),
+        )
@@ -0,0 +1,92 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""A bounded cache remembering recently processed events to skip redeliveries."""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from hexkit.custom_types import JsonObject
+
+
+@dataclass
+class IdempotencyCacheStats:
+    """Statistics on the lookups in an idempotency cache."""
+
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+def fingerprint_event(*, type_: str, payload: JsonObject) -> bytes:
+    """Compute a fingerprint identifying an event by its type and payload."""
+    canonical_payload = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(
+        f"{type_}\n{canonical_payload}".encode(), digest_size=16
+    ).digest()
+
+
+class IdempotencyCache:
+    """Remembers the fingerprints of processed events for a limited time.
+
+    The least recently used fingerprints are evicted once the maximum number of
+    entries is reached, so that memory usage stays bounded. Each entry takes roughly
+    200 bytes.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float):
+        """Initialize with the maximum number of entries and their time to live."""
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._expiry_by_fingerprint: OrderedDict[bytes, float] = OrderedDict()
+        self._stats = IdempotencyCacheStats()
+
+    @property
+    def stats(self) -> IdempotencyCacheStats:
+        """A snapshot of the current statistics of this cache."""
+        return IdempotencyCacheStats(
+            entries=len(self._expiry_by_fingerprint),
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+        )
+
+    def contains(self, fingerprint: bytes) -> bool:
+        """Check whether an event with the given fingerprint was processed recently."""
+        expiry = self._expiry_by_fingerprint.get(fingerprint)
+        if expiry is not None and expiry <= time.monotonic():
+            del self._expiry_by_fingerprint[fingerprint]
+            expiry = None
+
+        if expiry is None:
+            self._stats.misses += 1
+            return False
+
+        self._expiry_by_fingerprint.move_to_end(fingerprint)
+        self._stats.hits += 1
+        return True
+
+    def add(self, fingerprint: bytes) -> None:
+        """Remember that an event with the given fingerprint has been processed."""
+        self._expiry_by_fingerprint[fingerprint] = time.monotonic() + self._ttl_seconds
+        self._expiry_by_fingerprint.move_to_end(fingerprint)
+        while len(self._expiry_by_fingerprint) > self._max_entries:
+            self._expiry_by_fingerprint.popitem(last=False)
+            self._stats.evictions += 1
@@ -0,0 +1,234 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Delayed retries of jobs that failed due to transient errors."""
+
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from ifrs.adapters.inbound.worker_pool import Job
+
+log = logging.getLogger(__name__)
+
+BACKOFF_FACTOR = 2
+
+FailureHandler = Callable[[Exception], Awaitable[None]]
+
+
+@dataclass
+class RetrySchedulerStats:
+    """Statistics on the retries of a retry scheduler."""
+
+    pending: int = 0
+    retried: int = 0
+    recovered: int = 0
+    exhausted: int = 0
+
+
+class RetryScheduler:
+    """Runs jobs and, if they fail with a retryable error, parks them in a local delay
+    queue to retry them later with exponential backoff and full jitter, so that the
+    caller can move on to other jobs in the meantime.
+
+    Jobs may be given a key. While a job with a key is parked, later jobs with the
+    same key are parked behind it instead of being run right away, so that jobs with
+    the same key still complete in the order in which they were passed to `run`.
+
+    The number of parked jobs is bounded, so that `run` blocks once that limit is
+    reached. If a job still fails after the last retry, its exception is passed to the
+    failure handler of the job, if any, or is otherwise raised by the next call to
+    `run` or `close`. The same applies to errors of jobs parked behind another job.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        max_retries: int,
+        initial_delay: float,
+        max_delay: float,
+        max_pending: int,
+        is_retryable: Callable[[Exception], bool],
+    ):
+        """Initialize with the retry limits, the delays in seconds, and a predicate
+        deciding which errors are worth a retry.
+        """
+        if max_retries < 1:
+            raise ValueError("At least one retry is required.")
+
+        self._max_retries = max_retries
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._is_retryable = is_retryable
+        self._slots = asyncio.Semaphore(max_pending)
+        self._tasks: set[asyncio.Task] = set()
+        # the last parked job per key, which later jobs with that key wait for
+        self._tails: dict[str, asyncio.Task] = {}
+        self._failure: Optional[BaseException] = None
+        self._stats = RetrySchedulerStats()
+
+    @property
+    def stats(self) -> RetrySchedulerStats:
+        """A snapshot of the current statistics of this scheduler."""
+        return RetrySchedulerStats(**vars(self._stats))
+
+    def raise_failure(self) -> None:
+        """Re-raise the first exception of a job that exhausted its retries and was not
+        handled by a failure handler.
+        """
+        if self._failure is not None:
+            raise self._failure
+
+    def _delay(self, retry: int) -> float:
+        """Get the randomized delay in seconds before the given retry (starting at 1)."""
+        ceiling = min(
+            self._max_delay, self._initial_delay * BACKOFF_FACTOR ** (retry - 1)
+        )
+        return random.uniform(0, ceiling)  # noqa: S311
+
+    async def _retry(
+        self, job: Job, error: Exception, on_failure: Optional[FailureHandler]
+    ) -> None:
+        """Retry a failed job until it succeeds or its retries are exhausted."""
+        for retry in range(1, self._max_retries + 1):
+            delay = self._delay(retry)
+            log.warning(
+                "Retrying a failed job in %.2f seconds (retry %i of %i): %s",
+                delay,
+                retry,
+                self._max_retries,
+                error,
+            )
+            await asyncio.sleep(delay)
+            self._stats.retried += 1
+            try:
+                await job()
+            except Exception as retry_error:  # pylint: disable=broad-except
+                error = retry_error
+                if not self._is_retryable(error):
+                    break
+            else:
+                self._stats.recovered += 1
+                return
+
+        log.error("A job failed permanently: %s", error)
+        self._stats.exhausted += 1
+        if on_failure is None:
+            raise error
+        await on_failure(error)
+
+    async def _run_parked(
+        self,
+        job: Job,
+        *,
+        error: Optional[Exception],
+        on_failure: Optional[FailureHandler],
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        """Run a parked job once the previous job with the same key, if any, is done.
+        The job is only retried if it has failed already with the given error or fails
+        with a retryable error now.
+        """
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            if error is None:
+                try:
+                    await job()
+                    return
+                except Exception as first_error:  # pylint: disable=broad-except
+                    if not self._is_retryable(first_error):
+                        if on_failure is None:
+                            raise
+                        await on_failure(first_error)
+                        return
+                    error = first_error
+            await self._retry(job, error, on_failure)
+        except Exception as failure:  # pylint: disable=broad-except
+            if self._failure is None:
+                self._failure = failure
+        finally:
+            self._stats.pending -= 1
+            self._slots.release()
+
+    async def _park(
+        self,
+        job: Job,
+        *,
+        key: Optional[str],
+        error: Optional[Exception],
+        on_failure: Optional[FailureHandler],
+    ) -> None:
+        """Park a job to be run in the background behind the last parked job with the
+        same key. Blocks while the limit of parked jobs is reached.
+        """
+        await self._slots.acquire()
+        self._stats.pending += 1
+        task = asyncio.create_task(
+            self._run_parked(
+                job,
+                error=error,
+                on_failure=on_failure,
+                previous=self._tails.get(key) if key is not None else None,
+            )
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if key is not None:
+            self._tails[key] = task
+            task.add_done_callback(lambda _: self._forget_tail(key, task))
+
+    def _forget_tail(self, key: str, task: asyncio.Task) -> None:
+        """Stop holding back jobs with the given key once its last parked job is done."""
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def run(
+        self,
+        job: Job,
+        *,
+        key: Optional[str] = None,
+        on_failure: Optional[FailureHandler] = None,
+    ) -> None:
+        """Run a job and park it for a delayed retry if it fails with a retryable
+        error. Errors that are not retryable are raised right away. If provided, the
+        failure handler is called with the last error once the retries are exhausted.
+
+        If a job with the same key is parked, the job is parked behind it right away.
+
+        Blocks while the limit of parked jobs is reached. If a previously parked job
+        exhausted its retries, its exception is raised instead of running the job.
+        """
+        self.raise_failure()
+        if key is not None and key in self._tails:
+            await self._park(job, key=key, error=None, on_failure=on_failure)
+            return
+        try:
+            await job()
+        except Exception as error:
+            if not self._is_retryable(error):
+                raise
+            await self._park(job, key=key, error=error, on_failure=on_failure)
+
+    async def close(self) -> None:
+        """Wait for all parked jobs to complete their retries.
+
+        Raises the exception of the first job that exhausted its retries, if any.
+        """
+        await asyncio.gather(*self._tasks)
+        self.raise_failure()
@@ -0,0 +1,152 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A bounded pool of workers processing jobs concurrently while keeping the order of
+jobs that share the same key.
+"""
+
+import asyncio
+import logging
+import time
+import zlib
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class WorkerPoolStats:
+    """Statistics on the jobs of a worker pool."""
+
+    workers: int
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        """The mean time jobs waited in the queue before being started."""
+        started = self.running + self.completed
+        return self.total_wait_seconds / started if started else 0.0
+
+
+def split_capacity(total: int, weights: list[int]) -> list[int]:
+    """Split a capacity into shares proportional to the given weights using the
+    largest remainder method. Every share is at least one, even if that means
+    exceeding the total.
+    """
+    weight_sum = sum(weights)
+    exact = [total * weight / weight_sum for weight in weights]
+    shares = [int(share) for share in exact]
+    by_remainder = sorted(
+        range(len(weights)), key=lambda index: exact[index] - shares[index]
+    )
+    for index in reversed(by_remainder[len(weights) - (total - sum(shares)) :]):
+        shares[index] += 1
+    return [max(1, share) for share in shares]
+
+
+class KeyedWorkerPool:
+    """Distributes jobs over a fixed number of workers by hashing their key.
+
+    Jobs with the same key always end up in the queue of the same worker and are thus
+    processed in the order of submission. Jobs with different keys may be processed
+    concurrently. The number of jobs that are queued or running at the same time is
+    bounded, so that `submit` blocks once that limit is reached.
+
+    Jobs are expected to handle their own failures, e.g. by retrying or
+    dead-lettering. Errors that escape a job are logged and counted, but do not
+    affect other jobs or the pool.
+    """
+
+    def __init__(self, *, workers: int, max_in_flight: int):
+        """Initialize with the number of workers and the in-flight limit."""
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+        if max_in_flight < workers:
+            raise ValueError("The in-flight limit must not be lower than the workers.")
+
+        self._workers = workers
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._queues: list[asyncio.Queue[Optional[tuple[float, Job]]]] = [
+            asyncio.Queue() for _ in range(workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+        self._stats = WorkerPoolStats(workers=workers)
+
+    @property
+    def stats(self) -> WorkerPoolStats:
+        """A snapshot of the current statistics of this pool."""
+        return WorkerPoolStats(**vars(self._stats))
+
+    def _shard(self, key: str) -> int:
+        """Get the index of the worker responsible for the given key."""
+        return zlib.crc32(key.encode("utf-8")) % self._workers
+
+    def _start(self) -> None:
+        """Spawn the worker tasks if not running yet."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work(queue)) for queue in self._queues
+            ]
+
+    async def _work(self, queue: "asyncio.Queue[Optional[tuple[float, Job]]]") -> None:
+        """Process the jobs of one queue one after another."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            enqueued_at, job = item
+
+            wait_seconds = time.monotonic() - enqueued_at
+            self._stats.queued -= 1
+            self._stats.running += 1
+            self._stats.total_wait_seconds += wait_seconds
+            self._stats.max_wait_seconds = max(
+                self._stats.max_wait_seconds, wait_seconds
+            )
+            try:
+                await job()
+            except Exception as error:  # pylint: disable=broad-except
+                log.error("A job of the worker pool failed: %s", error)
+                self._stats.failed += 1
+            finally:
+                self._stats.running -= 1
+                self._stats.completed += 1
+                self._slots.release()
+
+    async def submit(self, *, key: str, job: Job) -> None:
+        """Schedule a job for the worker responsible for the given key.
+
+        Blocks while the in-flight limit is reached.
+        """
+        await self._slots.acquire()
+        self._start()
+        self._stats.queued += 1
+        self._queues[self._shard(key)].put_nowait((time.monotonic(), job))
+
+    async def close(self) -> None:
+        """Wait for all submitted jobs to complete and stop the workers."""
+        for queue in self._queues:
+            queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
@@ -15,10 +15,28 @@
 
 """DAO translators for accessing the database."""
 
+import json
+from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+
 from hexkit.protocols.dao import DaoFactoryProtocol
+from hexkit.providers.mongodb import MongoDbConfig
+from motor.core import AgnosticCollection, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
 
 from ifrs.core import models
-from ifrs.ports.outbound.dao import FileMetadataDaoPort
+from ifrs.ports.outbound.dao import (
+    FileFingerprintDaoPort,
+    FileMetadataDaoPort,
+    OutboxObjectDaoPort,
+    OutboxUsageDaoPort,
+    PendingRegistrationDaoPort,
+    RegistrationIntentDaoPort,
+    StagingObjectDaoPort,
+)
+
+FILE_METADATA_COLLECTION = "file_metadata"
+OUTBOX_OBJECTS_COLLECTION = "outbox_objects"
 
 
 class FileMetadataDaoConstructor:
@@ -32,7 +50,213 @@ class FileMetadataDaoConstructor:
         DaoFactoryProtocol.
         """
         return await dao_factory.get_dao(
-            name="file_metadata",
+            name=FILE_METADATA_COLLECTION,
             dto_model=models.FileMetadata,
             id_field="file_id",
         )
+
+
+class StagingObjectDaoConstructor:
+    """Constructor compatible with the hexkit.inject.AsyncConstructable type. Used to
+    construct a DAO for interacting with the staging objects queued for deletion.
+    """
+
+    @staticmethod
+    async def construct(*, dao_factory: DaoFactoryProtocol) -> StagingObjectDaoPort:
+        """Setup the DAOs using the specified provider of the
+        DaoFactoryProtocol.
+        """
+        return await dao_factory.get_dao(
+            name="staging_cleanup",
+            dto_model=models.StagingObject,
+            id_field="cleanup_id",
+        )
+
+
+class RegistrationIntentDaoConstructor:
+    """Constructor compatible with the hexkit.inject.AsyncConstructable type. Used to
+    construct a DAO for interacting with the journal of registrations in progress.
+    """
+
+    @staticmethod
+    async def construct(
+        *, dao_factory: DaoFactoryProtocol
+    ) -> RegistrationIntentDaoPort:
+        """Setup the DAOs using the specified provider of the
+        DaoFactoryProtocol.
+        """
+        return await dao_factory.get_dao(
+            name="registration_journal",
+            dto_model=models.RegistrationIntent,
+            id_field="file_id",
+        )
+
+
+class OutboxObjectDaoConstructor:
+    """Constructor compatible with the hexkit.inject.AsyncConstructable type. Used to
+    construct a DAO for interacting with the objects staged to outbox buckets of
+    limited capacity.
+    """
+
+    @staticmethod
+    async def construct(*, dao_factory: DaoFactoryProtocol) -> OutboxObjectDaoPort:
+        """Setup the DAOs using the specified provider of the
+        DaoFactoryProtocol.
+        """
+        return await dao_factory.get_dao(
+            name=OUTBOX_OBJECTS_COLLECTION,
+            dto_model=models.OutboxObject,
+            id_field="outbox_id",
+        )
+
+
+@asynccontextmanager
+async def connect_to_database(
+    *, config: MongoDbConfig
+) -> AsyncGenerator[AgnosticDatabase, None]:
+    """Connect to the configured database with a single client that is shared by the
+    DAOs using the database directly and that is closed once the context is left.
+    """
+    client = AsyncIOMotorClient(  # type: ignore
+        config.db_connection_str.get_secret_value()
+    )
+    try:
+        yield client[config.db_name]
+    finally:
+        client.close()
+
+
+class MongoDbFileFingerprintDao(FileFingerprintDaoPort):
+    """Reads the fingerprints of registered files from the file metadata collection
+    with a projection, so that the checksums of the file parts are not transferred.
+    Files with a pending registration are skipped.
+    """
+
+    def __init__(self, *, database: AgnosticDatabase):
+        """Initialize with the database containing the file metadata collection."""
+        self._collection = database[FILE_METADATA_COLLECTION]
+
+    async def get_fingerprints(
+        self, *, file_ids: Sequence[str]
+    ) -> dict[str, models.FileFingerprint]:
+        """Get the fingerprints of those of the given files that are registered, keyed
+        by file ID.
+        """
+        cursor = self._collection.find(
+            {"_id": {"$in": list(file_ids)}, "pending_since": None},
+            projection={"object_id": True, "fingerprint": True},
+        )
+        return {
+            document["_id"]: models.FileFingerprint(
+                file_id=document["_id"],
+                object_id=document["object_id"],
+                fingerprint=document.get("fingerprint"),
+            )
+            async for document in cursor
+        }
+
+
+class MongoDbPendingRegistrationDao(PendingRegistrationDaoPort):
+    """Changes the file metadata of pending registrations with conditional updates
+    and deletions, so that a registration attempt that is no longer the claimed one
+    cannot interfere with the current one.
+    """
+
+    def __init__(self, *, database: AgnosticDatabase):
+        """Initialize with the database containing the file metadata collection."""
+        self._collection = database[FILE_METADATA_COLLECTION]
+
+    async def complete(self, *, file_id: str, object_id: str) -> bool:
+        """Mark the pending registration of the file with the given object ID as
+        completed and return whether it was still pending with that object ID.
+        """
+        result = await self._collection.update_one(
+            {"_id": file_id, "object_id": object_id, "pending_since": {"$ne": None}},
+            {"$set": {"pending_since": None}},
+        )
+        return result.modified_count == 1
+
+    async def take_over(
+        self, *, file: models.FileMetadata, claimed: models.FileMetadata
+    ) -> bool:
+        """Replace the metadata of a pending registration with the given metadata of a
+        new registration attempt, if it is still claimed as given, and return whether
+        it has been replaced.
+        """
+        document = json.loads(file.model_dump_json())
+        document["_id"] = document.pop("file_id")
+        result = await self._collection.replace_one(
+            {
+                "_id": claimed.file_id,
+                "object_id": claimed.object_id,
+                "pending_since": claimed.pending_since,
+            },
+            document,
+        )
+        return result.modified_count == 1
+
+    async def abandon(self, *, file_id: str, object_id: str) -> bool:
+        """Delete the metadata of the file if its registration is still pending with
+        the given object ID and return whether it has been deleted.
+        """
+        result = await self._collection.delete_one(
+            {"_id": file_id, "object_id": object_id, "pending_since": {"$ne": None}}
+        )
+        return result.deleted_count == 1
+
+
+class MongoDbOutboxUsageDao(OutboxUsageDaoPort):
+    """Reads the usage of outbox buckets with an aggregation and their least recently
+    staged objects with a sorted cursor, so that the records of a storage node are
+    not all transferred with every eviction.
+    """
+
+    def __init__(self, *, collection: AgnosticCollection):
+        """Initialize with the outbox objects collection."""
+        self._collection = collection
+
+    @classmethod
+    async def construct(cls, *, database: AgnosticDatabase) -> "MongoDbOutboxUsageDao":
+        """Construct the DAO for the outbox objects collection of the given database.
+        The index used for sorting the records of a node by the time they were last
+        staged is created if it does not exist yet.
+        """
+        collection = database[OUTBOX_OBJECTS_COLLECTION]
+        await collection.create_index([("storage_alias", 1), ("last_staged", 1)])
+        return cls(collection=collection)
+
+    async def get_usage(self, *, storage_alias: str) -> int:
+        """Get the total size in bytes of the outbox objects recorded for a node."""
+        cursor = self._collection.aggregate(
+            [
+                {"$match": {"storage_alias": storage_alias}},
+                {"$group": {"_id": None, "usage": {"$sum": "$size"}}},
+            ]
+        )
+        async for result in cursor:
+            return result["usage"]
+        return 0
+
+    async def find_least_recently_staged(
+        self, *, storage_alias: str, staged_before: float
+    ) -> AsyncIterator[models.OutboxObject]:
+        """Iterate over the outbox objects recorded for a node that were last staged
+        no later than the given time, least recently staged first. The records are
+        read lazily, so that only as many are read as are consumed.
+        """
+        cursor = self._collection.find(
+            {"storage_alias": storage_alias, "last_staged": {"$lte": staged_before}}
+        ).sort("last_staged", 1)
+        async for document in cursor:
+            document["outbox_id"] = document.pop("_id")
+            yield models.OutboxObject.model_validate(document)
+
+    async def delete_if_unchanged(self, *, outbox_object: models.OutboxObject) -> bool:
+        """Delete the record of an outbox object only if it has not been staged again
+        since it was read, i.e. if the time it was last staged is unchanged, and
+        return whether it has been deleted.
+        """
+        result = await self._collection.delete_one(
+            {"_id": outbox_object.outbox_id, "last_staged": outbox_object.last_staged}
+        )
+        return result.deleted_count == 1
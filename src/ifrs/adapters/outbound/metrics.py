@@ -0,0 +1,233 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Metrics sinks keeping the recorded metrics in memory or recording them with the
+Prometheus client, optionally exposing them in the Prometheus text format.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import AsyncGenerator, Iterable, Mapping
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional, Union
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    make_wsgi_app,
+)
+from prometheus_client.exposition import ThreadingWSGIServer
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.ports.outbound.metrics import METRIC_DESCRIPTIONS, MetricsSinkPort
+
+log = logging.getLogger(__name__)
+
+Labels = tuple[tuple[str, str], ...]
+Metric = Union[Counter, Gauge, Histogram]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+
+class MetricsConfig(BaseSettings):
+    """Config parameters for exposing metrics."""
+
+    metrics_port: Optional[int] = Field(
+        default=None,
+        description=(
+            "The port on which metrics are served in the Prometheus text format at"
+            + " '/metrics'. If not set, metrics are not served."
+        ),
+        examples=[None, 9100],
+    )
+    metrics_host: str = Field(
+        default="127.0.0.1",
+        description=(
+            "The host address on which metrics are served. Only local clients can"
+            + " scrape the metrics by default."
+        ),
+        examples=["127.0.0.1", "0.0.0.0"],  # noqa: S104
+    )
+    metrics_request_timeout: float = Field(
+        default=10,
+        gt=0,
+        description=(
+            "The time in seconds after which connections to the metrics server are"
+            + " closed if the client stays idle while sending its request."
+        ),
+        examples=[10],
+    )
+
+
+def _labels_key(labels: Mapping[str, str]) -> Labels:
+    """Get a hashable key for a set of labels."""
+    return tuple(sorted(labels.items()))
+
+
+class InMemoryMetricsSink(MetricsSinkPort):
+    """Keeps all recorded metrics in memory, so that they can be inspected, e.g. in
+    tests. Histograms keep all of their observations.
+    """
+
+    def __init__(self):
+        """Initialize without any metrics."""
+        self.counters: dict[str, dict[Labels, float]] = defaultdict(dict)
+        self.gauges: dict[str, dict[Labels, float]] = defaultdict(dict)
+        self.observations: dict[str, dict[Labels, list[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+
+    def increment_counter(
+        self, name: str, *, labels: Mapping[str, str], value: float = 1
+    ) -> None:
+        """Increase the counter with the given name and labels by the given value."""
+        series = self.counters[name]
+        key = _labels_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, *, labels: Mapping[str, str], value: float) -> None:
+        """Set the gauge with the given name and labels to the given value."""
+        self.gauges[name][_labels_key(labels)] = value
+
+    def observe_histogram(
+        self, name: str, *, labels: Mapping[str, str], value: float
+    ) -> None:
+        """Record an observation in the histogram with the given name and labels."""
+        self.observations[name][_labels_key(labels)].append(value)
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        """Get the value of a counter or 0 if it has not been recorded."""
+        return self.counters[name].get(_labels_key(labels), 0)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Handles requests to the metrics server without logging each of them."""
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Skip the access log."""
+
+
+class PrometheusMetricsSink(MetricsSinkPort):
+    """Records metrics with the Prometheus client in a registry of its own, so that
+    they can be rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, *, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initialize with the upper bounds of the histogram buckets."""
+        self.buckets = buckets
+        self.registry = CollectorRegistry()
+        self._metrics: dict[str, Metric] = {}
+
+    def _get_series(
+        self, metric_class: type[Metric], name: str, labels: Mapping[str, str]
+    ) -> Any:
+        """Get the series of a metric with the given labels, registering the metric
+        on first use. All series of a metric must share the names of their labels.
+        """
+        metric = self._metrics.get(name)
+        if metric is None:
+            extra: dict[str, Any] = (
+                {"buckets": self.buckets} if metric_class is Histogram else {}
+            )
+            metric = self._metrics[name] = metric_class(
+                name,
+                METRIC_DESCRIPTIONS.get(name, name),
+                labelnames=sorted(labels),
+                registry=self.registry,
+                **extra,
+            )
+        return metric.labels(**labels) if labels else metric
+
+    def increment_counter(
+        self, name: str, *, labels: Mapping[str, str], value: float = 1
+    ) -> None:
+        """Increase the counter with the given name and labels by the given value."""
+        self._get_series(Counter, name, labels).inc(value)
+
+    def set_gauge(self, name: str, *, labels: Mapping[str, str], value: float) -> None:
+        """Set the gauge with the given name and labels to the given value."""
+        self._get_series(Gauge, name, labels).set(value)
+
+    def observe_histogram(
+        self, name: str, *, labels: Mapping[str, str], value: float
+    ) -> None:
+        """Record an observation in the histogram with the given name and labels."""
+        self._get_series(Histogram, name, labels).observe(value)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        return generate_latest(self.registry).decode("utf-8")
+
+    def _make_app(self) -> Callable[..., Iterable[bytes]]:
+        """Get a WSGI app serving the metrics at '/metrics' only."""
+        metrics_app = make_wsgi_app(self.registry)
+
+        def app(environ: dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+            if environ.get("PATH_INFO") != "/metrics":
+                start_response("404 Not Found", [("Content-Type", "text/plain")])
+                return [b"Not Found\n"]
+            return metrics_app(environ, start_response)
+
+        return app
+
+    @asynccontextmanager
+    async def serve(
+        self, *, host: str, port: int, request_timeout: float = 10
+    ) -> AsyncGenerator[None, None]:
+        """Serve the metrics over HTTP at '/metrics' from a background thread while
+        the context is active. Connections on which the client stays idle for longer
+        than the request timeout in seconds are closed.
+        """
+
+        class RequestHandler(QuietRequestHandler):
+            timeout = request_timeout
+
+        server = make_server(
+            host,
+            port,
+            self._make_app(),
+            server_class=ThreadingWSGIServer,
+            handler_class=RequestHandler,
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        log.info("Serving metrics on %s:%i.", host, port)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(server.shutdown)
+            server.server_close()
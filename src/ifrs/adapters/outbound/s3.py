@@ -15,5 +15,259 @@
 
 """Implementation of object storage adapters."""
 
+import asyncio
+import io
+from collections.abc import Sequence
+
+import botocore.exceptions
+from ghga_service_commons.utils.multinode_storage import (
+    ObjectStorages,
+    S3ObjectStoragesConfig,
+)
+
 # pylint: disable=unused-import
 from hexkit.providers.s3 import S3Config, S3ObjectStorage  # noqa: F401
+
+from ifrs.ports.outbound.storage import (
+    BatchDeleteObjectStoragePort,
+    MultipartObjectStoragePort,
+)
+
+DOWNLOAD_CHUNK_SIZE = 1024**2
+
+
+class MemoryViewReader(io.RawIOBase):
+    """A seekable, read-only file object on a memory view, used to upload the content
+    of a buffer without copying it into a bytes object first.
+    """
+
+    def __init__(self, content: memoryview):
+        """Initialize at the start of the given content."""
+        self._content = content
+        self._position = 0
+
+    def readable(self) -> bool:
+        """The content is readable."""
+        return True
+
+    def seekable(self) -> bool:
+        """The reader is seekable, so that uploads can be retried."""
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Read content into the given buffer."""
+        chunk = self._content[self._position : self._position + len(buffer)]
+        buffer[: len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Change the position in the content."""
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self._position,
+            io.SEEK_END: len(self._content),
+        }[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        """Get the position in the content."""
+        return self._position
+
+
+class MultipartS3ObjectStorage(
+    S3ObjectStorage, MultipartObjectStoragePort, BatchDeleteObjectStoragePort
+):
+    """An S3 object storage that supports filling the parts of a multipart upload
+    with byte ranges of other objects, either server-side via UploadPartCopy or from
+    memory via UploadPart, and deleting multiple objects via DeleteObjects.
+    """
+
+    async def upload_part_copy(  # noqa: PLR0913
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        source_bucket_id: str,
+        source_object_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> str:
+        """Copy the given inclusive byte range of the source object into the part with
+        the given number of a multipart upload and return the ETag of the part.
+        """
+        try:
+            response = await asyncio.to_thread(
+                self._client.upload_part_copy,
+                Bucket=bucket_id,
+                Key=object_id,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                CopySource={"Bucket": source_bucket_id, "Key": source_object_id},
+                CopySourceRange=f"bytes={first_byte}-{last_byte}",
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+        return response["CopyPartResult"]["ETag"]
+
+    def _download_range(
+        self, *, bucket_id: str, object_id: str, first_byte: int, buffer: memoryview
+    ) -> None:
+        """Download a byte range into the buffer, blocking until done."""
+        response = self._client.get_object(
+            Bucket=bucket_id,
+            Key=object_id,
+            Range=f"bytes={first_byte}-{first_byte + len(buffer) - 1}",
+        )
+        body = response["Body"]
+        position = 0
+        while position < len(buffer):
+            chunk = body.read(min(DOWNLOAD_CHUNK_SIZE, len(buffer) - position))
+            if not chunk:
+                raise self.ObjectError(
+                    f"The object with ID '{object_id}' in bucket '{bucket_id}' ended"
+                    + f" {len(buffer) - position} bytes before the requested range."
+                )
+            buffer[position : position + len(chunk)] = chunk
+            position += len(chunk)
+
+    async def download_range(
+        self, *, bucket_id: str, object_id: str, first_byte: int, buffer: memoryview
+    ) -> None:
+        """Download the byte range of an object starting at the given byte into the
+        given buffer, filling the buffer completely.
+        """
+        try:
+            await asyncio.to_thread(
+                self._download_range,
+                bucket_id=bucket_id,
+                object_id=object_id,
+                first_byte=first_byte,
+                buffer=buffer,
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+    async def upload_part(  # noqa: PLR0913
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        content: memoryview,
+    ) -> str:
+        """Upload the given content as the part with the given number of a multipart
+        upload and return the ETag of the part.
+        """
+        try:
+            response = await asyncio.to_thread(
+                self._client.upload_part,
+                Bucket=bucket_id,
+                Key=object_id,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=MemoryViewReader(content),
+                ContentLength=len(content),
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+        return response["ETag"]
+
+    async def complete_parts(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_etags: Sequence[str],
+    ) -> None:
+        """Complete a multipart upload consisting of the parts with the given ETags,
+        ordered by part number starting at 1.
+        """
+        try:
+            await asyncio.to_thread(
+                self._client.complete_multipart_upload,
+                Bucket=bucket_id,
+                Key=object_id,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"ETag": etag, "PartNumber": part_number}
+                        for part_number, etag in enumerate(part_etags, start=1)
+                    ]
+                },
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+    async def get_object_etag(self, *, bucket_id: str, object_id: str) -> str:
+        """Get the ETag of an object from its metadata, without surrounding quotes."""
+        try:
+            metadata = await asyncio.to_thread(
+                self._client.head_object, Bucket=bucket_id, Key=object_id
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+        return metadata["ETag"].strip('"')
+
+    async def delete_objects(
+        self, *, bucket_id: str, object_ids: Sequence[str]
+    ) -> list[str]:
+        """Delete the objects with the given IDs from a bucket, treating objects that
+        do not exist as deleted, and return the IDs of the objects that could not be
+        deleted. S3 accepts up to 1000 objects per request.
+        """
+        try:
+            response = await asyncio.to_thread(
+                self._client.delete_objects,
+                Bucket=bucket_id,
+                Delete={
+                    "Objects": [{"Key": object_id} for object_id in object_ids],
+                    "Quiet": True,
+                },
+            )
+        except botocore.exceptions.ClientError as error:
+            raise self._translate_s3_client_errors(
+                error, bucket_id=bucket_id
+            ) from error
+
+        return [error["Key"] for error in response.get("Errors", [])]
+
+
+class MultipartS3ObjectStorages(ObjectStorages):
+    """Multiple S3 storage nodes that support copying objects in parallel parts.
+
+    The object storage of a node is instantiated on first use and reused afterwards.
+    """
+
+    def __init__(self, *, config: S3ObjectStoragesConfig):
+        """Initialize with the config of all nodes."""
+        self._config = config
+        self._storages: dict[str, MultipartS3ObjectStorage] = {}
+
+    def for_alias(self, endpoint_alias: str) -> tuple[str, MultipartS3ObjectStorage]:
+        """Get bucket ID and object storage instance for a specific alias."""
+        node_config = self._config.object_storages[endpoint_alias]
+        storage = self._storages.get(endpoint_alias)
+        if storage is None:
+            storage = self._storages[endpoint_alias] = MultipartS3ObjectStorage(
+                config=node_config.credentials
+            )
+        return node_config.bucket, storage
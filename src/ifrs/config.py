@@ -20,9 +20,17 @@ from hexkit.config import config_from_yaml
 from hexkit.log import LoggingConfig
 from hexkit.providers.akafka import KafkaConfig
 from hexkit.providers.mongodb import MongoDbConfig
+from pydantic import model_validator
 
 from ifrs.adapters.inbound.event_sub import EventSubTranslatorConfig
 from ifrs.adapters.outbound.event_pub import EventPubTranslatorConfig
+from ifrs.adapters.outbound.metrics import MetricsConfig
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.metadata_cache import MetadataCacheConfig
+from ifrs.core.outbox_capacity import OutboxCapacityConfig
+from ifrs.core.registration_journal import RegistrationJournalConfig
+from ifrs.core.staging_cleanup import StagingCleanupConfig
+from ifrs.core.storage_budget import StorageBudgetConfig
 
 
 @config_from_yaml(prefix="ifrs")
@@ -32,11 +40,43 @@ class Config(
     EventSubTranslatorConfig,
     EventPubTranslatorConfig,
     S3ObjectStoragesConfig,
+    FileRegistryConfig,
+    StorageBudgetConfig,
+    StagingCleanupConfig,
+    RegistrationJournalConfig,
+    MetadataCacheConfig,
+    OutboxCapacityConfig,
+    MetricsConfig,
     LoggingConfig,
 ):
     """Config parameters and their defaults."""
 
     service_name: str = "internal_file_registry"
 
+    @model_validator(mode="after")
+    def check_outbox_eviction_min_age(self) -> "Config":
+        """Make sure that outbox objects are not evicted while the presence tracker
+        or the idempotency cache may still assume them to be present.
+        """
+        if not self.outbox_capacities:
+            return self
+        if (
+            self.outbox_presence_ttl > 0
+            and self.outbox_eviction_min_age <= self.outbox_presence_ttl
+        ):
+            raise ValueError(
+                "The outbox_eviction_min_age must be longer than the"
+                + " outbox_presence_ttl."
+            )
+        if (
+            self.idempotency_cache_size > 0
+            and self.outbox_eviction_min_age < self.idempotency_cache_ttl_seconds
+        ):
+            raise ValueError(
+                "The outbox_eviction_min_age must be at least as long as the"
+                + " idempotency_cache_ttl_seconds."
+            )
+        return self
+
 
 CONFIG = Config()  # type: ignore
@@ -0,0 +1,174 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Verification of copies against the stored checksums of the encrypted parts,
+without downloading the copied content.
+"""
+
+import hashlib
+import logging
+import math
+from collections.abc import Sequence
+from contextlib import suppress
+from typing import Optional
+
+from hexkit.protocols.objstorage import ObjectStorageProtocol
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.core.multipart_copy import MAX_PARTS, MIN_PART_SIZE, CopyPart
+from ifrs.core.streaming_copy import plan_stream_parts
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from ifrs.ports.outbound.storage import MultipartObjectStoragePort
+
+log = logging.getLogger(__name__)
+
+
+class CopyVerificationConfig(BaseSettings):
+    """Config parameters for verifying copies."""
+
+    verify_copies: bool = Field(
+        default=False,
+        description=(
+            "If True, copies are made in parts that line up with the encrypted parts"
+            + " of the file and the ETag of each copy is compared to the ETag derived"
+            + " from the stored MD5 checksums of these parts, which only requires"
+            + " the metadata of the copy. A mismatch fails the copy, so that it can"
+            + " be retried. This requires object storages with MD5-based ETags, i.e."
+            + " without SSE-KMS encryption. Copies of files with content preceded by"
+            + " an envelope or with encrypted parts that are too small for a"
+            + " multipart upload cannot be verified."
+        ),
+        examples=[False, True],
+    )
+
+
+def multipart_etag(part_md5s: Sequence[str]) -> str:
+    """Derive the ETag of an object uploaded in parts with the given MD5 checksums,
+    which is the MD5 checksum of the concatenated binary checksums of the parts
+    followed by the number of parts.
+    """
+    digest = hashlib.md5(
+        b"".join(bytes.fromhex(part_md5) for part_md5 in part_md5s),
+        usedforsecurity=False,
+    )
+    return f"{digest.hexdigest()}-{len(part_md5s)}"
+
+
+def plan_verifiable_parts(
+    *, file: models.FileMetadataBase, object_size: int
+) -> Optional[list[CopyPart]]:
+    """Split an object into parts that match the encrypted parts of the file one by
+    one, so that the ETag of a copy made in these parts can be derived from the
+    stored checksums. Returns None if that is not possible.
+    """
+    part_count = len(file.encrypted_parts_md5)
+    if (
+        file.content_offset != 0
+        or part_count == 0
+        or part_count > MAX_PARTS
+        or (part_count > 1 and file.encrypted_part_size < MIN_PART_SIZE)
+        or math.ceil(object_size / file.encrypted_part_size) != part_count
+    ):
+        return None
+    return plan_stream_parts(
+        object_size=object_size, part_size=file.encrypted_part_size
+    )
+
+
+class CopyVerifier:
+    """Plans copies in parts that match the stored checksums and verifies the copies
+    by their ETag.
+    """
+
+    def __init__(self, *, config: CopyVerificationConfig):
+        """Initialize with config parameters."""
+        self._config = config
+
+    async def plan_parts(  # noqa: PLR0913
+        self,
+        *,
+        file: models.FileMetadataBase,
+        source_storage: ObjectStorageProtocol,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_storage: ObjectStorageProtocol,
+        max_part_size: Optional[int] = None,
+    ) -> Optional[list[CopyPart]]:
+        """Get the parts in which an object must be copied to be verifiable or None if
+        verification is disabled or not possible for this copy. Parts must not exceed
+        the maximum part size, if given.
+        """
+        if not self._config.verify_copies:
+            return None
+
+        parts = None
+        if (
+            isinstance(source_storage, MultipartObjectStoragePort)
+            and isinstance(dest_storage, MultipartObjectStoragePort)
+            and (max_part_size is None or file.encrypted_part_size <= max_part_size)
+        ):
+            object_size = await source_storage.get_object_size(
+                bucket_id=source_bucket_id, object_id=source_object_id
+            )
+            parts = plan_verifiable_parts(file=file, object_size=object_size)
+
+        if parts is None:
+            log.warning(
+                "The copy of the content of the file with ID '%s' cannot be verified.",
+                file.file_id,
+                extra={"file_id": file.file_id},
+            )
+        return parts
+
+    async def verify(
+        self,
+        *,
+        file: models.FileMetadataBase,
+        object_storage: MultipartObjectStoragePort,
+        bucket_id: str,
+        object_id: str,
+    ) -> None:
+        """Compare the ETag of a copy made in the planned parts with the ETag derived
+        from the stored checksums and delete the copy if they differ.
+
+        Raises:
+            FileRegistryPort.CopyVerificationError: If the ETags differ.
+        """
+        expected_etag = multipart_etag(file.encrypted_parts_md5)
+        etag = await object_storage.get_object_etag(
+            bucket_id=bucket_id, object_id=object_id
+        )
+        if etag == expected_etag:
+            return
+
+        verification_error = FileRegistryPort.CopyVerificationError(
+            file_id=file.file_id,
+            object_id=object_id,
+            expected_etag=expected_etag,
+            etag=etag,
+        )
+        log.error(
+            verification_error,
+            extra={
+                "file_id": file.file_id,
+                "expected_etag": expected_etag,
+                "etag": etag,
+            },
+        )
+        with suppress(object_storage.ObjectNotFoundError):
+            await object_storage.delete_object(bucket_id=bucket_id, object_id=object_id)
+        raise verification_error
@@ -14,37 +14,218 @@
 # limitations under the License.
 
 """Main business-logic of this service"""
+import asyncio
 import logging
-import uuid
+import time
+from collections import defaultdict
+from collections.abc import Sequence
 from contextlib import suppress
+from typing import Literal, Optional
 
 from ghga_service_commons.utils.multinode_storage import ObjectStorages
+from hexkit.protocols.objstorage import ObjectStorageProtocol
+from pydantic import Field
 
-from ifrs.config import Config
 from ifrs.core import models
+from ifrs.core.copy_verification import CopyVerificationConfig, CopyVerifier
+from ifrs.core.fingerprints import FINGERPRINT_FIELDS, compute_fingerprint
+from ifrs.core.metadata_cache import MetadataCache
+from ifrs.core.multipart_copy import MultipartCopier, MultipartCopyConfig
+from ifrs.core.object_ids import (
+    ObjectIdConfig,
+    ObjectIdGenerator,
+    get_object_id_generator,
+)
+from ifrs.core.outbox_capacity import OutboxCapacity
+from ifrs.core.presence_tracker import PresenceTracker, PresenceTrackerConfig
+from ifrs.core.range_staging import RangeStager, plan_range
+from ifrs.core.registration_journal import RegistrationJournal
+from ifrs.core.single_flight import SingleFlight
+from ifrs.core.staging_cleanup import StagingCleanup
+from ifrs.core.storage_budget import StorageBudget, StorageBudgetConfig
+from ifrs.core.streaming_copy import StreamingCopier, StreamingCopyConfig
 from ifrs.ports.inbound.file_registry import FileRegistryPort
-from ifrs.ports.outbound.dao import FileMetadataDaoPort, ResourceNotFoundError
+from ifrs.ports.outbound.dao import (
+    FileFingerprintDaoPort,
+    FileMetadataDaoPort,
+    PendingRegistrationDaoPort,
+    ResourceAlreadyExistsError,
+    ResourceNotFoundError,
+)
 from ifrs.ports.outbound.event_pub import EventPublisherPort
+from ifrs.ports.outbound.storage import MultipartObjectStoragePort
 
 log = logging.getLogger(__name__)
 
+# identifies a staging request by outbox bucket, outbox object, file ID and checksum
+StageKey = tuple[str, str, str, str]
+
+
+class FileRegistryConfig(
+    MultipartCopyConfig,
+    StreamingCopyConfig,
+    CopyVerificationConfig,
+    ObjectIdConfig,
+    PresenceTrackerConfig,
+):
+    """Config parameters of the file registry core."""
+
+    deduplicate_staged_events: bool = Field(
+        default=False,
+        description=(
+            "Staging requests for the same outbox object that arrive while a copy to"
+            + " that object is in flight wait for that copy instead of starting"
+            + " another one. If True, only the request that performed the copy"
+            + " publishes a file_staged_for_download event. If False, each of the"
+            + " waiting requests publishes its own event."
+        ),
+        examples=[False, True],
+    )
+    bulk_registration_concurrency_per_storage: int = Field(
+        default=16,
+        ge=1,
+        description=(
+            "The maximum number of files of bulk registrations copied concurrently"
+            + " per storage alias."
+        ),
+        examples=[16],
+    )
+    bulk_staging_concurrency_per_storage: int = Field(
+        default=16,
+        ge=1,
+        description=(
+            "The maximum number of files of bulk stagings copied concurrently per"
+            + " storage alias."
+        ),
+        examples=[16],
+    )
+    optimistic_registration: bool = Field(
+        default=False,
+        description=(
+            "If True, the metadata of a file to register is inserted into the database"
+            + " without looking it up first, relying on the uniqueness of the file ID."
+            + " The file is only looked up if it turns out to be registered already."
+            + " The metadata is marked as pending until the content has been copied to"
+            + " the permanent storage, so that the file is treated as not registered in"
+            + " the meantime, and is removed again if the copy fails. Marking the"
+            + " registration as completed takes the place of the lookup, so this only"
+            + " pays off if the lookup is slower than a write. Only the registration"
+            + " attempt that inserted the pending metadata copies the content and"
+            + " publishes the registration, others are retried later."
+        ),
+        examples=[False, True],
+    )
+    registration_claim_timeout: float = Field(
+        default=3600,
+        gt=0,
+        description=(
+            "The time in seconds after which a pending optimistic registration is"
+            + " considered abandoned, e.g. because the service stopped during the copy,"
+            + " and is taken over by the next registration attempt for the file. Must"
+            + " exceed the duration of the longest copy to the permanent storage."
+        ),
+        examples=[3600],
+    )
+
 
 class FileRegistry(FileRegistryPort):
     """A service that manages a registry files stored on a permanent object storage."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         *,
         file_metadata_dao: FileMetadataDaoPort,
+        file_fingerprint_dao: FileFingerprintDaoPort,
+        pending_registration_dao: PendingRegistrationDaoPort,
         event_publisher: EventPublisherPort,
         object_storages: ObjectStorages,
-        config: Config,
+        config: FileRegistryConfig,
+        storage_budget: Optional[StorageBudget] = None,
+        staging_cleanup: Optional[StagingCleanup] = None,
+        object_id_generator: Optional[ObjectIdGenerator] = None,
+        registration_journal: Optional[RegistrationJournal] = None,
+        metadata_cache: Optional[MetadataCache] = None,
+        outbox_capacity: Optional[OutboxCapacity] = None,
     ):
-        """Initialize with essential config params and outbound adapters."""
+        """Initialize with essential config params and outbound adapters.
+
+        The copies performed by the registry are accounted for in the given storage
+        budget, if provided, so that it can be shared with inbound adapters. If a
+        staging cleanup is provided, the staging objects of registered files are
+        queued for deletion. Object IDs of new files are generated as configured
+        unless another generator is provided. If a registration journal is provided,
+        interrupted registrations are resumed from it. If a metadata cache is
+        provided, staging requests look up the metadata of registered files there. If
+        an outbox capacity is provided, staging requests are recorded in it, so that
+        the least recently staged objects can be evicted from the outbox.
+        """
         self._event_publisher = event_publisher
         self._file_metadata_dao = file_metadata_dao
+        self._file_fingerprint_dao = file_fingerprint_dao
+        self._pending_registration_dao = pending_registration_dao
         self._object_storages = object_storages
         self._config = config
+        self._copier = MultipartCopier(config=config)
+        self._streaming_copier = StreamingCopier(config=config)
+        self._verifier = CopyVerifier(config=config)
+        self._range_stager = RangeStager(
+            config=config, pool=self._streaming_copier.pool
+        )
+        self._presence = PresenceTracker(config=config)
+        self._storage_budget = storage_budget or StorageBudget(
+            config=StorageBudgetConfig()
+        )
+        self._staging_cleanup = staging_cleanup
+        self._generate_object_id = object_id_generator or get_object_id_generator(
+            config
+        )
+        self._registration_journal = registration_journal
+        self._metadata_cache = metadata_cache
+        self._outbox_capacity = outbox_capacity
+        self._bulk_staging_slots: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(config.bulk_staging_concurrency_per_storage)
+        )
+        self._bulk_registration_slots: defaultdict[
+            str, asyncio.Semaphore
+        ] = defaultdict(
+            lambda: asyncio.Semaphore(config.bulk_registration_concurrency_per_storage)
+        )
+        self._stage_flights: SingleFlight[
+            StageKey, tuple[models.FileMetadata, bool]
+        ] = SingleFlight()
+
+    async def _is_identical_to_registered(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        registered: models.FileFingerprint,
+    ) -> bool:
+        """Compares the provided metadata with the one of an already registered file
+        by their fingerprints. Only if the registered file has no fingerprint yet, its
+        full metadata is fetched and compared.
+        Returns `True` if both are identical and raises self.FileUpdateError otherwise.
+
+        Raises:
+            ResourceNotFoundError:
+                If a file without fingerprint has been deleted in the meantime.
+        """
+        if registered.fingerprint is not None:
+            identical = (
+                compute_fingerprint(file_without_object_id) == registered.fingerprint
+            )
+        else:
+            registered_file = await self._file_metadata_dao.get_by_id(
+                registered.file_id
+            )
+            # object ID is a UUID generated upon registration, so cannot compare those
+            identical = file_without_object_id.model_dump(
+                include=FINGERPRINT_FIELDS
+            ) == registered_file.model_dump(include=FINGERPRINT_FIELDS)
+
+        if identical:
+            return True
+
+        raise self.FileUpdateError(file_id=file_without_object_id.file_id)
 
     async def _is_file_registered(
         self, *, file_without_object_id: models.FileMetadataBase
@@ -55,112 +236,1194 @@ class FileRegistry(FileRegistryPort):
               provided one => returns `True`
             - Yes, however, the metadata differs => raises self.FileUpdateError
             - No, the file has not been registered, yet => returns `False`
+
+        Only the fingerprint of a registered file is read from the database.
         """
+        file_id = file_without_object_id.file_id
+        registered = (
+            await self._file_fingerprint_dao.get_fingerprints(file_ids=[file_id])
+        ).get(file_id)
+        if registered is None:
+            return False
+
         try:
-            registered_file = await self._file_metadata_dao.get_by_id(
-                file_without_object_id.file_id
+            return await self._is_identical_to_registered(
+                file_without_object_id=file_without_object_id, registered=registered
             )
         except ResourceNotFoundError:
             return False
 
-        # object ID is a UUID generated upon registration, so cannot compare those
-        registered_file_without_object_id = registered_file.model_dump(
-            exclude={"object_id"}
+    def _get_permanent_storage(
+        self, storage_alias: str
+    ) -> tuple[str, ObjectStorageProtocol]:
+        """Get the permanent bucket ID and the object storage for the given alias.
+
+        Raises:
+            ValueError: When the storage alias is not configured.
+        """
+        try:
+            return self._object_storages.for_alias(storage_alias)
+        except KeyError as error:
+            alias_not_configured = ValueError(
+                f"Storage alias '{storage_alias}' not configured."
+            )
+            log.critical(alias_not_configured, extra={"storage_alias": storage_alias})
+            raise alias_not_configured from error
+
+    def _get_bucket_storage(
+        self, *, bucket_id: str, storage_alias: str
+    ) -> tuple[str, ObjectStorageProtocol]:
+        """Get the storage alias and the object storage of the node hosting a staging
+        or outbox bucket that is used for a file with the given storage alias.
+        """
+        bucket_alias = self._config.bucket_storage_aliases.get(bucket_id, storage_alias)
+        _, object_storage = self._get_permanent_storage(bucket_alias)
+        return bucket_alias, object_storage
+
+    async def _is_in_staging(
+        self, *, staging_object_id: str, staging_bucket_id: str, storage_alias: str
+    ) -> bool:
+        """Checks whether the content of a file with the given storage alias is present
+        in the staging bucket.
+        """
+        _, object_storage = self._get_bucket_storage(
+            bucket_id=staging_bucket_id, storage_alias=storage_alias
+        )
+        return await object_storage.does_object_exist(
+            bucket_id=staging_bucket_id, object_id=staging_object_id
+        )
+
+    async def _does_object_exist(
+        self, *, storage_alias: str, bucket_id: str, object_id: str, ttl: float
+    ) -> bool:
+        """Checks whether an object exists unless it is already known to be present.
+        An object found to exist is tracked as present for the given time in seconds.
+        """
+        if self._presence.is_present(
+            storage_alias=storage_alias, bucket_id=bucket_id, object_id=object_id
+        ):
+            return True
+
+        _, object_storage = self._get_permanent_storage(storage_alias)
+        exists = await object_storage.does_object_exist(
+            bucket_id=bucket_id, object_id=object_id
+        )
+        if exists:
+            self._presence.mark_present(
+                storage_alias=storage_alias,
+                bucket_id=bucket_id,
+                object_id=object_id,
+                ttl=ttl,
+            )
+        return exists
+
+    async def _copy_object(  # noqa: PLR0913
+        self,
+        *,
+        file: models.FileMetadataBase,
+        source_alias: str,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_alias: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> None:
+        """Copies an object with the content of a file, server-side if source and
+        destination are located on the same node and streamed otherwise. If copies are
+        verified, the copy is made in parts that match the encrypted parts and its
+        ETag is compared to the one derived from the checksums of these parts.
+        """
+        _, source_storage = self._get_permanent_storage(source_alias)
+        _, dest_storage = self._get_permanent_storage(dest_alias)
+        server_side = source_alias == dest_alias
+        parts = await self._verifier.plan_parts(
+            file=file,
+            source_storage=source_storage,
+            source_bucket_id=source_bucket_id,
+            source_object_id=source_object_id,
+            dest_storage=dest_storage,
+            max_part_size=(
+                None if server_side else self._streaming_copier.pool.buffer_size
+            ),
+        )
+
+        if server_side:
+            await self._copier.copy_object(
+                file=file,
+                object_storage=source_storage,
+                source_bucket_id=source_bucket_id,
+                source_object_id=source_object_id,
+                dest_bucket_id=dest_bucket_id,
+                dest_object_id=dest_object_id,
+                parts=parts,
+            )
+        else:
+            await self._streaming_copier.copy_object(
+                source_storage=source_storage,
+                source_bucket_id=source_bucket_id,
+                source_object_id=source_object_id,
+                dest_storage=dest_storage,
+                dest_bucket_id=dest_bucket_id,
+                dest_object_id=dest_object_id,
+                parts=parts,
+            )
+
+        if parts is not None and isinstance(dest_storage, MultipartObjectStoragePort):
+            await self._verifier.verify(
+                file=file,
+                object_storage=dest_storage,
+                bucket_id=dest_bucket_id,
+                object_id=dest_object_id,
+            )
+
+    async def _queue_staging_cleanup(
+        self,
+        *,
+        file: models.FileMetadata,
+        staging_object_id: str,
+        staging_bucket_id: str,
+    ) -> None:
+        """Queues the staging object of a registered file for deletion, if enabled.
+        As the registration is already committed, failures are only logged.
+        """
+        if self._staging_cleanup is None:
+            return
+        try:
+            await self._staging_cleanup.enqueue(
+                storage_alias=self._get_bucket_storage(
+                    bucket_id=staging_bucket_id, storage_alias=file.storage_alias
+                )[0],
+                bucket_id=staging_bucket_id,
+                object_id=staging_object_id,
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Could not queue the staging object of the file with ID '%s' for"
+                + " deletion: %s",
+                file.file_id,
+                error,
+                extra={"file_id": file.file_id},
+            )
+
+    def _content_not_in_staging(
+        self, *, file_id: str
+    ) -> FileRegistryPort.FileContentNotInStagingError:
+        """Logs and returns the error for file content missing from staging."""
+        content_not_in_staging = self.FileContentNotInStagingError(file_id=file_id)
+        log.error(content_not_in_staging, extra={"file_id": file_id})
+        return content_not_in_staging
+
+    def _assign_object_id(
+        self, *, file_without_object_id: models.FileMetadataBase
+    ) -> models.FileMetadata:
+        """Assigns a newly generated object ID to a file that is not yet registered."""
+        log.info(
+            "File with ID '%s' is not yet registered. Generating object ID.",
+            file_without_object_id.file_id,
+        )
+        object_id = self._generate_object_id()
+        return models.FileMetadata(
+            **file_without_object_id.model_dump(),
+            object_id=object_id,
+            fingerprint=compute_fingerprint(file_without_object_id),
+        )
+
+    async def _copy_content(
+        self,
+        *,
+        file: models.FileMetadata,
+        staging_object_id: str,
+        staging_bucket_id: str,
+        permanent_bucket_id: str,
+    ) -> None:
+        """Copies the content of a file from the staging into the permanent storage
+        under the object ID assigned to the file.
+        """
+        # the size of the encrypted content is approximated by the decrypted size
+        async with self._storage_budget.track_copy(
+            storage_alias=file.storage_alias, size=file.decrypted_size
+        ):
+            await self._copy_object(
+                file=file,
+                source_alias=self._get_bucket_storage(
+                    bucket_id=staging_bucket_id, storage_alias=file.storage_alias
+                )[0],
+                source_bucket_id=staging_bucket_id,
+                source_object_id=staging_object_id,
+                dest_alias=file.storage_alias,
+                dest_bucket_id=permanent_bucket_id,
+                dest_object_id=file.object_id,
+            )
+        self._presence.mark_present(
+            storage_alias=file.storage_alias,
+            bucket_id=permanent_bucket_id,
+            object_id=file.object_id,
+            ttl=self._config.permanent_presence_ttl,
+        )
+
+    async def _resume_or_assign_object_id(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        permanent_bucket_id: str,
+    ) -> tuple[models.FileMetadata, bool]:
+        """Reuses the object ID of an interrupted registration of the file recorded in
+        the registration journal, if any, and assigns a new object ID otherwise.
+
+        Returns:
+            The metadata of the file along with whether its content has already been
+            copied to the permanent storage.
+        """
+        file_id = file_without_object_id.file_id
+        intent = (
+            await self._registration_journal.get_intent(file_id=file_id)
+            if self._registration_journal
+            else None
+        )
+        if (
+            intent is None
+            or intent.storage_alias != file_without_object_id.storage_alias
+        ):
+            file = self._assign_object_id(file_without_object_id=file_without_object_id)
+            return file, False
+
+        log.info(
+            "Resuming the interrupted registration of file with ID '%s' with object"
+            + " ID '%s'.",
+            file_id,
+            intent.object_id,
+        )
+        file = models.FileMetadata(
+            **file_without_object_id.model_dump(),
+            object_id=intent.object_id,
+            fingerprint=compute_fingerprint(file_without_object_id),
+        )
+        _, object_storage = self._get_permanent_storage(file.storage_alias)
+        if not await object_storage.does_object_exist(
+            bucket_id=permanent_bucket_id, object_id=file.object_id
+        ):
+            return file, False
+        if intent.phase == "copied" and intent.fingerprint == file.fingerprint:
+            return file, True
+
+        # the copy may be incomplete or of content that no longer matches the metadata
+        log.info("Removing the previous copy of file with ID '%s'.", file_id)
+        await object_storage.delete_object(
+            bucket_id=permanent_bucket_id, object_id=file.object_id
+        )
+        return file, False
+
+    async def _copy_to_permanent_storage(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+        permanent_bucket_id: str,
+    ) -> models.FileMetadata:
+        """Assigns an object ID to a file that is not yet registered and copies its
+        content from the staging into the permanent storage. The presence of the
+        content in the staging bucket must have been checked beforehand.
+
+        If enabled, the progress is recorded in the registration journal, so that an
+        interrupted registration reuses the object ID and, if complete, the copy.
+        """
+        file, copied = await self._resume_or_assign_object_id(
+            file_without_object_id=file_without_object_id,
+            permanent_bucket_id=permanent_bucket_id,
+        )
+        if copied:
+            log.info(
+                "Content of file with ID '%s' has already been copied.", file.file_id
+            )
+            return file
+
+        if self._registration_journal:
+            await self._registration_journal.record(file=file, phase="copying")
+        await self._copy_content(
+            file=file,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            permanent_bucket_id=permanent_bucket_id,
+        )
+        if self._registration_journal:
+            await self._registration_journal.record(file=file, phase="copied")
+        return file
+
+    async def _discard_uninserted_copy(
+        self,
+        *,
+        file: models.FileMetadata,
+        permanent_bucket_id: str,
+        journaled: bool = True,
+    ) -> None:
+        """Removes the permanent copy of a file whose metadata could not be inserted,
+        so that no object without corresponding metadata is left behind.
+
+        The copy is kept if the file turns out to be registered with its object ID,
+        e.g. because the insert took effect despite the error, or if this cannot be
+        determined. If the file is not registered and the copy has been recorded in
+        the registration journal, if used, the copy is kept as well, since it is
+        reused by a retry. Failures are only logged, as the caller raises anyway.
+        """
+        file_id = file.file_id
+        try:
+            registered: Optional[
+                models.FileMetadata
+            ] = await self._file_metadata_dao.get_by_id(file_id)
+        except ResourceNotFoundError:
+            registered = None
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Could not check whether the file with ID '%s' has been registered,"
+                + " keeping its copy: %s",
+                file_id,
+                error,
+                extra={"file_id": file_id},
+            )
+            return
+
+        if registered is not None and registered.object_id == file.object_id:
+            await self._complete_registration(file_id=file_id)
+            return
+        if registered is None and journaled and self._registration_journal is not None:
+            return
+
+        log.warning(
+            "Removing the copy of file with ID '%s' whose metadata could not be"
+            + " inserted.",
+            file_id,
+            extra={"file_id": file_id},
+        )
+        _, object_storage = self._get_permanent_storage(file.storage_alias)
+        try:
+            with suppress(object_storage.ObjectNotFoundError):
+                await object_storage.delete_object(
+                    bucket_id=permanent_bucket_id, object_id=file.object_id
+                )
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Could not remove the copy of file with ID '%s': %s",
+                file_id,
+                error,
+                extra={"file_id": file_id},
+            )
+            return
+        self._presence.forget(
+            storage_alias=file.storage_alias,
+            bucket_id=permanent_bucket_id,
+            object_id=file.object_id,
+        )
+        if registered is not None:
+            # registered concurrently under another object ID, nothing to resume
+            await self._complete_registration(file_id=file_id)
+
+    async def _insert_copied_file(
+        self, *, file: models.FileMetadata, permanent_bucket_id: str
+    ) -> None:
+        """Inserts the metadata of a file whose content has been copied to the
+        permanent storage. If the insert fails, the copy is discarded before the error
+        is raised.
+        """
+        log.info("Inserting file with file ID '%s'.", file.file_id)
+        try:
+            await self._file_metadata_dao.insert(file)
+        except Exception:
+            await self._discard_uninserted_copy(
+                file=file, permanent_bucket_id=permanent_bucket_id
+            )
+            raise
+        await self._complete_registration(file_id=file.file_id)
+
+    async def _complete_registration(self, *, file_id: str) -> None:
+        """Removes the journal entry of a file whose metadata has been inserted. As
+        the registration is already committed, failures are only logged.
+        """
+        if self._registration_journal is None:
+            return
+        try:
+            await self._registration_journal.complete(file_id=file_id)
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Could not remove the registration journal entry of the file with ID"
+                + " '%s': %s",
+                file_id,
+                error,
+                extra={"file_id": file_id},
+            )
+
+    async def _register_after_lookup(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+        permanent_bucket_id: str,
+    ) -> Optional[models.FileMetadata]:
+        """Looks up the file and, if it is not yet registered, copies its content to
+        the permanent storage and inserts its metadata.
+
+        Returns:
+            The metadata of the newly registered file or `None` if the file has
+            already been registered.
+        """
+        # the check of the staging bucket only matters if the file is not yet
+        # registered, it is started along with the lookup in the database to save a
+        # round trip for new files and cancelled if the file is known already
+        staging_check = asyncio.create_task(
+            self._is_in_staging(
+                staging_object_id=staging_object_id,
+                staging_bucket_id=staging_bucket_id,
+                storage_alias=file_without_object_id.storage_alias,
+            )
+        )
+        try:
+            is_registered: Optional[bool] = await self._is_file_registered(
+                file_without_object_id=file_without_object_id
+            )
+        except self.FileUpdateError as error:
+            # trying to re-register with different metadata should not crash the consumer
+            # this is not a service internal inconsistency and would cause unnecessary
+            # crashes on additional consumption attempts
+            log.error(error)
+            is_registered = None
+        except BaseException:
+            staging_check.cancel()
+            await asyncio.gather(staging_check, return_exceptions=True)
+            raise
+
+        if is_registered is not False:
+            staging_check.cancel()
+            await asyncio.gather(staging_check, return_exceptions=True)
+            if is_registered:
+                # There is nothing to do:
+                log.info(
+                    "File with ID '%s' is already registered.",
+                    file_without_object_id.file_id,
+                )
+            return None
+
+        if not await staging_check:
+            raise self._content_not_in_staging(file_id=file_without_object_id.file_id)
+
+        file = await self._copy_to_permanent_storage(
+            file_without_object_id=file_without_object_id,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            permanent_bucket_id=permanent_bucket_id,
+        )
+        await self._insert_copied_file(
+            file=file, permanent_bucket_id=permanent_bucket_id
+        )
+        return file
+
+    async def _was_registered_before(
+        self, *, file_without_object_id: models.FileMetadataBase
+    ) -> bool:
+        """Checks if the file has been registered before as part of the optimistic
+        registration. Metadata differing from the registered one is logged as error.
+        """
+        try:
+            is_registered = await self._is_file_registered(
+                file_without_object_id=file_without_object_id
+            )
+        except self.FileUpdateError as error:
+            # see `_register_after_lookup` for why this is not raised
+            log.error(error)
+            return True
+
+        if is_registered:
+            log.info(
+                "File with ID '%s' is already registered.",
+                file_without_object_id.file_id,
+            )
+        return is_registered
+
+    async def _remove_abandoned_copy(
+        self, *, abandoned: models.FileMetadata, permanent_bucket_id: str
+    ) -> None:
+        """Removes the permanent object of an abandoned registration attempt, if any.
+        Failures are only logged, as the object is not referenced by any metadata.
+        """
+        _, object_storage = self._get_permanent_storage(abandoned.storage_alias)
+        try:
+            with suppress(object_storage.ObjectNotFoundError):
+                await object_storage.delete_object(
+                    bucket_id=permanent_bucket_id, object_id=abandoned.object_id
+                )
+        except Exception as error:  # pylint: disable=broad-except
+            log.warning(
+                "Could not remove the copy '%s' of an abandoned registration of the"
+                + " file with ID '%s': %s",
+                abandoned.object_id,
+                abandoned.file_id,
+                error,
+                extra={"file_id": abandoned.file_id},
+            )
+        self._presence.forget(
+            storage_alias=abandoned.storage_alias,
+            bucket_id=permanent_bucket_id,
+            object_id=abandoned.object_id,
+        )
+
+    async def _claim_registered_file(
+        self,
+        *,
+        file: models.FileMetadata,
+        registered: models.FileMetadata,
+        permanent_bucket_id: str,
+    ) -> bool:
+        """Checks a file found to be registered by an optimistic registration. If its
+        registration is pending but has been claimed for longer than the configured
+        timeout, the claim is taken over with the given metadata of this attempt.
+
+        Returns:
+            Whether the claim has been taken over. If not, the file has already been
+            registered.
+
+        Raises:
+            self.RegistrationInProgressError:
+                If another registration attempt is still claiming the file.
+        """
+        file_id = file.file_id
+        if registered.pending_since is None:
+            if file.model_dump(include=FINGERPRINT_FIELDS) != registered.model_dump(
+                include=FINGERPRINT_FIELDS
+            ):
+                # see `_register_after_lookup` for why this is not raised
+                log.error(self.FileUpdateError(file_id=file_id))
+            else:
+                log.info("File with ID '%s' is already registered.", file_id)
+            return False
+
+        claimed_for = time.time() - registered.pending_since
+        if (
+            claimed_for < self._config.registration_claim_timeout
+            or not await self._pending_registration_dao.take_over(
+                file=file, claimed=registered
+            )
+        ):
+            raise self.RegistrationInProgressError(file_id=file_id)
+
+        log.warning(
+            "Taking over the registration of the file with ID '%s' that has been"
+            + " pending for %.0f seconds.",
+            file_id,
+            claimed_for,
+            extra={"file_id": file_id},
+        )
+        await self._remove_abandoned_copy(
+            abandoned=registered, permanent_bucket_id=permanent_bucket_id
+        )
+        return True
+
+    async def _copy_claimed_content(
+        self,
+        *,
+        file: models.FileMetadata,
+        staging_object_id: str,
+        staging_bucket_id: str,
+        permanent_bucket_id: str,
+    ) -> bool:
+        """Copies the content of a file whose pending registration has been claimed by
+        this attempt and marks the registration as completed. If the copy fails, the
+        pending metadata is removed again, unless the claim has been taken over.
+
+        Returns:
+            Whether the registration has been completed by this attempt. If not, the
+            claim has been taken over or the file has been deleted in the meantime.
+        """
+        try:
+            await self._copy_content(
+                file=file,
+                staging_object_id=staging_object_id,
+                staging_bucket_id=staging_bucket_id,
+                permanent_bucket_id=permanent_bucket_id,
+            )
+        except BaseException:
+            log.warning(
+                "Copying the content of file with ID '%s' failed, removing its"
+                + " pending metadata again.",
+                file.file_id,
+            )
+            await self._pending_registration_dao.abandon(
+                file_id=file.file_id, object_id=file.object_id
+            )
+            raise
+
+        if await self._pending_registration_dao.complete(
+            file_id=file.file_id, object_id=file.object_id
+        ):
+            return True
+
+        log.warning(
+            "The registration of the file with ID '%s' is no longer claimed by this"
+            + " attempt.",
+            file.file_id,
+            extra={"file_id": file.file_id},
+        )
+        await self._discard_uninserted_copy(
+            file=file, permanent_bucket_id=permanent_bucket_id, journaled=False
+        )
+        return False
+
+    async def _register_optimistically(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+        permanent_bucket_id: str,
+    ) -> Optional[models.FileMetadata]:
+        """Inserts the metadata of the file without looking it up first, relying on
+        the uniqueness of the file ID, and copies its content to the permanent storage
+        afterwards. The file is only looked up if the insert fails because of an
+        existing file or if its content is not in the staging bucket.
+
+        The metadata is inserted as pending, which claims the registration for this
+        attempt, so that a copy is never performed for a file that has been
+        registered concurrently. Pending files are treated as not registered. Once the
+        content has been copied, the registration is marked as completed. If the copy
+        fails, the pending metadata is removed again. If the service stops during the
+        copy, the claim is taken over by a retry after the configured timeout.
+
+        Returns:
+            The metadata of the newly registered file or `None` if the file has
+            already been registered.
+
+        Raises:
+            self.RegistrationInProgressError:
+                If another registration attempt is still claiming the file.
+        """
+        if not await self._is_in_staging(
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            storage_alias=file_without_object_id.storage_alias,
+        ):
+            if await self._was_registered_before(
+                file_without_object_id=file_without_object_id
+            ):
+                return None
+            raise self._content_not_in_staging(file_id=file_without_object_id.file_id)
+
+        file = self._assign_object_id(
+            file_without_object_id=file_without_object_id
+        ).model_copy(update={"pending_since": time.time()})
+        log.info("Inserting file with file ID '%s'.", file.file_id)
+        try:
+            await self._file_metadata_dao.insert(file)
+        except ResourceAlreadyExistsError as error:
+            try:
+                registered = await self._file_metadata_dao.get_by_id(file.file_id)
+            except ResourceNotFoundError:
+                # the existing file has been deleted in the meantime
+                raise error from None
+            if not await self._claim_registered_file(
+                file=file,
+                registered=registered,
+                permanent_bucket_id=permanent_bucket_id,
+            ):
+                return None
+
+        if not await self._copy_claimed_content(
+            file=file,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            permanent_bucket_id=permanent_bucket_id,
+        ):
+            return None
+        return file.model_copy(update={"pending_since": None})
+
+    async def register_file(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+    ) -> None:
+        """Registers a file and moves its content from the staging into the permanent
+        storage. If the file with that exact metadata has already been registered,
+        nothing is done.
+
+        Args:
+            file_without_object_id: metadata on the file to register.
+            staging_object_id:
+                The S3 object ID for the staging bucket.
+            staging_bucket_id:
+                The S3 bucket ID for staging.
+
+        Raises:
+            self.FileContentNotInStagingError:
+                When the file content is not present in the storage staging.
+        """
+        permanent_bucket_id, _ = self._get_permanent_storage(
+            file_without_object_id.storage_alias
+        )
+
+        register = (
+            self._register_optimistically
+            if self._config.optimistic_registration
+            else self._register_after_lookup
+        )
+        file = await register(
+            file_without_object_id=file_without_object_id,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+            permanent_bucket_id=permanent_bucket_id,
+        )
+        if file is None:
+            return
+
+        await self._event_publisher.file_internally_registered(
+            file=file, bucket_id=permanent_bucket_id
+        )
+        await self._queue_staging_cleanup(
+            file=file,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=staging_bucket_id,
+        )
+
+    async def _filter_unregistered(
+        self, *, requests: Sequence[models.FileRegistrationRequest]
+    ) -> tuple[list[int], dict[int, models.FileRegistrationOutcome]]:
+        """Looks up all requested files in a single query and returns the indices of
+        the requests for files that are not yet registered along with the outcomes of
+        the other requests by index. Files that are already registered or that occur
+        multiple times are handled like repeated calls of `register_file`.
+        """
+        file_ids = [request.file_without_object_id.file_id for request in requests]
+        known_files = await self._file_fingerprint_dao.get_fingerprints(
+            file_ids=file_ids
+        )
+        # fingerprints of the files of this batch that are not registered yet
+        batch_fingerprints: dict[str, str] = {}
+
+        unregistered: list[int] = []
+        outcomes: dict[int, models.FileRegistrationOutcome] = {}
+        for index, request in enumerate(requests):
+            file_without_object_id = request.file_without_object_id
+            file_id = file_without_object_id.file_id
+            registered = known_files.get(file_id)
+            if registered is None and file_id not in batch_fingerprints:
+                batch_fingerprints[file_id] = compute_fingerprint(
+                    file_without_object_id
+                )
+                unregistered.append(index)
+                continue
+
+            try:
+                if registered is not None:
+                    await self._is_identical_to_registered(
+                        file_without_object_id=file_without_object_id,
+                        registered=registered,
+                    )
+                elif (
+                    compute_fingerprint(file_without_object_id)
+                    != batch_fingerprints[file_id]
+                ):
+                    raise self.FileUpdateError(file_id=file_id)
+            except self.FileUpdateError as error:
+                # see `register_file` for why this is not raised
+                log.error(error)
+                outcomes[index] = self._failure_outcome(file_id=file_id, error=error)
+                continue
+            log.info("File with ID '%s' is already registered.", file_id)
+            outcomes[index] = models.FileRegistrationOutcome(
+                file_id=file_id,
+                outcome="already_registered",
+                object_id=registered.object_id if registered else None,
+            )
+
+        return unregistered, outcomes
+
+    def _failure_kind(self, error: BaseException) -> Literal["rejected", "failed"]:
+        """Distinguishes invalid requests from failures that may be retried."""
+        return "rejected" if isinstance(error, self.InvalidRequestError) else "failed"
+
+    def _failure_outcome(
+        self, *, file_id: str, error: BaseException
+    ) -> models.FileRegistrationOutcome:
+        """Describes a failed registration."""
+        return models.FileRegistrationOutcome(
+            file_id=file_id,
+            outcome=self._failure_kind(error),
+            error=str(error) or type(error).__name__,
+        )
+
+    async def _register_copied_file(
+        self, *, request: models.FileRegistrationRequest
+    ) -> tuple[models.FileMetadata, str]:
+        """Copies the content of a file that is not yet registered into the permanent
+        storage and returns its metadata along with the ID of the permanent bucket.
+        The number of these copies in flight is bounded per storage alias.
+        """
+        storage_alias = request.file_without_object_id.storage_alias
+        permanent_bucket_id, _ = self._get_permanent_storage(storage_alias)
+        async with self._bulk_registration_slots[storage_alias]:
+            if not await self._is_in_staging(
+                staging_object_id=request.staging_object_id,
+                staging_bucket_id=request.staging_bucket_id,
+                storage_alias=storage_alias,
+            ):
+                raise self._content_not_in_staging(
+                    file_id=request.file_without_object_id.file_id
+                )
+
+            file = await self._copy_to_permanent_storage(
+                file_without_object_id=request.file_without_object_id,
+                staging_object_id=request.staging_object_id,
+                staging_bucket_id=request.staging_bucket_id,
+                permanent_bucket_id=permanent_bucket_id,
+            )
+        return file, permanent_bucket_id
+
+    async def register_files(
+        self,
+        *,
+        requests: Sequence[models.FileRegistrationRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileRegistrationOutcome]:
+        """Registers multiple files at once and moves their content from the staging
+        into the permanent storage. Per file, this behaves like `register_file`,
+        however, all files are looked up with a single query. The copies, inserts, and
+        published events are then issued concurrently per file. A failure for one file
+        does not prevent the registration of the other files.
+
+        Args:
+            requests: the files to register along with their staging location.
+            raise_on_failure:
+                If False, failures are only reported in the returned outcomes.
+
+        Returns:
+            The outcome per request, in the order of the requests.
+
+        Raises:
+            self.FileContentNotInStagingError:
+                When the file content is not present in the storage staging. Raised
+                after all other files of the batch have been processed.
+        """
+        if not requests:
+            return []
+
+        unregistered, outcomes = await self._filter_unregistered(requests=requests)
+
+        errors: list[BaseException] = []
+
+        def fail(index: int, error: BaseException) -> None:
+            errors.append(error)
+            outcomes[index] = self._failure_outcome(
+                file_id=requests[index].file_without_object_id.file_id, error=error
+            )
+
+        copied: list[tuple[int, models.FileMetadata, str]] = []
+        for index, result in zip(
+            unregistered,
+            await asyncio.gather(
+                *(
+                    self._register_copied_file(request=requests[index])
+                    for index in unregistered
+                ),
+                return_exceptions=True,
+            ),
+        ):
+            if isinstance(result, BaseException):
+                fail(index, result)
+            else:
+                copied.append((index, *result))
+
+        log.info("Inserting %i files.", len(copied))
+        inserted: list[tuple[int, models.FileMetadata, str]] = []
+        for copy, insertion in zip(
+            copied,
+            await asyncio.gather(
+                *(
+                    self._insert_copied_file(
+                        file=file, permanent_bucket_id=permanent_bucket_id
+                    )
+                    for _, file, permanent_bucket_id in copied
+                ),
+                return_exceptions=True,
+            ),
+        ):
+            if isinstance(insertion, BaseException):
+                fail(copy[0], insertion)
+            else:
+                inserted.append(copy)
+
+        for (index, file, _), publication in zip(
+            inserted,
+            await asyncio.gather(
+                *(
+                    self._event_publisher.file_internally_registered(
+                        file=file, bucket_id=bucket_id
+                    )
+                    for _, file, bucket_id in inserted
+                ),
+                return_exceptions=True,
+            ),
+        ):
+            if isinstance(publication, BaseException):
+                fail(index, publication)
+            else:
+                outcomes[index] = models.FileRegistrationOutcome(
+                    file_id=file.file_id, outcome="registered", object_id=file.object_id
+                )
+
+        await asyncio.gather(
+            *(
+                self._queue_staging_cleanup(
+                    file=file,
+                    staging_object_id=requests[index].staging_object_id,
+                    staging_bucket_id=requests[index].staging_bucket_id,
+                )
+                for index, file, _ in inserted
+            )
         )
 
-        if file_without_object_id.model_dump() == registered_file_without_object_id:
-            return True
+        if errors and raise_on_failure:
+            raise errors[0]
+        return [outcomes[index] for index in range(len(requests))]
 
-        raise self.FileUpdateError(file_id=file_without_object_id.file_id)
+    async def _get_registered_file(self, file_id: str) -> models.FileMetadata:
+        """Gets the metadata of a registered file from the database.
 
-    async def register_file(
+        Raises:
+            ResourceNotFoundError:
+                If the file is not registered or its registration is still pending.
+        """
+        file = await self._file_metadata_dao.get_by_id(file_id)
+        if file.pending_since is not None:
+            raise ResourceNotFoundError(id_=file_id)
+        return file
+
+    def _not_in_registry(
+        self, *, file_id: str
+    ) -> FileRegistryPort.FileNotInRegistryError:
+        """Logs and returns the error for a file that is not registered."""
+        file_not_in_registry_error = self.FileNotInRegistryError(file_id=file_id)
+        log.error(file_not_in_registry_error, extra={"file_id": file_id})
+        return file_not_in_registry_error
+
+    async def _get_requested_file(
         self,
         *,
-        file_without_object_id: models.FileMetadataBase,
-        staging_object_id: str,
-        staging_bucket_id: str,
-    ) -> None:
-        """Registers a file and moves its content from the staging into the permanent
-        storage. If the file with that exact metadata has already been registered,
-        nothing is done.
-
-        Args:
-            file_without_object_id: metadata on the file to register.
-            staging_object_id:
-                The S3 object ID for the staging bucket.
-            staging_bucket_id:
-                The S3 bucket ID for staging.
+        file_id: str,
+        decrypted_sha256: str,
+        file: Optional[models.FileMetadata] = None,
+    ) -> models.FileMetadata:
+        """Get the metadata of a requested file unless given and check that the
+        provided checksum matches the registered one.
 
         Raises:
-            self.FileContentNotInStagingError:
-                When the file content is not present in the storage staging.
+            self.FileNotInRegistryError:
+                When a file is requested that has not (yet) been registered.
+            self.ChecksumMismatchError:
+                When the provided checksum did not match the expectations.
         """
-        storage_alias = file_without_object_id.storage_alias
+        if file is None:
+            try:
+                file = (
+                    await self._metadata_cache.get_or_load(
+                        file_id, lambda: self._get_registered_file(file_id)
+                    )
+                    if self._metadata_cache is not None
+                    else await self._get_registered_file(file_id)
+                )
+            except ResourceNotFoundError as error:
+                raise self._not_in_registry(file_id=file_id) from error
 
-        try:
-            permanent_bucket_id, object_storage = self._object_storages.for_alias(
-                storage_alias
+        if decrypted_sha256 != file.decrypted_sha256:
+            checksum_error = self.ChecksumMismatchError(
+                file_id=file_id,
+                provided_checksum=decrypted_sha256,
+                expected_checksum=file.decrypted_sha256,
             )
-        except KeyError as error:
-            alias_not_configured = ValueError(
-                f"Storage alias '{storage_alias}' not configured."
+            log.error(
+                checksum_error,
+                extra={
+                    "file_id": file_id,
+                    "provided_checksum": decrypted_sha256,
+                    "expected_checksum": file.decrypted_sha256,
+                },
             )
-            log.critical(alias_not_configured, extra={"storage_alias": storage_alias})
-            raise alias_not_configured from error
+            raise checksum_error
 
-        try:
-            if await self._is_file_registered(
-                file_without_object_id=file_without_object_id
-            ):
-                # There is nothing to do:
+        return file
+
+    async def _record_outbox_staging(  # noqa: PLR0913
+        self,
+        *,
+        storage_alias: str,
+        bucket_id: str,
+        object_id: str,
+        file_id: str,
+        size: int,
+    ) -> None:
+        """Record that an outbox object has been staged or requested again, if the
+        outbox capacity is managed.
+        """
+        if self._outbox_capacity is not None:
+            await self._outbox_capacity.record_staging(
+                storage_alias=storage_alias,
+                bucket_id=bucket_id,
+                object_id=object_id,
+                file_id=file_id,
+                size=size,
+            )
+
+    async def _reload_missing_file(
+        self, *, file: models.FileMetadata, cause: Optional[BaseException] = None
+    ) -> models.FileMetadata:
+        """Handle the permanent object of a file that is missing. Cached metadata may
+        be outdated, e.g. if the file has been deleted by another instance of the
+        service, so the metadata is dropped from the cache and loaded again.
+
+        Returns:
+            The current metadata of the file if it differs from the given one.
+
+        Raises:
+            self.FileNotInRegistryError:
+                When the file is no longer registered.
+            self.FileInRegistryButNotInStorageError:
+                When the metadata is current, so that the registry (the database) and
+                the permanent storage are inconsistent. This is a fatal error.
+        """
+        file_id = file.file_id
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(file_id)
+            try:
+                current = await self._metadata_cache.get_or_load(
+                    file_id, lambda: self._get_registered_file(file_id)
+                )
+            except ResourceNotFoundError as error:
+                raise self._not_in_registry(file_id=file_id) from error
+            if current != file:
                 log.info(
-                    "File with ID '%s' is already registered.",
-                    file_without_object_id.file_id,
+                    "Cached metadata of file with ID '%s' was outdated.",
+                    file_id,
+                    extra={"file_id": file_id},
                 )
-                return
-        except self.FileUpdateError as error:
-            # trying to re-register with different metadata should not crash the consumer
-            # this is not a service internal inconsistency and would cause unnecessary
-            # crashes on additional consumption attempts
-            log.error(error)
-            return
+                return current
 
-        # Generate & assign object ID to metadata
-        log.info(
-            "File with ID '%s' is not yet registered. Generating object ID.",
-            file_without_object_id.file_id,
+        not_in_storage_error = self.FileInRegistryButNotInStorageError(file_id=file_id)
+        log.critical(msg=not_in_storage_error, extra={"file_id": file_id})
+        raise not_in_storage_error from cause
+
+    async def _stage_to_outbox(  # noqa: PLR0913
+        self,
+        *,
+        file_id: str,
+        decrypted_sha256: str,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+        file: Optional[models.FileMetadata] = None,
+    ) -> tuple[models.FileMetadata, bool]:
+        """Copy the content of a registered file to the outbox unless already present.
+        The metadata of the file is looked up unless given.
+
+        Returns:
+            The metadata of the file and a flag that is `True` if the content has been
+            copied and `False` if it was already present in the outbox.
+        """
+        file = await self._get_requested_file(
+            file_id=file_id, decrypted_sha256=decrypted_sha256, file=file
         )
-        object_id = str(uuid.uuid4())
-        file = models.FileMetadata(
-            **file_without_object_id.model_dump(), object_id=object_id
+        permanent_bucket_id, object_storage = self._object_storages.for_alias(
+            file.storage_alias
+        )
+        outbox_alias, _ = self._get_bucket_storage(
+            bucket_id=outbox_bucket_id, storage_alias=file.storage_alias
         )
 
-        if not await object_storage.does_object_exist(
-            bucket_id=staging_bucket_id, object_id=staging_object_id
+        if await self._does_object_exist(
+            storage_alias=outbox_alias,
+            bucket_id=outbox_bucket_id,
+            object_id=outbox_object_id,
+            ttl=self._config.outbox_presence_ttl,
         ):
-            content_not_in_staging = self.FileContentNotInStagingError(
-                file_id=file_without_object_id.file_id
+            # the content is already where it should go, there is nothing to do
+            log.info(
+                "Object corresponding to file ID '%s' is already in storage.", file_id
             )
-            log.error(
-                content_not_in_staging,
-                extra={"file_id": file_without_object_id.file_id},
+            await self._record_outbox_staging(
+                storage_alias=outbox_alias,
+                bucket_id=outbox_bucket_id,
+                object_id=outbox_object_id,
+                file_id=file_id,
+                size=file.decrypted_size,
+            )
+            return file, False
+
+        if not await self._does_object_exist(
+            storage_alias=file.storage_alias,
+            bucket_id=permanent_bucket_id,
+            object_id=file.object_id,
+            ttl=self._config.permanent_presence_ttl,
+        ):
+            return await self._stage_to_outbox(
+                file_id=file_id,
+                decrypted_sha256=decrypted_sha256,
+                outbox_object_id=outbox_object_id,
+                outbox_bucket_id=outbox_bucket_id,
+                file=await self._reload_missing_file(file=file),
             )
-            raise content_not_in_staging
 
-        await object_storage.copy_object(
-            source_bucket_id=staging_bucket_id,
-            source_object_id=staging_object_id,
-            dest_bucket_id=permanent_bucket_id,
-            dest_object_id=object_id,
+        missing: Optional[BaseException] = None
+        async with self._storage_budget.track_copy(
+            storage_alias=file.storage_alias, size=file.decrypted_size
+        ):
+            try:
+                await self._copy_object(
+                    file=file,
+                    source_alias=file.storage_alias,
+                    source_bucket_id=permanent_bucket_id,
+                    source_object_id=file.object_id,
+                    dest_alias=outbox_alias,
+                    dest_bucket_id=outbox_bucket_id,
+                    dest_object_id=outbox_object_id,
+                )
+            except object_storage.ObjectNotFoundError as error:
+                # the permanent object may have been tracked as present wrongly
+                self._presence.forget(
+                    storage_alias=file.storage_alias,
+                    bucket_id=permanent_bucket_id,
+                    object_id=file.object_id,
+                )
+                if await object_storage.does_object_exist(
+                    bucket_id=permanent_bucket_id, object_id=file.object_id
+                ):
+                    raise
+                missing = error
+        if missing is not None:
+            return await self._stage_to_outbox(
+                file_id=file_id,
+                decrypted_sha256=decrypted_sha256,
+                outbox_object_id=outbox_object_id,
+                outbox_bucket_id=outbox_bucket_id,
+                file=await self._reload_missing_file(file=file, cause=missing),
+            )
+        self._presence.mark_present(
+            storage_alias=outbox_alias,
+            bucket_id=outbox_bucket_id,
+            object_id=outbox_object_id,
+            ttl=self._config.outbox_presence_ttl,
         )
 
-        log.info("Inserting file with file ID '%s'.", file.file_id)
-        await self._file_metadata_dao.insert(file)
+        await self._record_outbox_staging(
+            storage_alias=outbox_alias,
+            bucket_id=outbox_bucket_id,
+            object_id=outbox_object_id,
+            file_id=file_id,
+            size=file.decrypted_size,
+        )
 
-        await self._event_publisher.file_internally_registered(
-            file=file, bucket_id=permanent_bucket_id
+        log.info(
+            "Object corresponding to file ID '%s' has been staged to the outbox.",
+            file_id,
         )
 
+        return file, True
+
     async def stage_registered_file(
         self,
         *,
@@ -192,70 +1455,355 @@ class FileRegistry(FileRegistryPort):
                 the permanent storage. This is an internal service error, which should
                 not happen, and not the fault of the client.
         """
-        try:
-            file = await self._file_metadata_dao.get_by_id(file_id)
-        except ResourceNotFoundError as error:
-            file_not_in_registry_error = self.FileNotInRegistryError(file_id=file_id)
-            log.error(file_not_in_registry_error, extra={"file_id": file_id})
-            raise file_not_in_registry_error from error
-
-        if decrypted_sha256 != file.decrypted_sha256:
-            checksum_error = self.ChecksumMismatchError(
+        (file, staged), shared = await self._stage_flights.run(
+            (outbox_bucket_id, outbox_object_id, file_id, decrypted_sha256),
+            lambda: self._stage_to_outbox(
                 file_id=file_id,
-                provided_checksum=decrypted_sha256,
-                expected_checksum=file.decrypted_sha256,
+                decrypted_sha256=decrypted_sha256,
+                outbox_object_id=outbox_object_id,
+                outbox_bucket_id=outbox_bucket_id,
+            ),
+        )
+
+        await self._publish_staged(
+            file=file,
+            outbox_object_id=outbox_object_id,
+            outbox_bucket_id=outbox_bucket_id,
+            staged=staged,
+            shared=shared,
+        )
+
+    async def _publish_staged(  # noqa: PLR0913
+        self,
+        *,
+        file: models.FileMetadata,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+        staged: bool,
+        shared: bool,
+    ) -> None:
+        """Publishes that a file has been staged to the outbox, unless its content was
+        present already or, if deduplicated, it was staged by a concurrent request.
+        """
+        if not staged or (shared and self._config.deduplicate_staged_events):
+            return
+
+        if shared:
+            log.info(
+                "Object corresponding to file ID '%s' was staged by a concurrent"
+                + " request.",
+                file.file_id,
             )
-            log.error(
-                checksum_error,
-                extra={
-                    "file_id": file_id,
-                    "provided_checksum": decrypted_sha256,
-                    "expected_checksum": file.decrypted_sha256,
-                },
+
+        # the outbox bucket may be hosted by another node than the permanent storage
+        outbox_alias, _ = self._get_bucket_storage(
+            bucket_id=outbox_bucket_id, storage_alias=file.storage_alias
+        )
+        await self._event_publisher.file_staged_for_download(
+            file_id=file.file_id,
+            decrypted_sha256=file.decrypted_sha256,
+            target_object_id=outbox_object_id,
+            target_bucket_id=outbox_bucket_id,
+            storage_alias=outbox_alias,
+        )
+
+    async def _get_registered_files(
+        self, *, file_ids: Sequence[str]
+    ) -> dict[str, models.FileMetadata]:
+        """Gets the metadata of those of the given files that are registered, keyed by
+        file ID. Files not in the metadata cache, if any, are looked up with a single
+        query.
+        """
+        files: dict[str, models.FileMetadata] = {}
+        uncached: list[str] = []
+        for file_id in dict.fromkeys(file_ids):
+            cached = (
+                self._metadata_cache.get(file_id)
+                if self._metadata_cache is not None
+                else None
             )
-            raise checksum_error
+            if cached is None:
+                uncached.append(file_id)
+            else:
+                files[file_id] = cached
 
-        permanent_bucket_id, object_storage = self._object_storages.for_alias(
-            file.storage_alias
+        if uncached:
+            async for file in self._file_metadata_dao.find_all(
+                mapping={"file_id": {"$in": uncached}, "pending_since": None}
+            ):
+                files[file.file_id] = file
+        return files
+
+    async def _stage_requested_file(
+        self,
+        *,
+        request: models.FileStagingRequest,
+        file: Optional[models.FileMetadata],
+    ) -> models.FileStagingOutcome:
+        """Stages a file of a bulk staging given its metadata, if registered, and
+        publishes its event once done. The number of these copies in flight is bounded
+        per storage alias.
+        """
+        if file is None:
+            raise self._not_in_registry(file_id=request.file_id)
+
+        async with self._bulk_staging_slots[file.storage_alias]:
+            (file, staged), shared = await self._stage_flights.run(
+                (
+                    request.outbox_bucket_id,
+                    request.outbox_object_id,
+                    request.file_id,
+                    request.decrypted_sha256,
+                ),
+                lambda: self._stage_to_outbox(
+                    file_id=request.file_id,
+                    decrypted_sha256=request.decrypted_sha256,
+                    outbox_object_id=request.outbox_object_id,
+                    outbox_bucket_id=request.outbox_bucket_id,
+                    file=file,
+                ),
+            )
+
+        await self._publish_staged(
+            file=file,
+            outbox_object_id=request.outbox_object_id,
+            outbox_bucket_id=request.outbox_bucket_id,
+            staged=staged,
+            shared=shared,
+        )
+        return models.FileStagingOutcome(
+            file_id=request.file_id,
+            outbox_object_id=request.outbox_object_id,
+            outcome="staged" if staged else "already_staged",
+        )
+
+    async def stage_registered_files(
+        self,
+        *,
+        requests: Sequence[models.FileStagingRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileStagingOutcome]:
+        """Stage multiple registered files to the outbox at once. Per file, this
+        behaves like `stage_registered_file`, however, the metadata of all files is
+        looked up with a single query. The copies are bounded per storage alias and
+        the event of a file is published as soon as it has been staged. A failure for
+        one file does not prevent the staging of the other files.
+
+        Args:
+            requests: the files to stage along with their outbox location.
+            raise_on_failure:
+                If False, failures are only reported in the returned outcomes.
+
+        Returns:
+            The outcome per request, in the order of the requests.
+
+        Raises:
+            self.FileNotInRegistryError:
+                When a file is requested that has not (yet) been registered. Raised
+                after all other files of the batch have been processed.
+        """
+        if not requests:
+            return []
+
+        files = await self._get_registered_files(
+            file_ids=[request.file_id for request in requests]
+        )
+        results = await asyncio.gather(
+            *(
+                self._stage_requested_file(
+                    request=request, file=files.get(request.file_id)
+                )
+                for request in requests
+            ),
+            return_exceptions=True,
         )
 
-        if await object_storage.does_object_exist(
-            bucket_id=outbox_bucket_id, object_id=outbox_object_id
+        outcomes: list[models.FileStagingOutcome] = []
+        errors: list[BaseException] = []
+        for request, result in zip(requests, results):
+            if isinstance(result, BaseException):
+                errors.append(result)
+                result = models.FileStagingOutcome(
+                    file_id=request.file_id,
+                    outbox_object_id=request.outbox_object_id,
+                    outcome=self._failure_kind(result),
+                    error=str(result) or type(result).__name__,
+                )
+            outcomes.append(result)
+
+        if errors and raise_on_failure:
+            raise errors[0]
+        return outcomes
+
+    async def stage_registered_file_range(  # noqa: PLR0913
+        self,
+        *,
+        file_id: str,
+        decrypted_sha256: str,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> models.StagedRange:
+        """Stage the part of a registered file needed to decrypt the given inclusive
+        byte range of its decrypted content to the outbox. The staged object consists
+        of the crypt4gh envelope, if part of the stored object, followed by the
+        encrypted segments covering the range. As the staged object does not hold the
+        entire file, no file_staged_for_download event is published.
+
+        Args:
+            file_id:
+                The identifier of the file.
+            decrypted_sha256:
+                The checksum of the decrypted content. This is used to make sure that
+                this service and the outside client are talking about the same file.
+            outbox_object_id:
+                The S3 object ID for the outbox bucket.
+            outbox_bucket_id:
+                The S3 bucket ID for the outbox.
+            first_byte: The first byte of the requested decrypted content.
+            last_byte: The last byte of the requested decrypted content.
+
+        Returns:
+            The ranges of the decrypted and encrypted content that have been staged.
+
+        Raises:
+            self.FileNotInRegistryError:
+                When a file is requested that has not (yet) been registered.
+            self.ChecksumMismatchError:
+                When the provided checksum did not match the expectations.
+            self.InvalidRangeError:
+                When the range is not within the decrypted content of the file.
+            self.OutboxObjectMismatchError:
+                When the outbox object already exists with a size that differs from
+                the one of the requested range, e.g. because it holds another range.
+            self.FileInRegistryButNotInStorageError:
+                When encountering inconsistency between the registry (the database) and
+                the permanent storage. This a fatal error.
+            TypeError:
+                When the permanent storage or the outbox storage do not support part
+                copies.
+        """
+        file = await self._get_requested_file(
+            file_id=file_id, decrypted_sha256=decrypted_sha256
+        )
+        permanent_bucket_id, permanent_storage = self._get_permanent_storage(
+            file.storage_alias
+        )
+        outbox_alias, outbox_storage = self._get_bucket_storage(
+            bucket_id=outbox_bucket_id, storage_alias=file.storage_alias
+        )
+        if not (
+            isinstance(permanent_storage, MultipartObjectStoragePort)
+            and isinstance(outbox_storage, MultipartObjectStoragePort)
         ):
-            # the content is already where it should go, there is nothing to do
+            raise TypeError(
+                "Staging byte ranges requires storages that implement the"
+                + " MultipartObjectStoragePort."
+            )
+        server_side = outbox_alias == file.storage_alias
+
+        try:
+            object_size = await permanent_storage.get_object_size(
+                bucket_id=permanent_bucket_id, object_id=file.object_id
+            )
+        except permanent_storage.ObjectNotFoundError as error:
+            await self._reload_missing_file(file=file, cause=error)
+            # the cached metadata was outdated and has been dropped from the cache
+            return await self.stage_registered_file_range(
+                file_id=file_id,
+                decrypted_sha256=decrypted_sha256,
+                outbox_object_id=outbox_object_id,
+                outbox_bucket_id=outbox_bucket_id,
+                first_byte=first_byte,
+                last_byte=last_byte,
+            )
+
+        try:
+            staged_range, parts = plan_range(
+                file=file,
+                object_size=object_size,
+                first_byte=first_byte,
+                last_byte=last_byte,
+                target_part_size=self._config.multipart_copy_part_size,
+                buffer_size=self._streaming_copier.pool.buffer_size,
+                server_side=server_side,
+            )
+        except ValueError as error:
+            invalid_range_error = self.InvalidRangeError(
+                file_id=file_id, first_byte=first_byte, last_byte=last_byte
+            )
+            log.error(invalid_range_error, extra={"file_id": file_id})
+            raise invalid_range_error from error
+
+        # the decrypted size is recorded, like for entire files
+        decrypted_size = (
+            staged_range.decrypted_last_byte - staged_range.decrypted_first_byte + 1
+        )
+        try:
+            existing_size: Optional[int] = await outbox_storage.get_object_size(
+                bucket_id=outbox_bucket_id, object_id=outbox_object_id
+            )
+        except outbox_storage.ObjectNotFoundError:
+            existing_size = None
+        if existing_size is not None:
+            if existing_size != staged_range.staged_size:
+                mismatch_error = self.OutboxObjectMismatchError(
+                    object_id=outbox_object_id,
+                    size=existing_size,
+                    expected_size=staged_range.staged_size,
+                )
+                log.error(mismatch_error, extra={"file_id": file_id})
+                raise mismatch_error
             log.info(
-                "Object corresponding to file ID '%s' is already in storage.", file_id
+                "Range of file ID '%s' is already in the outbox as object '%s'.",
+                file_id,
+                outbox_object_id,
             )
-            return
+            await self._record_outbox_staging(
+                storage_alias=outbox_alias,
+                bucket_id=outbox_bucket_id,
+                object_id=outbox_object_id,
+                file_id=file_id,
+                size=decrypted_size,
+            )
+            return staged_range
 
-        if not await object_storage.does_object_exist(
-            bucket_id=permanent_bucket_id, object_id=file.object_id
+        async with self._storage_budget.track_copy(
+            storage_alias=file.storage_alias, size=staged_range.staged_size
         ):
-            not_in_storage_error = self.FileInRegistryButNotInStorageError(
-                file_id=file_id
+            await self._range_stager.copy_range(
+                source_storage=permanent_storage,
+                source_bucket_id=permanent_bucket_id,
+                source_object_id=file.object_id,
+                dest_storage=outbox_storage,
+                dest_bucket_id=outbox_bucket_id,
+                dest_object_id=outbox_object_id,
+                envelope_size=file.content_offset,
+                parts=parts,
+                server_side=server_side,
             )
-            log.critical(msg=not_in_storage_error, extra={"file_id": file_id})
-            raise not_in_storage_error
-
-        await object_storage.copy_object(
-            source_bucket_id=permanent_bucket_id,
-            source_object_id=file.object_id,
-            dest_bucket_id=outbox_bucket_id,
-            dest_object_id=outbox_object_id,
+        self._presence.mark_present(
+            storage_alias=outbox_alias,
+            bucket_id=outbox_bucket_id,
+            object_id=outbox_object_id,
+            ttl=self._config.outbox_presence_ttl,
+        )
+        await self._record_outbox_staging(
+            storage_alias=outbox_alias,
+            bucket_id=outbox_bucket_id,
+            object_id=outbox_object_id,
+            file_id=file_id,
+            size=decrypted_size,
         )
 
         log.info(
-            "Object corresponding to file ID '%s' has been staged to the outbox.",
+            "Range %i-%i of file ID '%s' has been staged to the outbox.",
+            staged_range.decrypted_first_byte,
+            staged_range.decrypted_last_byte,
             file_id,
         )
-
-        await self._event_publisher.file_staged_for_download(
-            file_id=file_id,
-            decrypted_sha256=decrypted_sha256,
-            target_object_id=outbox_object_id,
-            target_bucket_id=outbox_bucket_id,
-            storage_alias=file.storage_alias,
-        )
+        return staged_range
 
     async def delete_file(self, *, file_id: str) -> None:
         """Deletes a file from the permanent storage and the internal database.
@@ -283,11 +1831,16 @@ class FileRegistry(FileRegistryPort):
         with suppress(object_storage.ObjectNotFoundError):
             # If file does not exist anyways, we are done.
             await object_storage.delete_object(bucket_id=bucket_id, object_id=object_id)
+        self._presence.forget(
+            storage_alias=file.storage_alias, bucket_id=bucket_id, object_id=object_id
+        )
 
         # Try to remove file from database
         with suppress(ResourceNotFoundError):
             # If file does not exist anyways, we are done.
             await self._file_metadata_dao.delete(id_=file_id)
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(file_id)
 
         log.info(
             "Finished object storage and metadata deletion for file ID '%s'", file_id
@@ -0,0 +1,58 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fingerprints of file metadata that allow comparing metadata without comparing
+all checksums of the file parts.
+"""
+
+import hashlib
+import json
+import logging
+
+from ifrs.core import models
+from ifrs.ports.outbound.dao import FileMetadataDaoPort
+
+log = logging.getLogger(__name__)
+
+FINGERPRINT_FIELDS = set(models.FileMetadataBase.model_fields)
+
+
+def compute_fingerprint(file: models.FileMetadataBase) -> str:
+    """Compute the SHA-256 of the canonical JSON representation of the fields of the
+    base metadata, i.e. with sorted keys and without whitespace.
+    """
+    canonical_json = json.dumps(
+        file.model_dump(include=FINGERPRINT_FIELDS),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+
+
+async def backfill_fingerprints(*, file_metadata_dao: FileMetadataDaoPort) -> int:
+    """Store the fingerprint of all registered files that do not have one yet and
+    return the number of updated files. Running this again is harmless.
+    """
+    updated = 0
+    async for file in file_metadata_dao.find_all(mapping={"fingerprint": None}):
+        await file_metadata_dao.update(
+            file.model_copy(update={"fingerprint": compute_fingerprint(file)})
+        )
+        updated += 1
+        if updated % 1000 == 0:
+            log.info("Stored the fingerprints of %i files so far.", updated)
+
+    log.info("Stored the fingerprints of %i files.", updated)
+    return updated
@@ -0,0 +1,210 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An in-process cache of the metadata of registered files."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.ports.outbound.metrics import (
+    METADATA_CACHE_BYTES,
+    METADATA_CACHE_ENTRIES,
+    METADATA_CACHE_EVICTIONS,
+    METADATA_CACHE_LOOKUPS,
+    MetricsSinkPort,
+)
+
+
+class MetadataCacheConfig(BaseSettings):
+    """Config parameters for caching the metadata of registered files."""
+
+    metadata_cache_max_entries: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The maximum number of files whose metadata is cached in memory for"
+            + " staging requests. 0 disables the cache."
+        ),
+        examples=[0, 10000],
+    )
+    metadata_cache_max_bytes: int = Field(
+        default=64 * 1024**2,
+        gt=0,
+        description=(
+            "The maximum total size in bytes of the cached metadata, approximated by"
+            + " the size of its JSON representation. This mostly depends on the"
+            + " number of parts of the cached files."
+        ),
+        examples=[64 * 1024**2],
+    )
+    metadata_cache_ttl: float = Field(
+        default=300,
+        gt=0,
+        description=(
+            "The time in seconds after which cached metadata is looked up again. This"
+            + " bounds how long files deleted by other instances of the service are"
+            + " still served from the cache."
+        ),
+        examples=[300],
+    )
+
+
+@dataclass
+class CacheEntry:
+    """Cached metadata along with its approximate size and expiry."""
+
+    file: models.FileMetadata
+    size: int
+    expires_at: float
+
+
+class MetadataCache:
+    """A least recently used cache of file metadata bounded by the number of entries
+    and their approximate total size. Entries expire after a fixed time.
+
+    Lookups and evictions are recorded in the given metrics sink, if any.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: MetadataCacheConfig,
+        metrics_sink: Optional[MetricsSinkPort] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty cache."""
+        self._config = config
+        self._metrics_sink = metrics_sink
+        self._clock = clock
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._size = 0
+        # incremented by each invalidation, to detect loads that raced with one
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """The number of cached entries."""
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """The approximate total size of the cached metadata in bytes."""
+        return self._size
+
+    @property
+    def hit_ratio(self) -> float:
+        """The share of lookups answered from the cache so far."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _record_lookup(self, result: str) -> None:
+        """Count a lookup with the given result."""
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self._metrics_sink:
+            self._metrics_sink.increment_counter(
+                METADATA_CACHE_LOOKUPS, labels={"result": result}
+            )
+
+    def _remove(self, file_id: str, *, reason: Optional[str] = None) -> None:
+        """Remove an entry, recording it as eviction if a reason is given."""
+        entry = self._entries.pop(file_id)
+        self._size -= entry.size
+        if reason and self._metrics_sink:
+            self._metrics_sink.increment_counter(
+                METADATA_CACHE_EVICTIONS, labels={"reason": reason}
+            )
+
+    def _update_gauges(self) -> None:
+        """Record the current number of entries and their size."""
+        if self._metrics_sink:
+            self._metrics_sink.set_gauge(
+                METADATA_CACHE_ENTRIES, labels={}, value=len(self._entries)
+            )
+            self._metrics_sink.set_gauge(
+                METADATA_CACHE_BYTES, labels={}, value=self._size
+            )
+
+    def get(self, file_id: str) -> Optional[models.FileMetadata]:
+        """Get the cached metadata of a file, if present and not expired."""
+        entry = self._entries.get(file_id)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(file_id, reason="expired")
+            self._update_gauges()
+            entry = None
+        if entry is None:
+            self._record_lookup("miss")
+            return None
+
+        self._entries.move_to_end(file_id)
+        self._record_lookup("hit")
+        return entry.file
+
+    def put(self, file: models.FileMetadata) -> None:
+        """Cache the metadata of a file, evicting the least recently used entries as
+        needed. Metadata larger than the whole cache is not cached.
+        """
+        size = len(file.model_dump_json())
+        if file.file_id in self._entries:
+            self._remove(file.file_id)
+        if size > self._config.metadata_cache_max_bytes:
+            self._update_gauges()
+            return
+
+        while self._entries and (
+            len(self._entries) >= self._config.metadata_cache_max_entries
+            or self._size + size > self._config.metadata_cache_max_bytes
+        ):
+            self._remove(next(iter(self._entries)), reason="capacity")
+
+        self._entries[file.file_id] = CacheEntry(
+            file=file,
+            size=size,
+            expires_at=self._clock() + self._config.metadata_cache_ttl,
+        )
+        self._size += size
+        self._update_gauges()
+
+    def invalidate(self, file_id: str) -> None:
+        """Remove the metadata of a file from the cache, if present."""
+        self._invalidations += 1
+        if file_id in self._entries:
+            self._remove(file_id)
+            self._update_gauges()
+
+    async def get_or_load(
+        self, file_id: str, load: Callable[[], Awaitable[models.FileMetadata]]
+    ) -> models.FileMetadata:
+        """Get the cached metadata of a file or load and cache it. Metadata loaded
+        while an invalidation happened is returned without caching it, as it may be
+        outdated already.
+        """
+        file = self.get(file_id)
+        if file is None:
+            invalidations = self._invalidations
+            file = await load()
+            if invalidations == self._invalidations:
+                self.put(file)
+        return file
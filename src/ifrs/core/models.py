@@ -15,6 +15,8 @@
 
 """Defines dataclasses for holding business-logic data"""
 
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -80,8 +82,231 @@ class FileMetadataBase(BaseModel):
 
 
 class FileMetadata(FileMetadataBase):
-    """The file metadata plus a object storage ID generated upon registration"""
+    """The file metadata plus a object storage ID generated upon registration and a
+    fingerprint of the metadata.
+    """
+
+    object_id: str = Field(
+        ...,
+        description=(
+            "A UUID, optionally preceded by a hash prefix, to identify the file in"
+            + " object storage"
+        ),
+    )
+    fingerprint: Optional[str] = Field(
+        default=None,
+        description=(
+            "A hash of the canonical JSON representation of the metadata excluding the"
+            + " object ID and the fingerprint itself. Missing for files registered"
+            + " before fingerprints were introduced, unless backfilled."
+        ),
+    )
+    pending_since: Optional[float] = Field(
+        default=None,
+        description=(
+            "Set while the content of a file registered optimistically is being copied"
+            + " to the permanent storage, to the time the registration was claimed in"
+            + " seconds since the epoch. Files with a pending registration are treated"
+            + " as not registered."
+        ),
+    )
+
 
+class FileFingerprint(BaseModel):
+    """The fingerprint of the metadata of a registered file."""
+
+    file_id: str = Field(..., description="The ID of the registered file.")
     object_id: str = Field(
-        ..., description="A UUID to identify the file in object storage"
+        ..., description="The object ID of the file in the permanent storage."
+    )
+    fingerprint: Optional[str] = Field(
+        ..., description="The fingerprint of the metadata, if already computed."
+    )
+
+
+class FileRegistrationRequest(BaseModel):
+    """A request to register a file whose content is waiting in a staging bucket."""
+
+    file_without_object_id: FileMetadataBase = Field(
+        ..., description="Metadata on the file to register."
+    )
+    staging_object_id: str = Field(
+        ..., description="The S3 object ID for the staging bucket."
+    )
+    staging_bucket_id: str = Field(..., description="The S3 bucket ID for staging.")
+
+
+class FileRegistrationOutcome(BaseModel):
+    """The outcome of registering a single file as part of a bulk registration."""
+
+    file_id: Optional[str] = Field(
+        ...,
+        description=(
+            "The ID of the file to register. Missing if the request is not valid JSON"
+            + " or does not state a file ID."
+        ),
+    )
+    outcome: Literal["registered", "already_registered", "rejected", "failed"] = Field(
+        ...,
+        description=(
+            "Whether the file has been registered, had already been registered with"
+            + " identical metadata, was rejected due to an invalid request, or failed"
+            + " for other reasons and may be retried."
+        ),
+    )
+    object_id: Optional[str] = Field(
+        default=None,
+        description="The object ID in the permanent storage of a registered file.",
+    )
+    error: Optional[str] = Field(
+        default=None, description="The reason why a file was rejected or failed."
+    )
+
+
+class StagingObject(BaseModel):
+    """An object in a staging bucket whose content has been registered and that is
+    queued for deletion.
+    """
+
+    cleanup_id: str = Field(
+        ...,
+        description="Identifies the object by storage alias, bucket ID and object ID.",
+    )
+    storage_alias: str = Field(
+        ..., description="Alias of the storage node hosting the staging bucket."
+    )
+    bucket_id: str = Field(..., description="The S3 bucket ID for staging.")
+    object_id: str = Field(..., description="The S3 object ID in the staging bucket.")
+
+
+class OutboxObject(BaseModel):
+    """An object staged to an outbox bucket whose node has a limited capacity."""
+
+    outbox_id: str = Field(
+        ...,
+        description="Identifies the object by storage alias, bucket ID and object ID.",
+    )
+    storage_alias: str = Field(
+        ..., description="Alias of the storage node hosting the outbox bucket."
+    )
+    bucket_id: str = Field(..., description="The S3 bucket ID of the outbox.")
+    object_id: str = Field(..., description="The S3 object ID in the outbox bucket.")
+    file_id: str = Field(..., description="The ID of the staged file.")
+    size: int = Field(
+        ...,
+        description=(
+            "The size in bytes accounted for the object, i.e. the decrypted size of"
+            + " the staged file or the size of a staged range."
+        ),
+    )
+    last_staged: float = Field(
+        ...,
+        description=(
+            "The time at which the object was last staged or requested to be staged"
+            + " again, in seconds since the epoch."
+        ),
+    )
+
+
+class FileStagingRequest(BaseModel):
+    """A request to stage a registered file to the outbox."""
+
+    file_id: str = Field(..., description="The ID of the file to stage.")
+    decrypted_sha256: str = Field(
+        ...,
+        description=(
+            "The checksum of the decrypted content, used to make sure that the"
+            + " requested file is the registered one."
+        ),
+    )
+    outbox_object_id: str = Field(
+        ..., description="The S3 object ID for the outbox bucket."
+    )
+    outbox_bucket_id: str = Field(..., description="The S3 bucket ID for the outbox.")
+
+
+class FileStagingOutcome(BaseModel):
+    """The outcome of staging a single file as part of a bulk staging."""
+
+    file_id: str = Field(..., description="The ID of the file to stage.")
+    outbox_object_id: str = Field(
+        ..., description="The S3 object ID for the outbox bucket."
+    )
+    outcome: Literal["staged", "already_staged", "rejected", "failed"] = Field(
+        ...,
+        description=(
+            "Whether the content has been copied to the outbox, was present there"
+            + " already, was rejected due to an invalid request, or failed for other"
+            + " reasons and may be retried."
+        ),
+    )
+    error: Optional[str] = Field(
+        default=None, description="The reason why a file was rejected or failed."
+    )
+
+
+class StagedRange(BaseModel):
+    """The part of the content of a file that has been staged to the outbox in order
+    to provide a byte range of its decrypted content. All byte ranges are inclusive.
+    """
+
+    file_id: str = Field(..., description="The ID of the staged file.")
+    decrypted_first_byte: int = Field(
+        ...,
+        description=(
+            "The offset in the decrypted content of the file at which the decrypted"
+            + " content of the staged object starts."
+        ),
+    )
+    decrypted_last_byte: int = Field(
+        ...,
+        description=(
+            "The offset in the decrypted content of the file at which the decrypted"
+            + " content of the staged object ends."
+        ),
+    )
+    encrypted_first_byte: int = Field(
+        ...,
+        description=(
+            "The offset in the encrypted content of the file (excluding the crypt4gh"
+            + " envelope) at which the staged encrypted content starts."
+        ),
+    )
+    encrypted_last_byte: int = Field(
+        ...,
+        description=(
+            "The offset in the encrypted content of the file (excluding the crypt4gh"
+            + " envelope) at which the staged encrypted content ends."
+        ),
+    )
+    staged_size: int = Field(
+        ...,
+        description=(
+            "The size of the staged object in bytes, i.e. the crypt4gh envelope, if"
+            + " part of the stored object, followed by the staged encrypted content."
+        ),
+    )
+
+
+class RegistrationIntent(BaseModel):
+    """The progress of a registration that has not been completed yet, recorded so
+    that it can be resumed after an interruption.
+    """
+
+    file_id: str = Field(..., description="The ID of the file being registered.")
+    storage_alias: str = Field(
+        ..., description="Alias of the storage node hosting the permanent bucket."
+    )
+    object_id: str = Field(
+        ..., description="The object ID assigned to the file in the permanent storage."
+    )
+    fingerprint: str = Field(
+        ..., description="The fingerprint of the metadata that is being registered."
+    )
+    phase: Literal["copying", "copied"] = Field(
+        ...,
+        description=(
+            "Whether the content is being copied to the permanent storage or has been"
+            + " copied and the metadata is about to be inserted."
+        ),
     )
@@ -0,0 +1,306 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Server-side copies of large objects in parallel parts that are aligned to the
+parts of the encrypted file content.
+"""
+
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from collections.abc import Coroutine, Sequence
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from hexkit.protocols.objstorage import ObjectStorageProtocol
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.ports.outbound.storage import MultipartObjectStoragePort
+
+log = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024**2  # lower bound for all but the last part imposed by S3
+MAX_PARTS = 10_000  # upper bound for the number of parts imposed by S3
+
+
+class MultipartCopyConfig(BaseSettings):
+    """Config parameters for copying objects in parallel parts."""
+
+    multipart_copy_threshold: int = Field(
+        default=256 * 1024**2,
+        ge=0,
+        description=(
+            "Objects of at least this size in bytes are copied in parallel parts if"
+            + " the object storage supports it. Smaller objects are copied with a"
+            + " single request."
+        ),
+        examples=[256 * 1024**2],
+    )
+    multipart_copy_part_size: int = Field(
+        default=64 * 1024**2,
+        ge=MIN_PART_SIZE,
+        description=(
+            "The targeted size in bytes of the parts of a multipart copy. It is"
+            + " rounded up to a multiple of the encrypted part size of the file, so"
+            + " that the boundaries of the copied parts line up with the encrypted"
+            + " parts."
+        ),
+        examples=[64 * 1024**2],
+    )
+    multipart_copy_concurrency_per_object: int = Field(
+        default=8,
+        ge=1,
+        description="The maximum number of parts of one object copied concurrently.",
+        examples=[8],
+    )
+    multipart_copy_concurrency_per_storage: int = Field(
+        default=32,
+        ge=1,
+        description=(
+            "The maximum number of parts copied concurrently per storage alias across"
+            + " all objects. Note that the number of connections to a storage is also"
+            + " limited by its client configuration."
+        ),
+        examples=[32],
+    )
+
+
+@dataclass(frozen=True)
+class CopyPart:
+    """An inclusive byte range of an object copied as one part."""
+
+    first_byte: int
+    last_byte: int
+
+
+def plan_copy_parts(
+    *,
+    object_size: int,
+    content_offset: int,
+    encrypted_part_size: int,
+    target_part_size: int,
+) -> list[CopyPart]:
+    """Split an object into parts of roughly the targeted size with boundaries at the
+    boundaries between the encrypted parts of the file. The envelope preceding the
+    encrypted content (as given by the content offset) is copied with the first part.
+    """
+    part_size = (
+        math.ceil(max(target_part_size, MIN_PART_SIZE) / encrypted_part_size)
+        * encrypted_part_size
+    )
+    while math.ceil((object_size - content_offset) / part_size) > MAX_PARTS:
+        part_size *= 2
+
+    parts: list[CopyPart] = []
+    first_byte = 0
+    end = content_offset + part_size
+    while first_byte < object_size:
+        last_byte = min(end, object_size) - 1
+        parts.append(CopyPart(first_byte=first_byte, last_byte=last_byte))
+        first_byte = last_byte + 1
+        end += part_size
+    return parts
+
+
+async def upload_parts(
+    *,
+    object_storage: MultipartObjectStoragePort,
+    upload_id: str,
+    bucket_id: str,
+    object_id: str,
+    parts: Sequence[Coroutine[Any, Any, str]],
+) -> None:
+    """Run the given coroutines, each filling one part of a multipart upload in the
+    order of the part numbers and returning the ETag of its part, and complete the
+    upload. If any part fails, the remaining parts are cancelled and the upload is
+    aborted.
+    """
+    tasks = [asyncio.create_task(part) for part in parts]
+    try:
+        part_etags = await asyncio.gather(*tasks)
+        await object_storage.complete_parts(
+            upload_id=upload_id,
+            bucket_id=bucket_id,
+            object_id=object_id,
+            part_etags=part_etags,
+        )
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await object_storage.abort_multipart_upload(
+                upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+            )
+        except object_storage.ObjectStorageProtocolError as error:
+            log.warning(
+                "Could not abort the multipart upload to object '%s' in bucket"
+                + " '%s': %s",
+                object_id,
+                bucket_id,
+                error,
+            )
+        raise
+
+
+class MultipartCopier:
+    """Copies objects server-side, splitting large objects into parts that are copied
+    in parallel if the object storage implements the `MultipartObjectStoragePort`.
+    """
+
+    def __init__(self, *, config: MultipartCopyConfig):
+        """Initialize with config parameters."""
+        self._config = config
+        self._storage_slots: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(config.multipart_copy_concurrency_per_storage)
+        )
+
+    async def _copy_part(  # noqa: PLR0913
+        self,
+        *,
+        storage: MultipartObjectStoragePort,
+        object_slots: asyncio.Semaphore,
+        storage_slots: asyncio.Semaphore,
+        upload_id: str,
+        part_number: int,
+        part: CopyPart,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> str:
+        """Copy a single part as soon as both the object and the storage have a free
+        slot and return its ETag.
+        """
+        async with object_slots, storage_slots:
+            return await storage.upload_part_copy(
+                upload_id=upload_id,
+                bucket_id=dest_bucket_id,
+                object_id=dest_object_id,
+                part_number=part_number,
+                source_bucket_id=source_bucket_id,
+                source_object_id=source_object_id,
+                first_byte=part.first_byte,
+                last_byte=part.last_byte,
+            )
+
+    async def _copy_parts(  # noqa: PLR0913
+        self,
+        *,
+        storage_alias: str,
+        object_storage: MultipartObjectStoragePort,
+        parts: list[CopyPart],
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> None:
+        """Copy the given parts into a new multipart upload and complete it."""
+        upload_id = await object_storage.init_multipart_upload(
+            bucket_id=dest_bucket_id, object_id=dest_object_id
+        )
+        object_slots = asyncio.Semaphore(
+            self._config.multipart_copy_concurrency_per_object
+        )
+        await upload_parts(
+            object_storage=object_storage,
+            upload_id=upload_id,
+            bucket_id=dest_bucket_id,
+            object_id=dest_object_id,
+            parts=[
+                self._copy_part(
+                    storage=object_storage,
+                    object_slots=object_slots,
+                    storage_slots=self._storage_slots[storage_alias],
+                    upload_id=upload_id,
+                    part_number=part_number,
+                    part=part,
+                    source_bucket_id=source_bucket_id,
+                    source_object_id=source_object_id,
+                    dest_bucket_id=dest_bucket_id,
+                    dest_object_id=dest_object_id,
+                )
+                for part_number, part in enumerate(parts, start=1)
+            ],
+        )
+
+    async def copy_object(  # noqa: PLR0913
+        self,
+        *,
+        file: models.FileMetadataBase,
+        object_storage: ObjectStorageProtocol,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+        parts: Optional[list[CopyPart]] = None,
+    ) -> None:
+        """Copy an object containing the content of the given file.
+
+        Objects below the size threshold and objects in storages that do not support
+        part copies are copied with a single request. The decrypted size of the file
+        serves as a lower bound of the object size, so that the object size is only
+        requested for files that might exceed the threshold. If parts are given, the
+        object is copied in exactly these parts regardless of its size.
+
+        Raises:
+            TypeError:
+                If parts are given but the storage does not support part copies.
+        """
+        if parts is None:
+            parts = []
+            if (
+                isinstance(object_storage, MultipartObjectStoragePort)
+                and file.decrypted_size >= self._config.multipart_copy_threshold
+            ):
+                object_size = await object_storage.get_object_size(
+                    bucket_id=source_bucket_id, object_id=source_object_id
+                )
+                if object_size >= self._config.multipart_copy_threshold:
+                    parts = plan_copy_parts(
+                        object_size=object_size,
+                        content_offset=file.content_offset,
+                        encrypted_part_size=file.encrypted_part_size,
+                        target_part_size=self._config.multipart_copy_part_size,
+                    )
+
+            if len(parts) < 2:
+                await object_storage.copy_object(
+                    source_bucket_id=source_bucket_id,
+                    source_object_id=source_object_id,
+                    dest_bucket_id=dest_bucket_id,
+                    dest_object_id=dest_object_id,
+                )
+                return
+
+        if not isinstance(object_storage, MultipartObjectStoragePort):
+            raise TypeError(
+                "Copies in given parts require a storage that implements the"
+                + " MultipartObjectStoragePort."
+            )
+
+        log.debug("Copying object '%s' in %i parts.", source_object_id, len(parts))
+        await self._copy_parts(
+            storage_alias=file.storage_alias,
+            object_storage=object_storage,
+            parts=parts,
+            source_bucket_id=source_bucket_id,
+            source_object_id=source_object_id,
+            dest_bucket_id=dest_bucket_id,
+            dest_object_id=dest_object_id,
+        )
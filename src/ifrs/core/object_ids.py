@@ -0,0 +1,109 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Generation of the object IDs under which file content is stored permanently."""
+
+import hashlib
+import os
+import time
+import uuid
+from typing import Callable, Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+# generates a new object ID with each call
+ObjectIdGenerator = Callable[[], str]
+
+
+class ObjectIdConfig(BaseSettings):
+    """Config parameters for generating object IDs."""
+
+    object_id_scheme: Literal["uuid4", "uuid7"] = Field(
+        default="uuid4",
+        description=(
+            "The kind of UUID used as object ID of newly registered files. A uuid4 is"
+            + " random, while a uuid7 starts with a timestamp, so that IDs generated"
+            + " later sort after earlier ones. This keeps inserts into an index on the"
+            + " object ID local. Object IDs of existing files stay valid regardless."
+        ),
+        examples=["uuid4", "uuid7"],
+    )
+    object_id_prefix_length: int = Field(
+        default=0,
+        ge=0,
+        le=8,
+        description=(
+            "The number of hex digits of a hash of the UUID that precede it in the"
+            + " object ID, separated by a dash, to spread objects evenly across the"
+            + " key partitions of an S3 bucket. 0 means no prefix. Note that a prefix"
+            + " gives up the ordering of time-ordered IDs."
+        ),
+        examples=[0, 4],
+    )
+
+
+class UUID7Generator:
+    """Generates version 7 UUIDs as defined in RFC 9562, consisting of the Unix time
+    in milliseconds followed by random bits. UUIDs generated within the same
+    millisecond are kept in order by a counter in the 12 bits following the
+    timestamp.
+    """
+
+    def __init__(self):
+        """Initialize without any previously generated UUID."""
+        self._last_timestamp = -1
+        self._counter = 0
+
+    def __call__(self) -> uuid.UUID:
+        """Generate a UUID that sorts after all previously generated ones."""
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp > self._last_timestamp:
+            self._last_timestamp = timestamp
+            # start in the lower half, so that the counter rarely overflows
+            self._counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            self._counter += 1
+            if self._counter > 0xFFF:
+                # borrow the next millisecond rather than breaking the order
+                self._last_timestamp += 1
+                self._counter = 0
+
+        rand_b = int.from_bytes(os.urandom(8), "big") & (2**62 - 1)
+        value = (
+            (self._last_timestamp & (2**48 - 1)) << 80
+            | 0x7 << 76
+            | self._counter << 64
+            | 0b10 << 62
+            | rand_b
+        )
+        return uuid.UUID(int=value)
+
+
+def get_object_id_generator(config: ObjectIdConfig) -> ObjectIdGenerator:
+    """Get a generator of object IDs as configured."""
+    generate_uuid: Callable[[], uuid.UUID] = uuid.uuid4
+    if config.object_id_scheme == "uuid7":
+        generate_uuid = UUID7Generator()
+    prefix_length = config.object_id_prefix_length
+
+    def generate_object_id() -> str:
+        object_id = str(generate_uuid())
+        if not prefix_length:
+            return object_id
+        digest = hashlib.sha256(object_id.encode("ascii")).hexdigest()
+        return f"{digest[:prefix_length]}-{object_id}"
+
+    return generate_object_id
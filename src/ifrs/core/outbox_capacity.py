@@ -0,0 +1,308 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Eviction of the least recently staged outbox objects from nodes whose outbox
+capacity is exceeded.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Callable
+
+from ghga_service_commons.utils.multinode_storage import ObjectStorages
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.core.staging_cleanup import MAX_OBJECTS_PER_DELETE, delete_objects
+from ifrs.ports.outbound.dao import (
+    OutboxObjectDaoPort,
+    OutboxUsageDaoPort,
+    ResourceAlreadyExistsError,
+)
+
+log = logging.getLogger(__name__)
+
+
+class OutboxCapacityConfig(BaseSettings):
+    """Config parameters for limiting the capacity of the outbox buckets."""
+
+    outbox_capacities: dict[str, int] = Field(
+        default={},
+        description=(
+            "The maximum total size in bytes of the objects staged to outbox buckets"
+            + " per alias of the storage node hosting them. Staged files and byte"
+            + " ranges are accounted for with the size of their decrypted content, which"
+            + " approximates the size of the staged objects. Once a node exceeds its"
+            + " capacity, the least recently staged objects are deleted. The outbox"
+            + " buckets of nodes that are not listed are not limited."
+        ),
+        examples=[{}, {"test": 10 * 1024**4}],
+    )
+    outbox_eviction_interval: float = Field(
+        default=300,
+        gt=0,
+        description=(
+            "The time in seconds between checks of the outbox capacities and the"
+            + " eviction of objects from nodes that exceed them."
+        ),
+        examples=[300],
+    )
+    outbox_eviction_min_age: float = Field(
+        default=3600,
+        ge=0,
+        description=(
+            "The time in seconds after the last staging request for an outbox object"
+            + " during which it is never evicted, even if its node exceeds its"
+            + " capacity. This leaves clients time to download the object. Must be"
+            + " longer than the outbox_presence_ttl, if presence tracking is enabled,"
+            + " and at least as long as the idempotency_cache_ttl_seconds, if the"
+            + " idempotency cache is enabled, so that objects are not evicted while"
+            + " they are still assumed to be present."
+        ),
+        examples=[3600],
+    )
+
+
+def get_outbox_id(*, storage_alias: str, bucket_id: str, object_id: str) -> str:
+    """Get the ID of an outbox object."""
+    return f"{storage_alias}/{bucket_id}/{object_id}"
+
+
+class OutboxCapacity:
+    """Keeps a record of the objects staged to outbox buckets of limited capacity and
+    evicts the least recently staged ones from nodes that exceed their capacity.
+
+    The records are kept in the database only, so that staging requests served by
+    other instances of the service are taken into account. Before an object is
+    evicted, its record is deleted on condition that it has not been updated since
+    it was read, so that objects requested again in the meantime are kept.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        config: OutboxCapacityConfig,
+        outbox_object_dao: OutboxObjectDaoPort,
+        outbox_usage_dao: OutboxUsageDaoPort,
+        object_storages: ObjectStorages,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize with config parameters and outbound adapters."""
+        self._config = config
+        self._outbox_object_dao = outbox_object_dao
+        self._outbox_usage_dao = outbox_usage_dao
+        self._object_storages = object_storages
+        self._clock = clock
+        self._evict_lock = asyncio.Lock()
+
+    @classmethod
+    @asynccontextmanager
+    async def construct(
+        cls,
+        *,
+        config: OutboxCapacityConfig,
+        outbox_object_dao: OutboxObjectDaoPort,
+        outbox_usage_dao: OutboxUsageDaoPort,
+        object_storages: ObjectStorages,
+    ) -> AsyncIterator["OutboxCapacity"]:
+        """Evict outbox objects in the background while the context is active."""
+        outbox_capacity = cls(
+            config=config,
+            outbox_object_dao=outbox_object_dao,
+            outbox_usage_dao=outbox_usage_dao,
+            object_storages=object_storages,
+        )
+        task = asyncio.create_task(outbox_capacity.run())
+        try:
+            yield outbox_capacity
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def is_limited(self, storage_alias: str) -> bool:
+        """Check whether the outbox capacity of the given storage node is limited."""
+        return storage_alias in self._config.outbox_capacities
+
+    async def record_staging(  # noqa: PLR0913
+        self,
+        *,
+        storage_alias: str,
+        bucket_id: str,
+        object_id: str,
+        file_id: str,
+        size: int,
+    ) -> None:
+        """Record that an outbox object has been staged or requested again now. Nothing
+        is recorded if the outbox capacity of the node is not limited.
+        """
+        if not self.is_limited(storage_alias):
+            return
+        await self._outbox_object_dao.upsert(
+            models.OutboxObject(
+                outbox_id=get_outbox_id(
+                    storage_alias=storage_alias,
+                    bucket_id=bucket_id,
+                    object_id=object_id,
+                ),
+                storage_alias=storage_alias,
+                bucket_id=bucket_id,
+                object_id=object_id,
+                file_id=file_id,
+                size=size,
+                last_staged=self._clock(),
+            )
+        )
+
+    async def _release_record(self, outbox_object: models.OutboxObject) -> bool:
+        """Delete the record of an outbox object selected for eviction, unless it has
+        been requested again since its record was read, and return whether the object
+        may be deleted.
+        """
+        return await self._outbox_usage_dao.delete_if_unchanged(
+            outbox_object=outbox_object
+        )
+
+    async def _restore_record(self, outbox_object: models.OutboxObject) -> None:
+        """Restore the record of an outbox object that could not be deleted, so that
+        its eviction is retried, unless it has been recorded again in the meantime.
+        """
+        with suppress(ResourceAlreadyExistsError):
+            await self._outbox_object_dao.insert(outbox_object)
+
+    async def _select_for_eviction(
+        self, *, storage_alias: str
+    ) -> tuple[int, list[models.OutboxObject]]:
+        """Get the total size of the objects recorded for a node along with the least
+        recently staged objects that need to be evicted to meet its capacity and are
+        old enough to be evicted. The candidates are read least recently staged first
+        and only until the excess is covered.
+        """
+        usage = await self._outbox_usage_dao.get_usage(storage_alias=storage_alias)
+        excess = usage - self._config.outbox_capacities[storage_alias]
+        selected: list[models.OutboxObject] = []
+        if excess <= 0:
+            return usage, selected
+
+        min_age_cutoff = self._clock() - self._config.outbox_eviction_min_age
+        async for outbox_object in self._outbox_usage_dao.find_least_recently_staged(
+            storage_alias=storage_alias, staged_before=min_age_cutoff
+        ):
+            selected.append(outbox_object)
+            excess -= outbox_object.size
+            if excess <= 0:
+                break
+        return usage, selected
+
+    async def _evict_from_bucket(
+        self,
+        *,
+        storage_alias: str,
+        bucket_id: str,
+        outbox_objects: list[models.OutboxObject],
+    ) -> int:
+        """Delete the given objects from an outbox bucket, whose records have already
+        been deleted, and return the number of bytes freed. The records of objects
+        that could not be deleted are restored.
+        """
+        _, object_storage = self._object_storages.for_alias(storage_alias)
+        freed = 0
+        for start in range(0, len(outbox_objects), MAX_OBJECTS_PER_DELETE):
+            batch = outbox_objects[start : start + MAX_OBJECTS_PER_DELETE]
+            failed = set(
+                await delete_objects(
+                    object_storage=object_storage,
+                    bucket_id=bucket_id,
+                    object_ids=[outbox_object.object_id for outbox_object in batch],
+                )
+            )
+            for outbox_object in batch:
+                if outbox_object.object_id in failed:
+                    await self._restore_record(outbox_object)
+                else:
+                    freed += outbox_object.size
+        return freed
+
+    async def evict(self, *, storage_alias: str) -> int:
+        """Evict the least recently staged objects from the outbox buckets of a node
+        until it meets its capacity and return the number of bytes freed. Objects
+        staged more recently than the minimum age are kept regardless.
+        """
+        usage, selected = await self._select_for_eviction(storage_alias=storage_alias)
+        # the records are deleted before the objects, each only if the object has not
+        # been requested again since it was selected, so that a staging request in
+        # between keeps the object
+        released = await asyncio.gather(
+            *(self._release_record(outbox_object) for outbox_object in selected)
+        )
+        objects_per_bucket: defaultdict[str, list[models.OutboxObject]] = defaultdict(
+            list
+        )
+        for outbox_object, is_released in zip(selected, released):
+            if is_released:
+                objects_per_bucket[outbox_object.bucket_id].append(outbox_object)
+
+        freed = 0
+        for bucket_id, outbox_objects in objects_per_bucket.items():
+            freed += await self._evict_from_bucket(
+                storage_alias=storage_alias,
+                bucket_id=bucket_id,
+                outbox_objects=outbox_objects,
+            )
+        if freed:
+            log.info(
+                "Evicted %i bytes of outbox objects from storage '%s'.",
+                freed,
+                storage_alias,
+            )
+
+        capacity = self._config.outbox_capacities[storage_alias]
+        if usage - freed > capacity:
+            log.warning(
+                "The outbox objects of storage '%s' still occupy %i bytes, exceeding"
+                + " its capacity of %i bytes.",
+                storage_alias,
+                usage - freed,
+                capacity,
+            )
+        return freed
+
+    async def evict_all(self) -> None:
+        """Evict outbox objects from all nodes of limited capacity, logging instead of
+        raising unexpected errors.
+        """
+        async with self._evict_lock:
+            for storage_alias in self._config.outbox_capacities:
+                try:
+                    await self.evict(storage_alias=storage_alias)
+                except Exception as error:  # pylint: disable=broad-except
+                    log.error(
+                        "Could not evict outbox objects from storage '%s': %s",
+                        storage_alias,
+                        error,
+                    )
+
+    async def run(self) -> None:
+        """Evict outbox objects whenever the eviction interval has passed, until
+        cancelled.
+        """
+        while True:
+            await asyncio.sleep(self._config.outbox_eviction_interval)
+            await self.evict_all()
@@ -0,0 +1,114 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracking of objects known to be present, to save requests checking for them."""
+
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+# identifies an object by storage alias, bucket ID and object ID
+ObjectKey = tuple[str, str, str]
+
+
+class PresenceTrackerConfig(BaseSettings):
+    """Config parameters for tracking the presence of objects."""
+
+    outbox_presence_ttl: float = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The time in seconds for which an outbox object staged or found by this"
+            + " service is assumed to be present without checking the storage again."
+            + " Must be shorter than the time after which the outbox objects are"
+            + " removed, e.g. by a lifecycle policy of the outbox bucket. 0 disables"
+            + " tracking outbox objects."
+        ),
+        examples=[0, 3600],
+    )
+    permanent_presence_ttl: float = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The time in seconds for which an object in the permanent storage copied"
+            + " or found by this service is assumed to be present without checking"
+            + " the storage again. 0 disables tracking permanent objects."
+        ),
+        examples=[0, 86400],
+    )
+    presence_tracker_max_entries: int = Field(
+        default=100_000,
+        ge=1,
+        description=(
+            "The maximum number of objects tracked as present. The least recently"
+            + " confirmed objects are forgotten first."
+        ),
+        examples=[100_000],
+    )
+
+
+class PresenceTracker:
+    """Remembers objects known to be present until their time to live passes.
+
+    Only presence is tracked, an unknown object may or may not exist. Callers that
+    find a tracked object missing after all must forget it.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: PresenceTrackerConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize without any tracked objects."""
+        self._config = config
+        self._clock = clock
+        self._expiries: OrderedDict[ObjectKey, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        """The number of tracked objects, including expired ones."""
+        return len(self._expiries)
+
+    def is_present(self, *, storage_alias: str, bucket_id: str, object_id: str) -> bool:
+        """Check whether an object is known to be present."""
+        key = (storage_alias, bucket_id, object_id)
+        expires_at = self._expiries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= self._clock():
+            del self._expiries[key]
+            return False
+        return True
+
+    def mark_present(
+        self, *, storage_alias: str, bucket_id: str, object_id: str, ttl: float
+    ) -> None:
+        """Track an object as present for the given time in seconds. Nothing is
+        tracked if the time is 0.
+        """
+        if not ttl:
+            return
+        key = (storage_alias, bucket_id, object_id)
+        self._expiries.pop(key, None)
+        self._expiries[key] = self._clock() + ttl
+        while len(self._expiries) > self._config.presence_tracker_max_entries:
+            self._expiries.popitem(last=False)
+
+    def forget(self, *, storage_alias: str, bucket_id: str, object_id: str) -> None:
+        """Stop tracking an object, e.g. because it has been deleted."""
+        self._expiries.pop((storage_alias, bucket_id, object_id), None)
@@ -0,0 +1,271 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Staging of byte ranges of the decrypted content of files, copying only the
+encrypted content needed to decrypt the range along with the crypt4gh envelope.
+"""
+
+import asyncio
+import logging
+import math
+
+from ifrs.core import models
+from ifrs.core.multipart_copy import (
+    CopyPart,
+    MultipartCopyConfig,
+    plan_copy_parts,
+    upload_parts,
+)
+from ifrs.core.streaming_copy import BufferPool, plan_stream_parts
+from ifrs.ports.outbound.storage import MultipartObjectStoragePort
+
+log = logging.getLogger(__name__)
+
+CRYPT4GH_SEGMENT_SIZE = 64 * 1024  # size of the decrypted content of a segment
+# an encrypted segment additionally holds a nonce (12 bytes) and a MAC (16 bytes)
+CRYPT4GH_CIPHER_SEGMENT_SIZE = CRYPT4GH_SEGMENT_SIZE + 28
+
+
+def plan_range(  # noqa: PLR0913
+    *,
+    file: models.FileMetadata,
+    object_size: int,
+    first_byte: int,
+    last_byte: int,
+    target_part_size: int,
+    buffer_size: int,
+    server_side: bool,
+) -> tuple[models.StagedRange, list[CopyPart]]:
+    """Map an inclusive byte range of the decrypted content onto the encrypted
+    content and split the latter into parts to copy.
+
+    The encrypted range is widened to whole crypt4gh segments, so that it can be
+    decrypted. If the encrypted part size is a multiple of the segment size, it is
+    widened to whole encrypted parts, so that the copied content can be checked
+    against the part checksums.
+
+    Parts copied server-side are of roughly the targeted size. Parts that are
+    downloaded, i.e. all parts unless copied server-side and otherwise the first
+    part if preceded by an envelope, fit into a buffer of the given size along with
+    the envelope.
+
+    Raises:
+        ValueError:
+            If the range is empty or exceeds the decrypted content or if it would
+            need more parts than allowed.
+    """
+    if not 0 <= first_byte <= last_byte < file.decrypted_size:
+        raise ValueError(
+            f"The range {first_byte}-{last_byte} is not within the decrypted content"
+            + f" of {file.decrypted_size} bytes."
+        )
+
+    content_size = object_size - file.content_offset
+    alignment = (
+        file.encrypted_part_size
+        if file.encrypted_part_size % CRYPT4GH_CIPHER_SEGMENT_SIZE == 0
+        else CRYPT4GH_CIPHER_SEGMENT_SIZE
+    )
+    first_segment = first_byte // CRYPT4GH_SEGMENT_SIZE
+    last_segment = last_byte // CRYPT4GH_SEGMENT_SIZE
+    encrypted_start = (
+        first_segment * CRYPT4GH_CIPHER_SEGMENT_SIZE // alignment * alignment
+    )
+    encrypted_end = min(
+        math.ceil((last_segment + 1) * CRYPT4GH_CIPHER_SEGMENT_SIZE / alignment)
+        * alignment,
+        content_size,
+    )
+    decrypted_start = (
+        encrypted_start // CRYPT4GH_CIPHER_SEGMENT_SIZE * CRYPT4GH_SEGMENT_SIZE
+    )
+    decrypted_end = min(
+        math.ceil(encrypted_end / CRYPT4GH_CIPHER_SEGMENT_SIZE) * CRYPT4GH_SEGMENT_SIZE,
+        file.decrypted_size,
+    )
+
+    start = file.content_offset + encrypted_start
+    end = file.content_offset + encrypted_end
+    parts: list[CopyPart] = []
+    if file.content_offset or not server_side:
+        # the first part is downloaded and leaves room for the envelope
+        first_end = min(end, start + buffer_size - file.content_offset)
+        parts.append(CopyPart(first_byte=start, last_byte=first_end - 1))
+        start = first_end
+    if start < end:
+        remaining_parts = (
+            plan_copy_parts(
+                object_size=end - start,
+                content_offset=0,
+                encrypted_part_size=alignment,
+                target_part_size=target_part_size,
+            )
+            if server_side
+            else plan_stream_parts(object_size=end - start, part_size=buffer_size)
+        )
+        parts.extend(
+            CopyPart(
+                first_byte=start + part.first_byte, last_byte=start + part.last_byte
+            )
+            for part in remaining_parts
+        )
+    staged_range = models.StagedRange(
+        file_id=file.file_id,
+        decrypted_first_byte=decrypted_start,
+        decrypted_last_byte=decrypted_end - 1,
+        encrypted_first_byte=encrypted_start,
+        encrypted_last_byte=encrypted_end - 1,
+        staged_size=file.content_offset + encrypted_end - encrypted_start,
+    )
+    return staged_range, parts
+
+
+class RangeStager:
+    """Copies the envelope and selected parts of an object into a new object. The
+    parts are copied server-side if both objects are located on the same node and
+    downloaded into pooled buffers and uploaded again otherwise. The envelope is
+    always prepended to the first part, as only the last part of an object may be
+    smaller than the minimum part size of S3.
+    """
+
+    def __init__(self, *, config: MultipartCopyConfig, pool: BufferPool):
+        """Initialize with config parameters and the pool of buffers to download
+        parts into, which is shared with other copies.
+        """
+        self._config = config
+        self._pool = pool
+
+    async def _copy_part(  # noqa: PLR0913
+        self,
+        *,
+        source_storage: MultipartObjectStoragePort,
+        dest_storage: MultipartObjectStoragePort,
+        object_slots: asyncio.Semaphore,
+        upload_id: str,
+        part_number: int,
+        part: CopyPart,
+        envelope_size: int,
+        server_side: bool,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> str:
+        """Copy a single part, preceded by the given number of bytes of the envelope,
+        and return its ETag.
+        """
+        if server_side and not envelope_size:
+            async with object_slots:
+                return await dest_storage.upload_part_copy(
+                    upload_id=upload_id,
+                    bucket_id=dest_bucket_id,
+                    object_id=dest_object_id,
+                    part_number=part_number,
+                    source_bucket_id=source_bucket_id,
+                    source_object_id=source_object_id,
+                    first_byte=part.first_byte,
+                    last_byte=part.last_byte,
+                )
+
+        async with object_slots, self._pool.buffer() as buffer:
+            content = buffer[: envelope_size + part.last_byte - part.first_byte + 1]
+            if envelope_size:
+                await source_storage.download_range(
+                    bucket_id=source_bucket_id,
+                    object_id=source_object_id,
+                    first_byte=0,
+                    buffer=content[:envelope_size],
+                )
+            await source_storage.download_range(
+                bucket_id=source_bucket_id,
+                object_id=source_object_id,
+                first_byte=part.first_byte,
+                buffer=content[envelope_size:],
+            )
+            return await dest_storage.upload_part(
+                upload_id=upload_id,
+                bucket_id=dest_bucket_id,
+                object_id=dest_object_id,
+                part_number=part_number,
+                content=content,
+            )
+
+    async def copy_range(  # noqa: PLR0913
+        self,
+        *,
+        source_storage: MultipartObjectStoragePort,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_storage: MultipartObjectStoragePort,
+        dest_bucket_id: str,
+        dest_object_id: str,
+        envelope_size: int,
+        parts: list[CopyPart],
+        server_side: bool,
+    ) -> None:
+        """Copy the first bytes of the source object up to the given envelope size,
+        followed by the given parts, into the destination object. Server-side copies
+        require both objects to be located on the same node.
+
+        Raises:
+            ValueError:
+                If a part that has to be downloaded does not fit into a buffer along
+                with the envelope.
+        """
+        for index, part in enumerate(parts):
+            part_envelope_size = envelope_size if index == 0 else 0
+            if (
+                not server_side or part_envelope_size
+            ) and part_envelope_size + part.last_byte + 1 - part.first_byte > (
+                self._pool.buffer_size
+            ):
+                raise ValueError(
+                    "The parts to download must not exceed the buffer size."
+                )
+        upload_id = await dest_storage.init_multipart_upload(
+            bucket_id=dest_bucket_id, object_id=dest_object_id
+        )
+        object_slots = asyncio.Semaphore(
+            self._config.multipart_copy_concurrency_per_object
+        )
+        log.debug(
+            "Copying %i parts of object '%s' to '%s'.",
+            len(parts),
+            source_object_id,
+            dest_object_id,
+        )
+        await upload_parts(
+            object_storage=dest_storage,
+            upload_id=upload_id,
+            bucket_id=dest_bucket_id,
+            object_id=dest_object_id,
+            parts=[
+                self._copy_part(
+                    source_storage=source_storage,
+                    dest_storage=dest_storage,
+                    object_slots=object_slots,
+                    upload_id=upload_id,
+                    part_number=part_number,
+                    part=part,
+                    envelope_size=envelope_size if part_number == 1 else 0,
+                    server_side=server_side,
+                    source_bucket_id=source_bucket_id,
+                    source_object_id=source_object_id,
+                    dest_bucket_id=dest_bucket_id,
+                    dest_object_id=dest_object_id,
+                )
+                for part_number, part in enumerate(parts, start=1)
+            ],
+        )
@@ -0,0 +1,79 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A journal of registrations in progress that allows resuming them after a crash."""
+
+from contextlib import suppress
+from typing import Literal, Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.ports.outbound.dao import RegistrationIntentDaoPort, ResourceNotFoundError
+
+
+class RegistrationJournalConfig(BaseSettings):
+    """Config parameters for journaling registrations in progress."""
+
+    registration_journal_enabled: bool = Field(
+        default=False,
+        description=(
+            "If True, the object ID assigned to a file and the progress of copying its"
+            + " content are recorded in the database before the metadata is inserted."
+            + " A registration interrupted by a crash then resumes with the same object"
+            + " ID and, if the copy had completed, without copying the content again."
+            + " This costs up to three additional database writes per new file."
+        ),
+        examples=[False, True],
+    )
+
+
+class RegistrationJournal:
+    """Records the object ID and the phase of registrations in progress, keyed by
+    file ID. Entries are removed once the metadata of the file has been inserted.
+    """
+
+    def __init__(self, *, registration_intent_dao: RegistrationIntentDaoPort):
+        """Initialize with the DAO persisting the journal."""
+        self._registration_intent_dao = registration_intent_dao
+
+    async def get_intent(self, *, file_id: str) -> Optional[models.RegistrationIntent]:
+        """Get the recorded progress of an interrupted registration of the given file,
+        if any.
+        """
+        try:
+            return await self._registration_intent_dao.get_by_id(file_id)
+        except ResourceNotFoundError:
+            return None
+
+    async def record(
+        self, *, file: models.FileMetadata, phase: Literal["copying", "copied"]
+    ) -> None:
+        """Record that the registration of the given file has reached a phase."""
+        await self._registration_intent_dao.upsert(
+            models.RegistrationIntent(
+                file_id=file.file_id,
+                storage_alias=file.storage_alias,
+                object_id=file.object_id,
+                fingerprint=file.fingerprint or "",
+                phase=phase,
+            )
+        )
+
+    async def complete(self, *, file_id: str) -> None:
+        """Remove the entry of a registration whose metadata has been inserted."""
+        with suppress(ResourceNotFoundError):
+            await self._registration_intent_dao.delete(id_=file_id)
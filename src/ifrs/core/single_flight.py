@@ -0,0 +1,95 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Coalescing of concurrent identical operations."""
+
+import asyncio
+from collections.abc import Awaitable, Hashable
+from dataclasses import dataclass
+from typing import Callable, Generic, TypeVar
+
+Key = TypeVar("Key", bound=Hashable)
+Result = TypeVar("Result")
+
+
+@dataclass
+class Flight(Generic[Result]):
+    """An operation in flight along with the number of callers waiting for it."""
+
+    task: "asyncio.Task[Result]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[Key, Result]):
+    """Makes sure that only one operation per key is in flight at a time.
+
+    Callers that request an operation while another one with the same key is still
+    running do not start their own but wait for the running one and share its result
+    or exception.
+
+    The operation runs in a task of its own, so that a caller that is cancelled
+    while waiting does not affect the others. The operation itself is only
+    cancelled once all of its callers have been cancelled.
+    """
+
+    def __init__(self):
+        """Initialize without operations in flight."""
+        self._in_flight: dict[Key, Flight[Result]] = {}
+
+    def _start(
+        self, key: Key, operation: Callable[[], Awaitable[Result]]
+    ) -> Flight[Result]:
+        """Start the operation in a task that is forgotten once it is done."""
+
+        async def run_operation() -> Result:
+            return await operation()
+
+        flight: Flight[Result] = Flight(task=asyncio.create_task(run_operation()))
+
+        def forget(task: "asyncio.Task[Result]") -> None:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            # mark the exception as retrieved in case nobody is waiting anymore:
+            if not task.cancelled():
+                task.exception()
+
+        flight.task.add_done_callback(forget)
+        self._in_flight[key] = flight
+        return flight
+
+    async def run(
+        self, key: Key, operation: Callable[[], Awaitable[Result]]
+    ) -> tuple[Result, bool]:
+        """Run the operation unless one with the same key is already in flight.
+
+        Returns:
+            The result of the operation and a flag that is `True` if the result was
+            shared from an operation started by another caller.
+        """
+        flight = self._in_flight.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = self._start(key, operation)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
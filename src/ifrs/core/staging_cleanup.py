@@ -0,0 +1,282 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batched deletion of staging objects whose content has been registered."""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager, suppress
+
+from ghga_service_commons.utils.multinode_storage import ObjectStorages
+from hexkit.protocols.objstorage import ObjectStorageProtocol
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core import models
+from ifrs.ports.outbound.dao import ResourceNotFoundError, StagingObjectDaoPort
+from ifrs.ports.outbound.storage import BatchDeleteObjectStoragePort
+
+log = logging.getLogger(__name__)
+
+MAX_OBJECTS_PER_DELETE = 1000  # upper bound for the keys of DeleteObjects in S3
+
+# identifies a staging bucket by storage alias and bucket ID
+BucketKey = tuple[str, str]
+
+
+class StagingCleanupConfig(BaseSettings):
+    """Config parameters for deleting staging objects after registration."""
+
+    staging_cleanup_enabled: bool = Field(
+        default=False,
+        description=(
+            "If True, staging objects are queued for deletion once their content has"
+            + " been registered and are deleted in batches per staging bucket. The"
+            + " queue is persisted in the database, so that it survives a restart."
+        ),
+        examples=[False, True],
+    )
+    staging_cleanup_flush_size: int = Field(
+        default=MAX_OBJECTS_PER_DELETE,
+        ge=1,
+        le=MAX_OBJECTS_PER_DELETE,
+        description=(
+            "The maximum number of staging objects deleted with a single request. A"
+            + " staging bucket is cleaned up early once this many objects are queued."
+        ),
+        examples=[MAX_OBJECTS_PER_DELETE],
+    )
+    staging_cleanup_flush_interval: float = Field(
+        default=60,
+        gt=0,
+        description=(
+            "The maximum time in seconds that a staging object stays queued before"
+            + " its deletion is attempted."
+        ),
+        examples=[60],
+    )
+
+
+def get_cleanup_id(*, storage_alias: str, bucket_id: str, object_id: str) -> str:
+    """Get the ID of a staging object queued for deletion."""
+    return f"{storage_alias}/{bucket_id}/{object_id}"
+
+
+async def delete_objects(
+    *,
+    object_storage: ObjectStorageProtocol,
+    bucket_id: str,
+    object_ids: Sequence[str],
+) -> list[str]:
+    """Delete a batch of objects and return the IDs of the objects that could not be
+    deleted. Storages without batch deletes get one request per object.
+    """
+    if isinstance(object_storage, BatchDeleteObjectStoragePort):
+        return await object_storage.delete_objects(
+            bucket_id=bucket_id, object_ids=object_ids
+        )
+
+    failed: list[str] = []
+    for object_id in object_ids:
+        try:
+            await object_storage.delete_object(bucket_id=bucket_id, object_id=object_id)
+        except object_storage.ObjectNotFoundError:
+            pass
+        except object_storage.ObjectStorageProtocolError:
+            failed.append(object_id)
+    return failed
+
+
+class StagingCleanup:
+    """Queues staging objects for deletion and deletes them in batches per staging
+    bucket, either once a batch is full or after the flush interval.
+
+    Queued objects are persisted before they are deleted and removed from the
+    database afterwards. Objects that could not be deleted stay queued for the next
+    flush.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: StagingCleanupConfig,
+        staging_object_dao: StagingObjectDaoPort,
+        object_storages: ObjectStorages,
+    ):
+        """Initialize with an empty queue."""
+        self._config = config
+        self._staging_object_dao = staging_object_dao
+        self._object_storages = object_storages
+        self._queued: dict[BucketKey, set[str]] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    @classmethod
+    @asynccontextmanager
+    async def construct(
+        cls,
+        *,
+        config: StagingCleanupConfig,
+        staging_object_dao: StagingObjectDaoPort,
+        object_storages: ObjectStorages,
+    ) -> AsyncIterator["StagingCleanup"]:
+        """Restore the persisted queue and flush it in the background while the
+        context is active. Remaining objects are flushed once more on exit.
+        """
+        cleanup = cls(
+            config=config,
+            staging_object_dao=staging_object_dao,
+            object_storages=object_storages,
+        )
+        await cleanup.restore()
+        task = asyncio.create_task(cleanup.run())
+        try:
+            yield cleanup
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            await cleanup.try_flush()
+
+    @property
+    def queued(self) -> int:
+        """The number of staging objects currently queued for deletion."""
+        return sum(len(object_ids) for object_ids in self._queued.values())
+
+    def _add(self, *, storage_alias: str, bucket_id: str, object_id: str) -> None:
+        """Add an object to the in-memory queue and request a flush if its bucket
+        has a full batch.
+        """
+        object_ids = self._queued.setdefault((storage_alias, bucket_id), set())
+        object_ids.add(object_id)
+        if len(object_ids) >= self._config.staging_cleanup_flush_size:
+            self._flush_requested.set()
+
+    async def restore(self) -> None:
+        """Load the queue persisted by previous runs."""
+        async for staging_object in self._staging_object_dao.find_all(mapping={}):
+            self._add(
+                storage_alias=staging_object.storage_alias,
+                bucket_id=staging_object.bucket_id,
+                object_id=staging_object.object_id,
+            )
+        if self._queued:
+            log.info("Restored %i staging objects queued for deletion.", self.queued)
+
+    async def enqueue(
+        self, *, storage_alias: str, bucket_id: str, object_id: str
+    ) -> None:
+        """Persist a staging object as queued for deletion and queue it."""
+        await self._staging_object_dao.upsert(
+            models.StagingObject(
+                cleanup_id=get_cleanup_id(
+                    storage_alias=storage_alias,
+                    bucket_id=bucket_id,
+                    object_id=object_id,
+                ),
+                storage_alias=storage_alias,
+                bucket_id=bucket_id,
+                object_id=object_id,
+            )
+        )
+        self._add(storage_alias=storage_alias, bucket_id=bucket_id, object_id=object_id)
+
+    async def _forget(
+        self, *, storage_alias: str, bucket_id: str, object_id: str
+    ) -> None:
+        """Remove a deleted object from the persisted queue."""
+        with suppress(ResourceNotFoundError):
+            await self._staging_object_dao.delete(
+                id_=get_cleanup_id(
+                    storage_alias=storage_alias,
+                    bucket_id=bucket_id,
+                    object_id=object_id,
+                )
+            )
+
+    async def _flush_bucket(self, *, storage_alias: str, bucket_id: str) -> None:
+        """Delete the objects queued for one staging bucket in batches. Stops at the
+        first batch with failures, leaving the remaining objects queued.
+        """
+        object_ids = self._queued[(storage_alias, bucket_id)]
+        _, object_storage = self._object_storages.for_alias(storage_alias)
+        while object_ids:
+            batch = sorted(object_ids)[: self._config.staging_cleanup_flush_size]
+            try:
+                failed = await delete_objects(
+                    object_storage=object_storage, bucket_id=bucket_id, object_ids=batch
+                )
+            except object_storage.ObjectStorageProtocolError as error:
+                failed = batch
+                log.warning(
+                    "Could not delete staging objects from bucket '%s': %s",
+                    bucket_id,
+                    error,
+                )
+
+            deleted = set(batch).difference(failed)
+            await asyncio.gather(
+                *(
+                    self._forget(
+                        storage_alias=storage_alias,
+                        bucket_id=bucket_id,
+                        object_id=object_id,
+                    )
+                    for object_id in deleted
+                )
+            )
+            object_ids.difference_update(deleted)
+            log.info(
+                "Deleted %i staging objects from bucket '%s'.", len(deleted), bucket_id
+            )
+            if failed:
+                log.warning(
+                    "%i staging objects in bucket '%s' stay queued for deletion.",
+                    len(object_ids),
+                    bucket_id,
+                )
+                break
+
+        if not object_ids:
+            del self._queued[(storage_alias, bucket_id)]
+
+    async def flush(self) -> None:
+        """Delete all queued staging objects, bucket by bucket."""
+        async with self._flush_lock:
+            self._flush_requested.clear()
+            for storage_alias, bucket_id in list(self._queued):
+                await self._flush_bucket(
+                    storage_alias=storage_alias, bucket_id=bucket_id
+                )
+
+    async def try_flush(self) -> None:
+        """Flush, logging instead of raising unexpected errors."""
+        try:
+            await self.flush()
+        except Exception as error:  # pylint: disable=broad-except
+            log.error("Could not clean up the staging buckets: %s", error)
+
+    async def run(self) -> None:
+        """Flush whenever a batch is full or the flush interval has passed, until
+        cancelled.
+        """
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._flush_requested.wait(),
+                    timeout=self._config.staging_cleanup_flush_interval,
+                )
+            await self.try_flush()
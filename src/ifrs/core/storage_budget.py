@@ -0,0 +1,126 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracking of the copies in flight per storage node, used to hold back new work
+while a node is saturated.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class StorageBudgetConfig(BaseSettings):
+    """Config parameters for the budget of copies in flight per storage node."""
+
+    max_copies_in_flight_per_storage: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The maximum number of copy operations in flight per storage alias before"
+            + " the consumption of further events copying to that storage is paused."
+            + " As events are otherwise processed one after another, this only takes"
+            + " effect with multiple event workers, batching, or retries. Copies made"
+            + " through the command line interface are not limited. 0 means unlimited."
+        ),
+        examples=[0, 16],
+    )
+    max_copy_bytes_in_flight_per_storage: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "The maximum number of bytes being copied per storage alias before the"
+            + " consumption of further events copying to that storage is paused. Like"
+            + " the limit of copies, this only takes effect with multiple event workers,"
+            + " batching, or retries. 0 means unlimited."
+        ),
+        examples=[0, 50 * 1024**3],
+    )
+
+
+@dataclass
+class StorageBudgetUsage:
+    """The budget usage of a single storage alias."""
+
+    copies_in_flight: int = 0
+    bytes_in_flight: int = 0
+    max_copies: int = 0
+    max_bytes: int = 0
+
+    @property
+    def exceeded(self) -> bool:
+        """Whether no further copies should be started on this storage for now."""
+        return bool(
+            (self.max_copies and self.copies_in_flight >= self.max_copies)
+            or (self.max_bytes and self.bytes_in_flight >= self.max_bytes)
+        )
+
+
+class StorageBudget:
+    """Keeps track of the copy operations and bytes in flight per storage alias.
+
+    Copies are never blocked by the budget itself. Instead, consumers of new work can
+    wait until the budget of a storage has drained below its limits. Callers of the
+    core that do not wait, such as the command line interface, are not limited.
+    """
+
+    def __init__(self, *, config: StorageBudgetConfig):
+        """Initialize with the limits per storage alias."""
+        self._config = config
+        self._usage: dict[str, StorageBudgetUsage] = {}
+        self._drained = asyncio.Condition()
+
+    def usage(self) -> dict[str, StorageBudgetUsage]:
+        """A snapshot of the current budget usage per storage alias."""
+        return {
+            storage_alias: StorageBudgetUsage(**vars(usage))
+            for storage_alias, usage in self._usage.items()
+        }
+
+    def is_exceeded(self, storage_alias: str) -> bool:
+        """Check whether the budget of the given storage is exceeded."""
+        usage = self._usage.get(storage_alias)
+        return usage is not None and usage.exceeded
+
+    async def wait_for_headroom(self, storage_alias: str) -> None:
+        """Wait until the budget of the given storage is no longer exceeded."""
+        async with self._drained:
+            await self._drained.wait_for(lambda: not self.is_exceeded(storage_alias))
+
+    @asynccontextmanager
+    async def track_copy(self, *, storage_alias: str, size: int) -> AsyncIterator[None]:
+        """Account for a copy of the given size on the given storage while the context
+        is active.
+        """
+        usage = self._usage.setdefault(
+            storage_alias,
+            StorageBudgetUsage(
+                max_copies=self._config.max_copies_in_flight_per_storage,
+                max_bytes=self._config.max_copy_bytes_in_flight_per_storage,
+            ),
+        )
+        usage.copies_in_flight += 1
+        usage.bytes_in_flight += size
+        try:
+            yield
+        finally:
+            usage.copies_in_flight -= 1
+            usage.bytes_in_flight -= size
+            async with self._drained:
+                self._drained.notify_all()
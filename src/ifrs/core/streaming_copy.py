@@ -0,0 +1,260 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Copies of objects between storage nodes that stream the content through a pool of
+reusable buffers.
+"""
+
+import asyncio
+import logging
+import math
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from hexkit.protocols.objstorage import ObjectStorageProtocol
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from ifrs.core.multipart_copy import MAX_PARTS, MIN_PART_SIZE, CopyPart, upload_parts
+from ifrs.ports.outbound.storage import MultipartObjectStoragePort
+
+log = logging.getLogger(__name__)
+
+
+class StreamingCopyConfig(BaseSettings):
+    """Config parameters for copying objects between storage nodes."""
+
+    bucket_storage_aliases: dict[str, str] = Field(
+        default={},
+        description=(
+            "The storage aliases of the nodes hosting staging or outbox buckets that"
+            + " are not located on the node of the storage alias of the files, keyed"
+            + " by bucket ID. Content is streamed between different nodes. Buckets"
+            + " that are not listed are expected on the node of the file."
+        ),
+        examples=[{}, {"staging": "node2", "outbox": "node3"}],
+    )
+    streaming_copy_buffer_size: int = Field(
+        default=16 * 1024**2,
+        ge=MIN_PART_SIZE,
+        description=(
+            "The size in bytes of the buffers through which content is streamed"
+            + " between storage nodes. Each buffer holds one part of the copy."
+        ),
+        examples=[16 * 1024**2],
+    )
+    streaming_copy_buffer_count: int = Field(
+        default=8,
+        ge=1,
+        description=(
+            "The number of buffers shared by all copies between storage nodes. The"
+            + " memory used for streaming is bounded by the buffer count times the"
+            + " buffer size."
+        ),
+        examples=[8],
+    )
+    streaming_copy_concurrency_per_object: int = Field(
+        default=4,
+        ge=1,
+        description=(
+            "The maximum number of parts of one object streamed concurrently between"
+            + " storage nodes."
+        ),
+        examples=[4],
+    )
+
+
+class BufferPool:
+    """A fixed number of equally sized buffers that are allocated on first use and
+    reused afterwards.
+    """
+
+    def __init__(self, *, buffer_size: int, buffer_count: int):
+        """Initialize without allocating any buffers."""
+        self.buffer_size = buffer_size
+        self.buffer_count = buffer_count
+        self._free: list[bytearray] = []
+        self._allocated = 0
+        self._available = asyncio.Semaphore(buffer_count)
+
+    @property
+    def allocated(self) -> int:
+        """The number of buffers allocated so far."""
+        return self._allocated
+
+    @asynccontextmanager
+    async def buffer(self) -> AsyncIterator[memoryview]:
+        """Wait for a free buffer and hold it while the context is active."""
+        async with self._available:
+            if self._free:
+                buffer = self._free.pop()
+            else:
+                buffer = bytearray(self.buffer_size)
+                self._allocated += 1
+            try:
+                yield memoryview(buffer)
+            finally:
+                self._free.append(buffer)
+
+
+def plan_stream_parts(*, object_size: int, part_size: int) -> list[CopyPart]:
+    """Split an object into parts of the given size, the last part may be smaller.
+
+    Raises:
+        ValueError: If the object would need more parts than allowed.
+    """
+    if math.ceil(object_size / part_size) > MAX_PARTS:
+        raise ValueError(
+            f"An object of {object_size} bytes needs more than {MAX_PARTS} parts of"
+            + f" {part_size} bytes."
+        )
+    if object_size == 0:
+        # an upload must consist of at least one part
+        return [CopyPart(first_byte=0, last_byte=-1)]
+    return [
+        CopyPart(
+            first_byte=first_byte,
+            last_byte=min(first_byte + part_size, object_size) - 1,
+        )
+        for first_byte in range(0, object_size, part_size)
+    ]
+
+
+class StreamingCopier:
+    """Copies objects between storage nodes by downloading byte ranges from the
+    source node into pooled buffers and uploading them as parts to the destination
+    node, with several parts in flight at once.
+    """
+
+    def __init__(self, *, config: StreamingCopyConfig):
+        """Initialize with config parameters."""
+        self._config = config
+        self._pool = BufferPool(
+            buffer_size=config.streaming_copy_buffer_size,
+            buffer_count=config.streaming_copy_buffer_count,
+        )
+
+    @property
+    def pool(self) -> BufferPool:
+        """The pool of buffers used by all copies."""
+        return self._pool
+
+    async def _stream_part(  # noqa: PLR0913
+        self,
+        *,
+        source_storage: MultipartObjectStoragePort,
+        dest_storage: MultipartObjectStoragePort,
+        object_slots: asyncio.Semaphore,
+        upload_id: str,
+        part_number: int,
+        part: CopyPart,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> str:
+        """Stream a single part through a pooled buffer and return its ETag."""
+        async with object_slots, self._pool.buffer() as buffer:
+            content = buffer[: part.last_byte + 1 - part.first_byte]
+            if content:
+                await source_storage.download_range(
+                    bucket_id=source_bucket_id,
+                    object_id=source_object_id,
+                    first_byte=part.first_byte,
+                    buffer=content,
+                )
+            return await dest_storage.upload_part(
+                upload_id=upload_id,
+                bucket_id=dest_bucket_id,
+                object_id=dest_object_id,
+                part_number=part_number,
+                content=content,
+            )
+
+    async def copy_object(  # noqa: PLR0913
+        self,
+        *,
+        source_storage: ObjectStorageProtocol,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_storage: ObjectStorageProtocol,
+        dest_bucket_id: str,
+        dest_object_id: str,
+        parts: Optional[list[CopyPart]] = None,
+    ) -> None:
+        """Copy an object from the source to the destination storage, in the given
+        parts if any, which must not exceed the buffer size, or else in parts of the
+        buffer size.
+
+        Raises:
+            TypeError:
+                If one of the storages does not support multipart transfers.
+            ValueError:
+                If one of the given parts exceeds the buffer size.
+        """
+        if not isinstance(source_storage, MultipartObjectStoragePort) or not (
+            isinstance(dest_storage, MultipartObjectStoragePort)
+        ):
+            raise TypeError(
+                "Copies between storage nodes require storages that implement the"
+                + " MultipartObjectStoragePort."
+            )
+
+        if parts is None:
+            object_size = await source_storage.get_object_size(
+                bucket_id=source_bucket_id, object_id=source_object_id
+            )
+            parts = plan_stream_parts(
+                object_size=object_size, part_size=self._pool.buffer_size
+            )
+        elif any(
+            part.last_byte + 1 - part.first_byte > self._pool.buffer_size
+            for part in parts
+        ):
+            raise ValueError("The given parts must not exceed the buffer size.")
+        log.debug(
+            "Streaming object '%s' to another node in %i parts.",
+            source_object_id,
+            len(parts),
+        )
+
+        upload_id = await dest_storage.init_multipart_upload(
+            bucket_id=dest_bucket_id, object_id=dest_object_id
+        )
+        object_slots = asyncio.Semaphore(
+            self._config.streaming_copy_concurrency_per_object
+        )
+        await upload_parts(
+            object_storage=dest_storage,
+            upload_id=upload_id,
+            bucket_id=dest_bucket_id,
+            object_id=dest_object_id,
+            parts=[
+                self._stream_part(
+                    source_storage=source_storage,
+                    dest_storage=dest_storage,
+                    object_slots=object_slots,
+                    upload_id=upload_id,
+                    part_number=part_number,
+                    part=part,
+                    source_bucket_id=source_bucket_id,
+                    source_object_id=source_object_id,
+                    dest_bucket_id=dest_bucket_id,
+                    dest_object_id=dest_object_id,
+                )
+                for part_number, part in enumerate(parts, start=1)
+            ],
+        )
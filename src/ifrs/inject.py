@@ -20,36 +20,110 @@ from contextlib import asynccontextmanager
 from typing import Optional
 
 from ghga_service_commons.utils.context import asyncnullcontext
-from ghga_service_commons.utils.multinode_storage import S3ObjectStorages
 from hexkit.providers.akafka import KafkaEventPublisher, KafkaEventSubscriber
 from hexkit.providers.mongodb import MongoDbDaoFactory
 
+from ifrs.adapters.inbound.akafka import InstrumentedKafkaEventSubscriber
+from ifrs.adapters.inbound.dead_letter import DeadLetterReplayTranslator
 from ifrs.adapters.inbound.event_sub import EventSubTranslator
-from ifrs.adapters.outbound.dao import FileMetadataDaoConstructor
+from ifrs.adapters.outbound.dao import (
+    FileMetadataDaoConstructor,
+    MongoDbFileFingerprintDao,
+    MongoDbOutboxUsageDao,
+    MongoDbPendingRegistrationDao,
+    OutboxObjectDaoConstructor,
+    RegistrationIntentDaoConstructor,
+    StagingObjectDaoConstructor,
+    connect_to_database,
+)
 from ifrs.adapters.outbound.event_pub import EventPubTranslator
+from ifrs.adapters.outbound.metrics import PrometheusMetricsSink
+from ifrs.adapters.outbound.s3 import MultipartS3ObjectStorages
 from ifrs.config import Config
 from ifrs.core.file_registry import FileRegistry
+from ifrs.core.metadata_cache import MetadataCache
+from ifrs.core.outbox_capacity import OutboxCapacity
+from ifrs.core.registration_journal import RegistrationJournal
+from ifrs.core.staging_cleanup import StagingCleanup
+from ifrs.core.storage_budget import StorageBudget
 from ifrs.ports.inbound.file_registry import FileRegistryPort
+from ifrs.ports.outbound.metrics import MetricsSinkPort
 
 
 @asynccontextmanager
-async def prepare_core(*, config: Config) -> AsyncGenerator[FileRegistryPort, None]:
-    """Constructs and initializes all core components and their outbound dependencies."""
+async def prepare_core(
+    *,
+    config: Config,
+    storage_budget: Optional[StorageBudget] = None,
+    metrics_sink: Optional[MetricsSinkPort] = None,
+) -> AsyncGenerator[FileRegistryPort, None]:
+    """Constructs and initializes all core components and their outbound dependencies.
+    The copies of the core are accounted for in the given storage budget, if any. If
+    enabled, staging objects are cleaned up in the background while the core is in
+    use and registrations in progress are journaled. Likewise, outbox objects are
+    evicted in the background from nodes with a limited outbox capacity. The metrics
+    of the metadata cache, if enabled, are recorded in the given sink.
+    """
     dao_factory = MongoDbDaoFactory(config=config)
-    object_storages = S3ObjectStorages(config=config)
+    object_storages = MultipartS3ObjectStorages(config=config)
     file_metadata_dao = await FileMetadataDaoConstructor.construct(
         dao_factory=dao_factory
     )
+    registration_journal = (
+        RegistrationJournal(
+            registration_intent_dao=await RegistrationIntentDaoConstructor.construct(
+                dao_factory=dao_factory
+            )
+        )
+        if config.registration_journal_enabled
+        else None
+    )
 
-    async with KafkaEventPublisher.construct(config=config) as kafka_event_publisher:
+    async with connect_to_database(
+        config=config
+    ) as database, KafkaEventPublisher.construct(
+        config=config
+    ) as kafka_event_publisher, (
+        StagingCleanup.construct(
+            config=config,
+            staging_object_dao=await StagingObjectDaoConstructor.construct(
+                dao_factory=dao_factory
+            ),
+            object_storages=object_storages,
+        )
+        if config.staging_cleanup_enabled
+        else asyncnullcontext(None)
+    ) as staging_cleanup, (
+        OutboxCapacity.construct(
+            config=config,
+            outbox_object_dao=await OutboxObjectDaoConstructor.construct(
+                dao_factory=dao_factory
+            ),
+            outbox_usage_dao=await MongoDbOutboxUsageDao.construct(database=database),
+            object_storages=object_storages,
+        )
+        if config.outbox_capacities
+        else asyncnullcontext(None)
+    ) as outbox_capacity:
         event_publisher = EventPubTranslator(
             config=config, provider=kafka_event_publisher
         )
         file_registry = FileRegistry(
             file_metadata_dao=file_metadata_dao,
+            file_fingerprint_dao=MongoDbFileFingerprintDao(database=database),
+            pending_registration_dao=MongoDbPendingRegistrationDao(database=database),
             event_publisher=event_publisher,
             object_storages=object_storages,
             config=config,
+            storage_budget=storage_budget,
+            staging_cleanup=staging_cleanup,
+            registration_journal=registration_journal,
+            metadata_cache=(
+                MetadataCache(config=config, metrics_sink=metrics_sink)
+                if config.metadata_cache_max_entries
+                else None
+            ),
+            outbox_capacity=outbox_capacity,
         )
         yield file_registry
 
@@ -58,30 +132,116 @@ def prepare_core_with_override(
     *,
     config: Config,
     core_override: Optional[FileRegistryPort] = None,
+    storage_budget: Optional[StorageBudget] = None,
+    metrics_sink: Optional[MetricsSinkPort] = None,
 ):
     """Resolve the prepare_core context manager based on config and override (if any)."""
     return (
         asyncnullcontext(core_override)
         if core_override
-        else prepare_core(config=config)
+        else prepare_core(
+            config=config, storage_budget=storage_budget, metrics_sink=metrics_sink
+        )
     )
 
 
+@asynccontextmanager
+async def prepare_event_sub_translator(
+    *,
+    config: Config,
+    core_override: Optional[FileRegistryPort] = None,
+    metrics_sink: Optional[MetricsSinkPort] = None,
+) -> AsyncGenerator[EventSubTranslator, None]:
+    """Construct and initialize the translator for inbound events along with the core
+    and, if a dead-letter topic is configured, a publisher for that topic.
+
+    The core and the translator share a storage budget, so that the consumption is
+    paused while the copies in flight exceed the budget of a storage.
+    """
+    storage_budget = StorageBudget(config=config)
+    async with prepare_core_with_override(
+        config=config,
+        core_override=core_override,
+        storage_budget=storage_budget,
+        metrics_sink=metrics_sink,
+    ) as file_registry, (
+        KafkaEventPublisher.construct(config=config)
+        if config.dead_letter_topic
+        else asyncnullcontext(None)
+    ) as dead_letter_publisher, EventSubTranslator.construct(
+        file_registry=file_registry,
+        config=config,
+        storage_budget=storage_budget,
+        dead_letter_publisher=dead_letter_publisher,
+        metrics_sink=metrics_sink,
+    ) as event_sub_translator:
+        yield event_sub_translator
+
+
 @asynccontextmanager
 async def prepare_event_subscriber(
-    *, config: Config, core_override: Optional[FileRegistryPort] = None
+    *,
+    config: Config,
+    core_override: Optional[FileRegistryPort] = None,
+    metrics_sink: Optional[MetricsSinkPort] = None,
 ):
     """Construct and initialize an event subscriber with all its dependencies.
     By default, the core dependencies are automatically prepared but you can also
     provide them using the core_override parameter.
+
+    Metrics on the consumed and processed events are recorded in the given sink or,
+    by default, in a Prometheus sink that is served if a metrics port is configured.
     """
-    async with prepare_core_with_override(
-        config=config, core_override=core_override
-    ) as file_registry:
-        event_sub_translator = EventSubTranslator(
-            file_registry=file_registry, config=config
+    if metrics_sink is None:
+        metrics_sink = PrometheusMetricsSink()
+    async with (
+        metrics_sink.serve(
+            host=config.metrics_host,
+            port=config.metrics_port,
+            request_timeout=config.metrics_request_timeout,
         )
-        async with KafkaEventSubscriber.construct(
-            config=config, translator=event_sub_translator
-        ) as kafka_event_subscriber:
-            yield kafka_event_subscriber
+        if isinstance(metrics_sink, PrometheusMetricsSink) and config.metrics_port
+        else asyncnullcontext(None)
+    ), prepare_event_sub_translator(
+        config=config, core_override=core_override, metrics_sink=metrics_sink
+    ) as event_sub_translator, InstrumentedKafkaEventSubscriber.construct(
+        config=config, translator=event_sub_translator, metrics_sink=metrics_sink
+    ) as kafka_event_subscriber:
+        yield kafka_event_subscriber
+
+
+@asynccontextmanager
+async def prepare_dead_letter_replayer(
+    *,
+    config: Config,
+    concurrency: int,
+    rate: Optional[float] = None,
+    idle_timeout: Optional[float] = None,
+    core_override: Optional[FileRegistryPort] = None,
+) -> AsyncGenerator[tuple[KafkaEventSubscriber, DeadLetterReplayTranslator], None]:
+    """Construct and initialize an event subscriber for the dead-letter topic that
+    replays its events through the regular translator, along with the replaying
+    translator to inspect its progress. The subscriber uses its own consumer group
+    and, if an idle timeout in seconds is given, stops running once no event arrives
+    within that time.
+
+    Raises:
+        ValueError: When no dead-letter topic is configured.
+    """
+    if not config.dead_letter_topic:
+        raise ValueError("No dead-letter topic configured.")
+
+    replay_config = config.model_copy(
+        update={"service_name": f"{config.service_name}_dead_letter_replay"}
+    )
+    async with prepare_event_sub_translator(
+        config=config, core_override=core_override
+    ) as event_sub_translator, DeadLetterReplayTranslator.construct(
+        dead_letter_topic=config.dead_letter_topic,
+        target=event_sub_translator,
+        concurrency=concurrency,
+        rate=rate,
+    ) as replay_translator, InstrumentedKafkaEventSubscriber.construct(
+        config=replay_config, translator=replay_translator, idle_timeout=idle_timeout
+    ) as kafka_event_subscriber:
+        yield kafka_event_subscriber, replay_translator
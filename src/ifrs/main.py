@@ -15,10 +15,29 @@
 
 """In this module object construction and dependency injection is carried out."""
 
+import json
+import logging
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import suppress
+from itertools import islice
+from typing import Optional, Union
+
 from hexkit.log import configure_logging
+from hexkit.providers.mongodb import MongoDbDaoFactory
+from pydantic import ValidationError
 
+from ifrs.adapters.inbound.dead_letter import ReplayCaughtUpError
+from ifrs.adapters.outbound.dao import FileMetadataDaoConstructor
 from ifrs.config import Config
-from ifrs.inject import prepare_event_subscriber
+from ifrs.core import models
+from ifrs.core.fingerprints import backfill_fingerprints
+from ifrs.inject import (
+    prepare_core,
+    prepare_dead_letter_replayer,
+    prepare_event_subscriber,
+)
+
+log = logging.getLogger(__name__)
 
 
 async def consume_events(run_forever: bool = True):
@@ -28,3 +47,142 @@ async def consume_events(run_forever: bool = True):
 
     async with prepare_event_subscriber(config=config) as event_subscriber:
         await event_subscriber.run(forever=run_forever)
+
+
+async def replay_dead_letters(
+    *, concurrency: int, rate: Optional[float], idle_timeout: float
+):
+    """Replay the events of the dead-letter topic until no further event arrives
+    within the idle timeout (in seconds) or until events are reached that have been
+    dead-lettered after the replay started. Only waiting for the next event counts
+    towards the idle timeout, so that events are never interrupted while being
+    replayed.
+    """
+    config = Config()  # type: ignore
+    configure_logging(config=config)
+
+    async with prepare_dead_letter_replayer(
+        config=config, concurrency=concurrency, rate=rate, idle_timeout=idle_timeout
+    ) as (event_subscriber, replay_translator):
+        with suppress(ReplayCaughtUpError):
+            await event_subscriber.run(forever=True)
+
+    stats = replay_translator.stats
+    log.info(
+        "Replayed %i events from the dead-letter topic, %i failed.",
+        stats.replayed,
+        stats.failed,
+    )
+
+
+def parse_registration_request(
+    line: str, *, line_number: int
+) -> Union[models.FileRegistrationRequest, models.FileRegistrationOutcome]:
+    """Parse a registration request given as JSON object. If the line is not a valid
+    request, the rejected outcome is returned instead, with the file ID if it can be
+    read from the line.
+    """
+    try:
+        return models.FileRegistrationRequest.model_validate_json(line)
+    except ValidationError as error:
+        file_id = None
+        with suppress(ValueError, LookupError, TypeError):
+            file_id = json.loads(line)["file_without_object_id"]["file_id"]
+        return models.FileRegistrationOutcome(
+            file_id=file_id if isinstance(file_id, str) else None,
+            outcome="rejected",
+            error=f"Invalid registration request in line {line_number}: {error}",
+        )
+
+
+def read_registration_requests(
+    lines: Iterable[str], *, batch_size: int
+) -> Iterator[
+    list[Union[models.FileRegistrationRequest, models.FileRegistrationOutcome]]
+]:
+    """Parse registration requests given as one JSON object per line, skipping empty
+    lines, and yield them in batches of the given size. Invalid lines are yielded as
+    rejected outcomes in place of their request.
+    """
+    requests = (
+        parse_registration_request(line, line_number=line_number)
+        for line_number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while batch := list(islice(requests, batch_size)):
+        yield batch
+
+
+async def register_files(
+    *, lines: Iterable[str], batch_size: int
+) -> AsyncIterator[list[models.FileRegistrationOutcome]]:
+    """Register the files of the given registration requests, one JSON object per
+    line, in bulk registrations of the given batch size and yield the outcomes per
+    request as soon as a batch has been processed. Invalid requests and failures do
+    not stop the registration of the remaining files.
+    """
+    config = Config()  # type: ignore
+    configure_logging(config=config)
+
+    processed = 0
+    async with prepare_core(config=config) as file_registry:
+        for batch in read_registration_requests(lines, batch_size=batch_size):
+            requests = [
+                request
+                for request in batch
+                if isinstance(request, models.FileRegistrationRequest)
+            ]
+            outcomes = iter(
+                await file_registry.register_files(
+                    requests=requests, raise_on_failure=False
+                )
+                if requests
+                else []
+            )
+            processed += len(batch)
+            log.info("Processed %i registration requests.", processed)
+            yield [
+                next(outcomes)
+                if isinstance(request, models.FileRegistrationRequest)
+                else request
+                for request in batch
+            ]
+
+
+async def stage_file_range(  # noqa: PLR0913
+    *,
+    file_id: str,
+    decrypted_sha256: str,
+    outbox_object_id: str,
+    outbox_bucket_id: str,
+    first_byte: int,
+    last_byte: int,
+) -> models.StagedRange:
+    """Stage an inclusive byte range of the decrypted content of a registered file to
+    the given outbox object and return the ranges that have been staged.
+    """
+    config = Config()  # type: ignore
+    configure_logging(config=config)
+
+    async with prepare_core(config=config) as file_registry:
+        return await file_registry.stage_registered_file_range(
+            file_id=file_id,
+            decrypted_sha256=decrypted_sha256,
+            outbox_object_id=outbox_object_id,
+            outbox_bucket_id=outbox_bucket_id,
+            first_byte=first_byte,
+            last_byte=last_byte,
+        )
+
+
+async def store_missing_fingerprints() -> int:
+    """Store the fingerprints of all files registered before fingerprints were
+    introduced and return the number of updated files.
+    """
+    config = Config()  # type: ignore
+    configure_logging(config=config)
+
+    file_metadata_dao = await FileMetadataDaoConstructor.construct(
+        dao_factory=MongoDbDaoFactory(config=config)
+    )
+    return await backfill_fingerprints(file_metadata_dao=file_metadata_dao)
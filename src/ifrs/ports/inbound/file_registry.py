@@ -16,6 +16,7 @@
 """Interface for managing a internal registry of files."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 
 from ifrs.core import models
 
@@ -79,6 +80,31 @@ class FileRegistryPort(ABC):
             message = f"The file with the ID '{file_id}' has not (yet) been registered."
             super().__init__(message)
 
+    class InvalidRangeError(InvalidRequestError):
+        """Thrown when a requested byte range is not within the decrypted content of a
+        file.
+        """
+
+        def __init__(self, file_id: str, first_byte: int, last_byte: int):
+            message = (
+                f"The range {first_byte}-{last_byte} is not within the decrypted"
+                + f" content of the file with the ID '{file_id}'."
+            )
+            super().__init__(message)
+
+    class OutboxObjectMismatchError(InvalidRequestError):
+        """Thrown when a range is staged to an outbox object that already exists with
+        content of a different size, e.g. of another range.
+        """
+
+        def __init__(self, object_id: str, size: int, expected_size: int):
+            message = (
+                f"The outbox object '{object_id}' already exists with a size of {size}"
+                + f" bytes, but the requested range has a size of {expected_size}"
+                + " bytes."
+            )
+            super().__init__(message)
+
     class FileInRegistryButNotInStorageError(FatalError):
         """Thrown if a file is registered (metadata is present in the database) but its
         content is not present in the permanent storage.
@@ -91,6 +117,33 @@ class FileRegistryPort(ABC):
             )
             super().__init__(message)
 
+    class RegistrationInProgressError(RuntimeError):
+        """Thrown when a file is being registered by another registration attempt that
+        has neither completed nor been abandoned yet. The registration may be retried
+        later.
+        """
+
+        def __init__(self, file_id: str):
+            message = (
+                f"The file with the ID '{file_id}' is being registered by another"
+                + " registration attempt."
+            )
+            super().__init__(message)
+
+    class CopyVerificationError(RuntimeError):
+        """Thrown when the ETag of a copy of the content of a file does not match the
+        ETag derived from the stored checksums of the encrypted parts. The copy is
+        removed, so the operation can be retried.
+        """
+
+        def __init__(self, file_id: str, object_id: str, expected_etag: str, etag: str):
+            message = (
+                f"The copy '{object_id}' of the content of the file with the ID"
+                + f" '{file_id}' has the ETag '{etag}' but '{expected_etag}' was"
+                + " expected from the checksums of the encrypted parts."
+            )
+            super().__init__(message)
+
     @abstractmethod
     async def register_file(
         self,
@@ -116,6 +169,34 @@ class FileRegistryPort(ABC):
         """
         ...
 
+    @abstractmethod
+    async def register_files(
+        self,
+        *,
+        requests: Sequence[models.FileRegistrationRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileRegistrationOutcome]:
+        """Registers multiple files at once and moves their content from the staging
+        into the permanent storage. Per file, this behaves like `register_file`,
+        however, all files are looked up with a single query. The copies, inserts, and
+        published events are then issued concurrently per file.
+        A failure for one file does not prevent the registration of the other files.
+
+        Args:
+            requests: the files to register along with their staging location.
+            raise_on_failure:
+                If False, failures are only reported in the returned outcomes.
+
+        Returns:
+            The outcome per request, in the order of the requests.
+
+        Raises:
+            self.FileContentNotInStagingError:
+                When the file content is not present in the storage staging. Raised
+                after all other files of the batch have been processed.
+        """
+        ...
+
     @abstractmethod
     async def stage_registered_file(
         self,
@@ -149,6 +230,82 @@ class FileRegistryPort(ABC):
         """
         ...
 
+    @abstractmethod
+    async def stage_registered_files(
+        self,
+        *,
+        requests: Sequence[models.FileStagingRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileStagingOutcome]:
+        """Stage multiple registered files to the outbox at once. Per file, this
+        behaves like `stage_registered_file`, however, the metadata of all files is
+        looked up with a single query. A failure for one file does not prevent the
+        staging of the other files.
+
+        Args:
+            requests: the files to stage along with their outbox location.
+            raise_on_failure:
+                If False, failures are only reported in the returned outcomes.
+
+        Returns:
+            The outcome per request, in the order of the requests.
+
+        Raises:
+            self.FileNotInRegistryError:
+                When a file is requested that has not (yet) been registered. Raised
+                after all other files of the batch have been processed.
+        """
+        ...
+
+    @abstractmethod
+    async def stage_registered_file_range(  # noqa: PLR0913
+        self,
+        *,
+        file_id: str,
+        decrypted_sha256: str,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> models.StagedRange:
+        """Stage the part of a registered file needed to decrypt the given inclusive
+        byte range of its decrypted content to the outbox. The staged object consists
+        of the crypt4gh envelope, if part of the stored object, followed by the
+        encrypted segments covering the range. As the staged object does not hold the
+        entire file, no file_staged_for_download event is published.
+
+        Args:
+            file_id:
+                The identifier of the file.
+            decrypted_sha256:
+                The checksum of the decrypted content. This is used to make sure that
+                this service and the outside client are talking about the same file.
+            outbox_object_id:
+                The S3 object ID for the outbox bucket.
+            outbox_bucket_id:
+                The S3 bucket ID for the outbox.
+            first_byte: The first byte of the requested decrypted content.
+            last_byte: The last byte of the requested decrypted content.
+
+        Returns:
+            The ranges of the decrypted and encrypted content that have been staged.
+
+        Raises:
+            self.FileNotInRegistryError:
+                When a file is requested that has not (yet) been registered.
+            self.ChecksumMismatchError:
+                When the provided checksum did not match the expectations.
+            self.InvalidRangeError:
+                When the range is not within the decrypted content of the file.
+            self.OutboxObjectMismatchError:
+                When the outbox object already exists with a size that differs from
+                the one of the requested range, e.g. because it holds another range.
+            self.FileInRegistryButNotInStorageError:
+                When encountering inconsistency between the registry (the database) and
+                the permanent storage. This a fatal error.
+        """
+        ...
+
     @abstractmethod
     async def delete_file(self, *, file_id: str) -> None:
         """Deletes a file from the permanent storage and the internal database.
@@ -15,10 +15,93 @@
 
 """DAO interface for accessing the database."""
 
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
+
 # pylint: disable=unused-import
-from hexkit.protocols.dao import DaoNaturalId, ResourceNotFoundError  # noqa: F401
+from hexkit.protocols.dao import (  # noqa: F401
+    DaoNaturalId,
+    ResourceAlreadyExistsError,
+    ResourceNotFoundError,
+)
 
 from ifrs.core import models
 
-# port described by a type alias:
+# ports described by type aliases:
 FileMetadataDaoPort = DaoNaturalId[models.FileMetadata]
+StagingObjectDaoPort = DaoNaturalId[models.StagingObject]
+RegistrationIntentDaoPort = DaoNaturalId[models.RegistrationIntent]
+OutboxObjectDaoPort = DaoNaturalId[models.OutboxObject]
+
+
+class FileFingerprintDaoPort(ABC):
+    """Reads the fingerprints of registered files without their full metadata."""
+
+    @abstractmethod
+    async def get_fingerprints(
+        self, *, file_ids: Sequence[str]
+    ) -> dict[str, models.FileFingerprint]:
+        """Get the fingerprints of those of the given files that are registered, keyed
+        by file ID.
+        """
+        ...
+
+
+class PendingRegistrationDaoPort(ABC):
+    """Changes the metadata of files with a pending registration only while the
+    registration is still claimed by the expected registration attempt, which is
+    identified by the object ID it assigned to the file.
+    """
+
+    @abstractmethod
+    async def complete(self, *, file_id: str, object_id: str) -> bool:
+        """Mark the pending registration of the file with the given object ID as
+        completed and return whether it was still pending with that object ID.
+        """
+        ...
+
+    @abstractmethod
+    async def take_over(
+        self, *, file: models.FileMetadata, claimed: models.FileMetadata
+    ) -> bool:
+        """Replace the metadata of a pending registration with the given metadata of a
+        new registration attempt, if it is still claimed as given, and return whether
+        it has been replaced.
+        """
+        ...
+
+    @abstractmethod
+    async def abandon(self, *, file_id: str, object_id: str) -> bool:
+        """Delete the metadata of the file if its registration is still pending with
+        the given object ID and return whether it has been deleted.
+        """
+        ...
+
+
+class OutboxUsageDaoPort(ABC):
+    """Reads the usage of outbox buckets of limited capacity and their least recently
+    staged objects without reading all records of a storage node.
+    """
+
+    @abstractmethod
+    async def get_usage(self, *, storage_alias: str) -> int:
+        """Get the total size in bytes of the outbox objects recorded for a node."""
+        ...
+
+    @abstractmethod
+    def find_least_recently_staged(
+        self, *, storage_alias: str, staged_before: float
+    ) -> AsyncIterator[models.OutboxObject]:
+        """Iterate over the outbox objects recorded for a node that were last staged
+        no later than the given time, least recently staged first. The records are
+        read lazily, so that only as many are read as are consumed.
+        """
+        ...
+
+    @abstractmethod
+    async def delete_if_unchanged(self, *, outbox_object: models.OutboxObject) -> bool:
+        """Delete the record of an outbox object only if it has not been staged again
+        since it was read, i.e. if the time it was last staged is unchanged, and
+        return whether it has been deleted.
+        """
+        ...
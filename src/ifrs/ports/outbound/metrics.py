@@ -0,0 +1,76 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Interface for recording metrics and the names of the metrics recorded."""
+
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+
+EVENTS_CONSUMED = "ifrs_events_consumed_total"
+CONSUMER_LAG = "ifrs_consumer_lag"
+EVENTS_PROCESSED = "ifrs_events_processed_total"
+EVENT_PROCESSING_SECONDS = "ifrs_event_processing_seconds"
+METADATA_CACHE_LOOKUPS = "ifrs_metadata_cache_lookups_total"
+METADATA_CACHE_EVICTIONS = "ifrs_metadata_cache_evictions_total"
+METADATA_CACHE_ENTRIES = "ifrs_metadata_cache_entries"
+METADATA_CACHE_BYTES = "ifrs_metadata_cache_bytes"
+
+METRIC_DESCRIPTIONS = {
+    EVENTS_CONSUMED: "Number of events received from Kafka by topic and type.",
+    CONSUMER_LAG: (
+        "Number of events in a partition that have not been consumed yet, as of the"
+        + " last consumed event of that partition."
+    ),
+    EVENTS_PROCESSED: (
+        "Number of processing attempts by event type and outcome (success, failure,"
+        + " skipped, or dead_lettered)."
+    ),
+    EVENT_PROCESSING_SECONDS: (
+        "Duration of processing attempts by event type. Registration batches are"
+        + " observed once per batch."
+    ),
+    METADATA_CACHE_LOOKUPS: (
+        "Number of lookups in the metadata cache by result (hit or miss)."
+    ),
+    METADATA_CACHE_EVICTIONS: (
+        "Number of entries evicted from the metadata cache by reason (capacity or"
+        + " expired)."
+    ),
+    METADATA_CACHE_ENTRIES: "Number of files whose metadata is cached.",
+    METADATA_CACHE_BYTES: "Approximate size of the cached metadata in bytes.",
+}
+
+
+class MetricsSinkPort(ABC):
+    """A port through which counters, gauges, and histograms are recorded."""
+
+    @abstractmethod
+    def increment_counter(
+        self, name: str, *, labels: Mapping[str, str], value: float = 1
+    ) -> None:
+        """Increase the counter with the given name and labels by the given value."""
+        ...
+
+    @abstractmethod
+    def set_gauge(self, name: str, *, labels: Mapping[str, str], value: float) -> None:
+        """Set the gauge with the given name and labels to the given value."""
+        ...
+
+    @abstractmethod
+    def observe_histogram(
+        self, name: str, *, labels: Mapping[str, str], value: float
+    ) -> None:
+        """Record an observation in the histogram with the given name and labels."""
+        ...
@@ -15,8 +15,98 @@
 
 """Interfaces for object storage adapters and the exception they may throw."""
 
+from abc import abstractmethod
+from collections.abc import Sequence
+
 # pylint: disable=unused-import
 from hexkit.protocols.objstorage import ObjectStorageProtocol
 
 # Further abstraction seems not adequate here, thus using the protocol as port.
 ObjectStoragePort = ObjectStorageProtocol
+
+
+class MultipartObjectStoragePort(ObjectStorageProtocol):
+    """An object storage that additionally supports filling the parts of a multipart
+    upload with byte ranges of other objects, either server-side or from memory, so
+    that large objects can be copied in parallel parts, also between storage nodes.
+    The multipart upload itself is initiated and aborted as defined by the
+    `ObjectStorageProtocol`. In addition, the ETag of an object can be requested
+    without downloading its content.
+    """
+
+    @abstractmethod
+    async def upload_part_copy(  # noqa: PLR0913
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        source_bucket_id: str,
+        source_object_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> str:
+        """Copy the given inclusive byte range of the source object into the part with
+        the given number of a multipart upload and return the ETag of the part.
+        """
+        ...
+
+    @abstractmethod
+    async def download_range(
+        self, *, bucket_id: str, object_id: str, first_byte: int, buffer: memoryview
+    ) -> None:
+        """Download the byte range of an object starting at the given byte into the
+        given buffer, filling the buffer completely.
+        """
+        ...
+
+    @abstractmethod
+    async def upload_part(  # noqa: PLR0913
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        content: memoryview,
+    ) -> str:
+        """Upload the given content as the part with the given number of a multipart
+        upload and return the ETag of the part.
+        """
+        ...
+
+    @abstractmethod
+    async def complete_parts(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_etags: Sequence[str],
+    ) -> None:
+        """Complete a multipart upload consisting of the parts with the given ETags,
+        ordered by part number starting at 1.
+        """
+        ...
+
+    @abstractmethod
+    async def get_object_etag(self, *, bucket_id: str, object_id: str) -> str:
+        """Get the ETag of an object from its metadata, without surrounding quotes."""
+        ...
+
+
+class BatchDeleteObjectStoragePort(ObjectStorageProtocol):
+    """An object storage that additionally supports deleting multiple objects of a
+    bucket with a single request.
+    """
+
+    @abstractmethod
+    async def delete_objects(
+        self, *, bucket_id: str, object_ids: Sequence[str]
+    ) -> list[str]:
+        """Delete the objects with the given IDs from a bucket, treating objects that
+        do not exist as deleted, and return the IDs of the objects that could not be
+        deleted.
+        """
+        ...
@@ -0,0 +1,211 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A stand-in for the core used to test the inbound adapters in isolation."""
+
+import asyncio
+from collections.abc import Sequence
+from typing import Optional
+
+from ifrs.adapters.inbound.event_sub import EventSubTranslatorConfig
+from ifrs.core import models
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+
+EVENT_SUB_CONFIG = EventSubTranslatorConfig(
+    files_to_register_topic="file_interrogation",
+    files_to_register_type="file_interrogation_success",
+    files_to_stage_topic="file_downloads",
+    files_to_stage_type="file_stage_requested",
+    files_to_delete_topic="file_deletions",
+    files_to_delete_type="file_deletion_requested",
+)
+
+
+def files_to_register_payload(file_id: str) -> dict[str, object]:
+    """Get the payload of a files_to_register event for the given file ID."""
+    return {
+        "file_id": file_id,
+        "object_id": f"{file_id}-staged",
+        "bucket_id": "staging",
+        "s3_endpoint_alias": EXAMPLE_METADATA_BASE.storage_alias,
+        "upload_date": EXAMPLE_METADATA_BASE.upload_date,
+        "decrypted_size": EXAMPLE_METADATA_BASE.decrypted_size,
+        "decryption_secret_id": EXAMPLE_METADATA_BASE.decryption_secret_id,
+        "content_offset": EXAMPLE_METADATA_BASE.content_offset,
+        "encrypted_part_size": EXAMPLE_METADATA_BASE.encrypted_part_size,
+        "encrypted_parts_md5": EXAMPLE_METADATA_BASE.encrypted_parts_md5,
+        "encrypted_parts_sha256": EXAMPLE_METADATA_BASE.encrypted_parts_sha256,
+        "decrypted_sha256": EXAMPLE_METADATA_BASE.decrypted_sha256,
+    }
+
+
+def files_to_stage_payload(
+    file_id: str, target_object_id: Optional[str] = None
+) -> dict[str, object]:
+    """Get the payload of a files_to_stage event for the given file ID."""
+    return {
+        "file_id": file_id,
+        "target_object_id": target_object_id or f"{file_id}-outbox",
+        "target_bucket_id": "outbox",
+        "s3_endpoint_alias": EXAMPLE_METADATA_BASE.storage_alias,
+        "decrypted_sha256": EXAMPLE_METADATA_BASE.decrypted_sha256,
+    }
+
+
+class FakeFileRegistry(FileRegistryPort):
+    """Records the calls it receives and simulates I/O latency."""
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0,
+        fail_for: Optional[str] = None,
+        latency_by_method: Optional[dict[str, float]] = None,
+        transient_failures: Optional[dict[str, int]] = None,
+    ):
+        """Initialize with the simulated latency per call in seconds, optionally
+        overwritten per method, and optionally a file ID for which all calls shall
+        fail. Transient failures give the number of calls per file ID that fail
+        with a connection error before succeeding.
+        """
+        self.latency = latency
+        self.latency_by_method = latency_by_method or {}
+        self.fail_for = fail_for
+        self.transient_failures = dict(transient_failures or {})
+        self.calls: list[tuple[str, str]] = []
+        self.batches: list[list[str]] = []
+        self.outbox_object_ids: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _handle(self, *, method: str, file_id: str) -> None:
+        """Simulate processing a call."""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.latency_by_method.get(method, self.latency))
+            if file_id == self.fail_for:
+                raise self.FileContentNotInStagingError(file_id=file_id)
+            if self.transient_failures.get(file_id, 0) > 0:
+                self.transient_failures[file_id] -= 1
+                raise ConnectionError(f"Simulated transient failure for {file_id}.")
+            self.calls.append((method, file_id))
+        finally:
+            self.running -= 1
+
+    async def register_file(
+        self,
+        *,
+        file_without_object_id: models.FileMetadataBase,
+        staging_object_id: str,
+        staging_bucket_id: str,
+    ) -> None:
+        """Record a registration."""
+        await self._handle(
+            method="register_file", file_id=file_without_object_id.file_id
+        )
+
+    async def register_files(
+        self,
+        *,
+        requests: Sequence[models.FileRegistrationRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileRegistrationOutcome]:
+        """Record a batch of registrations."""
+        file_ids = [request.file_without_object_id.file_id for request in requests]
+        self.batches.append(file_ids)
+        for file_id in file_ids:
+            await self._handle(method="register_file", file_id=file_id)
+        return [
+            models.FileRegistrationOutcome(file_id=file_id, outcome="registered")
+            for file_id in file_ids
+        ]
+
+    async def stage_registered_file(
+        self,
+        *,
+        file_id: str,
+        decrypted_sha256: str,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+    ) -> None:
+        """Record a staging."""
+        await self._handle(method="stage_registered_file", file_id=file_id)
+        self.outbox_object_ids.append(outbox_object_id)
+
+    async def stage_registered_files(
+        self,
+        *,
+        requests: Sequence[models.FileStagingRequest],
+        raise_on_failure: bool = True,
+    ) -> list[models.FileStagingOutcome]:
+        """Record a batch of stagings. Failures are reported as outcomes unless they
+        shall be raised.
+        """
+        self.batches.append([request.file_id for request in requests])
+        outcomes: list[models.FileStagingOutcome] = []
+        for request in requests:
+            try:
+                await self._handle(
+                    method="stage_registered_file", file_id=request.file_id
+                )
+            except Exception as error:
+                if raise_on_failure:
+                    raise
+                outcomes.append(
+                    models.FileStagingOutcome(
+                        file_id=request.file_id,
+                        outbox_object_id=request.outbox_object_id,
+                        outcome="failed",
+                        error=str(error),
+                    )
+                )
+                continue
+            self.outbox_object_ids.append(request.outbox_object_id)
+            outcomes.append(
+                models.FileStagingOutcome(
+                    file_id=request.file_id,
+                    outbox_object_id=request.outbox_object_id,
+                    outcome="staged",
+                )
+            )
+        return outcomes
+
+    async def stage_registered_file_range(
+        self,
+        *,
+        file_id: str,
+        decrypted_sha256: str,
+        outbox_object_id: str,
+        outbox_bucket_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> models.StagedRange:
+        """Record a staging of a byte range."""
+        await self._handle(method="stage_registered_file", file_id=file_id)
+        self.outbox_object_ids.append(outbox_object_id)
+        return models.StagedRange(
+            file_id=file_id,
+            decrypted_first_byte=first_byte,
+            decrypted_last_byte=last_byte,
+            encrypted_first_byte=first_byte,
+            encrypted_last_byte=last_byte,
+            staged_size=last_byte - first_byte + 1,
+        )
+
+    async def delete_file(self, *, file_id: str) -> None:
+        """Record a deletion."""
+        await self._handle(method="delete_file", file_id=file_id)
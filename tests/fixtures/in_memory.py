@@ -0,0 +1,709 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""In-memory stand-ins for the outbound dependencies of the core, used to test and
+benchmark the core without any infrastructure.
+"""
+
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Mapping, Sequence
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from ghga_service_commons.utils.multinode_storage import ObjectStorages
+from hexkit.protocols.dao import ResourceAlreadyExistsError, ResourceNotFoundError
+from hexkit.protocols.objstorage import ObjectStorageProtocol, PresignedPostURL
+from hexkit.providers.testing.eventpub import InMemEventPublisher, InMemEventStore
+from pydantic import BaseModel
+
+from ifrs.adapters.outbound.event_pub import (
+    EventPubTranslator,
+    EventPubTranslatorConfig,
+)
+from ifrs.core import models
+from ifrs.core.copy_verification import multipart_etag
+from ifrs.core.file_registry import FileRegistry, FileRegistryConfig
+from ifrs.core.metadata_cache import MetadataCache
+from ifrs.core.outbox_capacity import OutboxCapacity, OutboxCapacityConfig
+from ifrs.core.registration_journal import RegistrationJournal
+from ifrs.core.staging_cleanup import StagingCleanup, StagingCleanupConfig
+from ifrs.core.storage_budget import StorageBudget, StorageBudgetConfig
+from ifrs.ports.outbound.dao import (
+    FileFingerprintDaoPort,
+    OutboxUsageDaoPort,
+    PendingRegistrationDaoPort,
+)
+from ifrs.ports.outbound.storage import (
+    BatchDeleteObjectStoragePort,
+    MultipartObjectStoragePort,
+)
+
+Dto = TypeVar("Dto", bound=BaseModel)
+
+PERMANENT_BUCKET = "permanent"
+STAGING_BUCKET = "staging"
+OUTBOX_BUCKET = "outbox"
+
+EVENT_PUB_CONFIG = EventPubTranslatorConfig(
+    file_registered_event_topic="internal_file_registry",
+    file_registered_event_type="file_registered",
+    file_staged_event_topic="internal_file_registry",
+    file_staged_event_type="file_staged_for_download",
+    file_deleted_event_topic="internal_file_registry",
+    file_deleted_event_type="file_deleted",
+)
+
+
+class InMemoryDao(Generic[Dto]):
+    """A DAO keeping all documents in a dict keyed by their ID."""
+
+    def __init__(self, *, id_field: str, latency: float = 0, jitter: float = 0):
+        """Initialize with the name of the ID field, the simulated latency per
+        database call in seconds, and the mean of an exponentially distributed extra
+        latency in seconds.
+        """
+        self.id_field = id_field
+        self.latency = latency
+        self.jitter = jitter
+        self.documents: dict[str, Dto] = {}
+        self.calls: Counter[str] = Counter()
+
+    async def _call(self, method: str) -> None:
+        """Count the call and simulate the latency."""
+        self.calls[method] += 1
+        jitter = random.expovariate(1 / self.jitter) if self.jitter else 0
+        await asyncio.sleep(self.latency + jitter)
+
+    def _get_id(self, dto: Dto) -> str:
+        """Get the ID of a document."""
+        return getattr(dto, self.id_field)
+
+    async def get_by_id(self, id_: str) -> Dto:
+        """Get a document by its ID."""
+        await self._call("get_by_id")
+        try:
+            return self.documents[id_]
+        except KeyError as error:
+            raise ResourceNotFoundError(id_=id_) from error
+
+    async def find_all(self, *, mapping: Mapping[str, Any]) -> AsyncIterator[Dto]:
+        """Find documents by equality or `$in` conditions on their fields."""
+        await self._call("find_all")
+        for document in list(self.documents.values()):
+            values = document.model_dump()
+            if all(
+                values[field] in condition["$in"]
+                if isinstance(condition, dict)
+                else values[field] == condition
+                for field, condition in mapping.items()
+            ):
+                yield document
+
+    async def insert(self, dto: Dto) -> None:
+        """Insert a new document."""
+        await self._call("insert")
+        if self._get_id(dto) in self.documents:
+            raise ResourceAlreadyExistsError(id_=self._get_id(dto))
+        self.documents[self._get_id(dto)] = dto
+
+    async def upsert(self, dto: Dto) -> None:
+        """Insert or replace a document."""
+        await self._call("upsert")
+        self.documents[self._get_id(dto)] = dto
+
+    async def update(self, dto: Dto) -> None:
+        """Replace an existing document."""
+        await self._call("update")
+        if self._get_id(dto) not in self.documents:
+            raise ResourceNotFoundError(id_=self._get_id(dto))
+        self.documents[self._get_id(dto)] = dto
+
+    async def delete(self, *, id_: str) -> None:
+        """Delete a document."""
+        await self._call("delete")
+        if self.documents.pop(id_, None) is None:
+            raise ResourceNotFoundError(id_=id_)
+
+
+class InMemoryFileMetadataDao(
+    InMemoryDao[models.FileMetadata], FileFingerprintDaoPort, PendingRegistrationDaoPort
+):
+    """A DAO for file metadata keeping all documents in a dict that can also read the
+    fingerprints of the registered files and change pending registrations.
+    """
+
+    def __init__(self, *, latency: float = 0, jitter: float = 0):
+        """Initialize with the simulated latency per database call in seconds and the
+        mean of an exponentially distributed extra latency in seconds.
+        """
+        super().__init__(id_field="file_id", latency=latency, jitter=jitter)
+
+    async def get_fingerprints(
+        self, *, file_ids: Sequence[str]
+    ) -> dict[str, models.FileFingerprint]:
+        """Get the fingerprints of the registered files among the given ones."""
+        await self._call("get_fingerprints")
+        return {
+            file_id: models.FileFingerprint(
+                file_id=file_id,
+                object_id=self.documents[file_id].object_id,
+                fingerprint=self.documents[file_id].fingerprint,
+            )
+            for file_id in file_ids
+            if file_id in self.documents
+            and self.documents[file_id].pending_since is None
+        }
+
+    def _is_pending(self, *, file_id: str, object_id: str) -> bool:
+        """Check whether the registration of a file is pending with an object ID."""
+        file = self.documents.get(file_id)
+        return (
+            file is not None
+            and file.object_id == object_id
+            and file.pending_since is not None
+        )
+
+    async def complete(self, *, file_id: str, object_id: str) -> bool:
+        """Mark a pending registration as completed if still claimed."""
+        await self._call("complete")
+        if not self._is_pending(file_id=file_id, object_id=object_id):
+            return False
+        self.documents[file_id] = self.documents[file_id].model_copy(
+            update={"pending_since": None}
+        )
+        return True
+
+    async def take_over(
+        self, *, file: models.FileMetadata, claimed: models.FileMetadata
+    ) -> bool:
+        """Replace the metadata of a pending registration if still claimed."""
+        await self._call("take_over")
+        if self.documents.get(claimed.file_id) != claimed:
+            return False
+        self.documents[file.file_id] = file
+        return True
+
+    async def abandon(self, *, file_id: str, object_id: str) -> bool:
+        """Delete the metadata of a pending registration if still claimed."""
+        await self._call("abandon")
+        if not self._is_pending(file_id=file_id, object_id=object_id):
+            return False
+        del self.documents[file_id]
+        return True
+
+
+class InMemoryOutboxObjectDao(InMemoryDao[models.OutboxObject], OutboxUsageDaoPort):
+    """A DAO for outbox objects keeping all documents in a dict that can also read the
+    usage of the outbox buckets and their least recently staged objects.
+    """
+
+    def __init__(self, *, latency: float = 0, jitter: float = 0):
+        """Initialize with the simulated latency per database call in seconds and the
+        mean of an exponentially distributed extra latency in seconds.
+        """
+        super().__init__(id_field="outbox_id", latency=latency, jitter=jitter)
+        self.read: Counter[str] = Counter()
+
+    async def get_usage(self, *, storage_alias: str) -> int:
+        """Get the total size of the outbox objects recorded for a node."""
+        await self._call("get_usage")
+        return sum(
+            document.size
+            for document in self.documents.values()
+            if document.storage_alias == storage_alias
+        )
+
+    async def find_least_recently_staged(
+        self, *, storage_alias: str, staged_before: float
+    ) -> AsyncIterator[models.OutboxObject]:
+        """Iterate over the old enough outbox objects of a node, least recently staged
+        first, counting the records read per node.
+        """
+        await self._call("find_least_recently_staged")
+        candidates = sorted(
+            (
+                document
+                for document in self.documents.values()
+                if document.storage_alias == storage_alias
+                and document.last_staged <= staged_before
+            ),
+            key=lambda document: document.last_staged,
+        )
+        for document in candidates:
+            self.read[storage_alias] += 1
+            yield document
+
+    async def delete_if_unchanged(self, *, outbox_object: models.OutboxObject) -> bool:
+        """Delete the record of an outbox object if it has not been staged again."""
+        await self._call("delete_if_unchanged")
+        current = self.documents.get(outbox_object.outbox_id)
+        if current is None or current.last_staged != outbox_object.last_staged:
+            return False
+        del self.documents[outbox_object.outbox_id]
+        return True
+
+
+class InMemoryObjectStorage(ObjectStorageProtocol):
+    """An object storage keeping the content of all objects in dicts."""
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0,
+        jitter: float = 0,
+        bandwidth: Optional[float] = None,
+    ):
+        """Initialize with the simulated latency per storage call in seconds, the
+        mean of an exponentially distributed extra latency in seconds, and the
+        simulated bandwidth per copy request in bytes per second (unlimited if None).
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.buckets: dict[str, dict[str, bytes]] = {}
+        self.calls: Counter[str] = Counter()
+
+    async def _call(self, method: str) -> None:
+        """Count the call and simulate the latency."""
+        self.calls[method] += 1
+        jitter = random.expovariate(1 / self.jitter) if self.jitter else 0
+        await asyncio.sleep(self.latency + jitter)
+
+    def _get_bucket(self, bucket_id: str) -> dict[str, bytes]:
+        """Get the objects of a bucket."""
+        try:
+            return self.buckets[bucket_id]
+        except KeyError as error:
+            raise self.BucketNotFoundError(bucket_id=bucket_id) from error
+
+    def _get_object(self, *, bucket_id: str, object_id: str) -> bytes:
+        """Get the content of an object."""
+        try:
+            return self._get_bucket(bucket_id)[object_id]
+        except KeyError as error:
+            raise self.ObjectNotFoundError(
+                bucket_id=bucket_id, object_id=object_id
+            ) from error
+
+    async def _transfer(self, size: int) -> None:
+        """Simulate the duration of transferring the given number of bytes."""
+        if self.bandwidth:
+            await asyncio.sleep(size / self.bandwidth)
+
+    def put_object(self, *, bucket_id: str, object_id: str, content: bytes) -> None:
+        """Place an object in a bucket, creating the bucket if needed."""
+        self.buckets.setdefault(bucket_id, {})[object_id] = content
+
+    async def _does_bucket_exist(self, bucket_id: str) -> bool:
+        return bucket_id in self.buckets
+
+    async def _create_bucket(self, bucket_id: str) -> None:
+        if bucket_id in self.buckets:
+            raise self.BucketAlreadyExistsError(bucket_id=bucket_id)
+        self.buckets[bucket_id] = {}
+
+    async def _delete_bucket(
+        self, bucket_id: str, *, delete_content: bool = False
+    ) -> None:
+        if self._get_bucket(bucket_id) and not delete_content:
+            raise self.BucketNotEmptyError(bucket_id=bucket_id)
+        del self.buckets[bucket_id]
+
+    async def _list_all_object_ids(self, *, bucket_id: str) -> list[str]:
+        await self._call("list_all_object_ids")
+        return list(self._get_bucket(bucket_id))
+
+    async def _get_object_upload_url(
+        self,
+        *,
+        bucket_id: str,
+        object_id: str,
+        expires_after: int = 86400,
+        max_upload_size: Optional[int] = None,
+    ) -> PresignedPostURL:
+        raise NotImplementedError()
+
+    async def _init_multipart_upload(self, *, bucket_id: str, object_id: str) -> str:
+        raise NotImplementedError()
+
+    async def _get_part_upload_url(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        expires_after: int = 3600,
+        part_md5: Optional[str] = None,
+    ) -> str:
+        raise NotImplementedError()
+
+    async def _abort_multipart_upload(
+        self, *, upload_id: str, bucket_id: str, object_id: str
+    ) -> None:
+        raise NotImplementedError()
+
+    async def _complete_multipart_upload(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        anticipated_part_quantity: Optional[int] = None,
+        anticipated_part_size: Optional[int] = None,
+    ) -> None:
+        raise NotImplementedError()
+
+    async def _get_object_download_url(
+        self, *, bucket_id: str, object_id: str, expires_after: int = 86400
+    ) -> str:
+        raise NotImplementedError()
+
+    async def _get_object_size(self, *, bucket_id: str, object_id: str) -> int:
+        await self._call("get_object_size")
+        return len(self._get_object(bucket_id=bucket_id, object_id=object_id))
+
+    async def _does_object_exist(
+        self, *, bucket_id: str, object_id: str, object_md5sum: Optional[str] = None
+    ) -> bool:
+        await self._call("does_object_exist")
+        return object_id in self.buckets.get(bucket_id, {})
+
+    async def _copy_object(
+        self,
+        *,
+        source_bucket_id: str,
+        source_object_id: str,
+        dest_bucket_id: str,
+        dest_object_id: str,
+    ) -> None:
+        await self._call("copy_object")
+        content = self._get_object(
+            bucket_id=source_bucket_id, object_id=source_object_id
+        )
+        dest_bucket = self._get_bucket(dest_bucket_id)
+        if dest_object_id in dest_bucket:
+            raise self.ObjectAlreadyExistsError(
+                bucket_id=dest_bucket_id, object_id=dest_object_id
+            )
+        await self._transfer(len(content))
+        dest_bucket[dest_object_id] = content
+
+    async def _delete_object(self, *, bucket_id: str, object_id: str) -> None:
+        await self._call("delete_object")
+        self._get_object(bucket_id=bucket_id, object_id=object_id)
+        del self.buckets[bucket_id][object_id]
+
+
+class InMemoryMultipartObjectStorage(
+    InMemoryObjectStorage, MultipartObjectStoragePort, BatchDeleteObjectStoragePort
+):
+    """An in-memory object storage that also supports filling the parts of multipart
+    uploads with byte ranges of objects, server-side or from memory, and deleting
+    multiple objects at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0,
+        jitter: float = 0,
+        bandwidth: Optional[float] = None,
+    ):
+        """Initialize without any multipart uploads."""
+        super().__init__(latency=latency, jitter=jitter, bandwidth=bandwidth)
+        # maps upload IDs to destination bucket, destination object, and parts
+        self.uploads: dict[str, tuple[str, str, dict[int, memoryview]]] = {}
+        # maps bucket and object IDs of objects uploaded in parts to the part sizes
+        self.part_sizes: dict[tuple[str, str], list[int]] = {}
+
+    def put_object(self, *, bucket_id: str, object_id: str, content: bytes) -> None:
+        """Place an object in a bucket, creating the bucket if needed."""
+        super().put_object(bucket_id=bucket_id, object_id=object_id, content=content)
+        self.part_sizes.pop((bucket_id, object_id), None)
+
+    async def _delete_object(self, *, bucket_id: str, object_id: str) -> None:
+        await super()._delete_object(bucket_id=bucket_id, object_id=object_id)
+        self.part_sizes.pop((bucket_id, object_id), None)
+
+    def _get_upload(
+        self, *, upload_id: str, bucket_id: str, object_id: str
+    ) -> dict[int, memoryview]:
+        """Get the parts of a multipart upload."""
+        upload = self.uploads.get(upload_id)
+        if upload is None or upload[:2] != (bucket_id, object_id):
+            raise self.MultiPartUploadNotFoundError(
+                upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+            )
+        return upload[2]
+
+    async def _init_multipart_upload(self, *, bucket_id: str, object_id: str) -> str:
+        await self._call("init_multipart_upload")
+        self._get_bucket(bucket_id)
+        upload_id = f"upload{len(self.uploads)}"
+        self.uploads[upload_id] = (bucket_id, object_id, {})
+        return upload_id
+
+    async def _abort_multipart_upload(
+        self, *, upload_id: str, bucket_id: str, object_id: str
+    ) -> None:
+        await self._call("abort_multipart_upload")
+        self._get_upload(upload_id=upload_id, bucket_id=bucket_id, object_id=object_id)
+        del self.uploads[upload_id]
+
+    async def upload_part_copy(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        source_bucket_id: str,
+        source_object_id: str,
+        first_byte: int,
+        last_byte: int,
+    ) -> str:
+        """Copy a byte range of an object into a part and return the part's ETag."""
+        await self._call("upload_part_copy")
+        parts = self._get_upload(
+            upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+        )
+        # a view avoids copying the content twice, only the completion copies it
+        content = memoryview(
+            self._get_object(bucket_id=source_bucket_id, object_id=source_object_id)
+        )[first_byte : last_byte + 1]
+        await self._transfer(len(content))
+        parts[part_number] = content
+        return f'"{upload_id}-{part_number}"'
+
+    async def download_range(
+        self, *, bucket_id: str, object_id: str, first_byte: int, buffer: memoryview
+    ) -> None:
+        """Download a byte range of an object into the buffer."""
+        await self._call("download_range")
+        content = self._get_object(bucket_id=bucket_id, object_id=object_id)
+        if first_byte + len(buffer) > len(content):
+            raise self.ObjectError("The requested range exceeds the object.")
+        await self._transfer(len(buffer))
+        buffer[:] = memoryview(content)[first_byte : first_byte + len(buffer)]
+
+    async def upload_part(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_number: int,
+        content: memoryview,
+    ) -> str:
+        """Upload a part from memory and return the part's ETag."""
+        await self._call("upload_part")
+        parts = self._get_upload(
+            upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+        )
+        await self._transfer(len(content))
+        # the content is copied, as the caller may reuse its buffer
+        parts[part_number] = memoryview(bytes(content))
+        return f'"{upload_id}-{part_number}"'
+
+    async def complete_parts(
+        self,
+        *,
+        upload_id: str,
+        bucket_id: str,
+        object_id: str,
+        part_etags: Sequence[str],
+    ) -> None:
+        """Join the parts of a multipart upload into the destination object."""
+        await self._call("complete_parts")
+        parts = self._get_upload(
+            upload_id=upload_id, bucket_id=bucket_id, object_id=object_id
+        )
+        if sorted(parts) != list(range(1, len(part_etags) + 1)):
+            raise self.MultiPartUploadConfirmError(
+                upload_id=upload_id,
+                bucket_id=bucket_id,
+                object_id=object_id,
+                reason="The parts do not match the given ETags.",
+            )
+        del self.uploads[upload_id]
+        self.put_object(
+            bucket_id=bucket_id,
+            object_id=object_id,
+            content=b"".join(parts[number] for number in sorted(parts)),
+        )
+        self.part_sizes[(bucket_id, object_id)] = [
+            len(parts[number]) for number in sorted(parts)
+        ]
+
+    async def get_object_etag(self, *, bucket_id: str, object_id: str) -> str:
+        """Get the ETag of an object as S3 computes it, which depends on whether the
+        object was uploaded in parts.
+        """
+        await self._call("get_object_etag")
+        content = memoryview(self._get_object(bucket_id=bucket_id, object_id=object_id))
+        part_sizes = self.part_sizes.get((bucket_id, object_id))
+        if part_sizes is None:
+            return hashlib.md5(content, usedforsecurity=False).hexdigest()
+        part_md5s = []
+        first_byte = 0
+        for part_size in part_sizes:
+            part = content[first_byte : first_byte + part_size]
+            part_md5s.append(hashlib.md5(part, usedforsecurity=False).hexdigest())
+            first_byte += part_size
+        return multipart_etag(part_md5s)
+
+    async def delete_objects(
+        self, *, bucket_id: str, object_ids: Sequence[str]
+    ) -> list[str]:
+        """Delete multiple objects of a bucket, ignoring objects that do not exist."""
+        await self._call("delete_objects")
+        bucket = self._get_bucket(bucket_id)
+        for object_id in object_ids:
+            bucket.pop(object_id, None)
+            self.part_sizes.pop((bucket_id, object_id), None)
+        return []
+
+
+class InMemoryObjectStorages(ObjectStorages):
+    """Multiple in-memory storage nodes, each with its own permanent bucket."""
+
+    def __init__(
+        self,
+        *,
+        aliases: tuple[str, ...],
+        latency: float = 0,
+        jitter: float = 0,
+        multipart: bool = False,
+    ):
+        """Initialize one node with staging, permanent and outbox bucket per alias.
+        If multipart is True, the nodes support multipart transfers.
+        """
+        self.nodes: dict[str, InMemoryObjectStorage] = {}
+        storage_cls = (
+            InMemoryMultipartObjectStorage if multipart else InMemoryObjectStorage
+        )
+        for alias in aliases:
+            storage = storage_cls(latency=latency, jitter=jitter)
+            storage.buckets = {
+                STAGING_BUCKET: {},
+                PERMANENT_BUCKET: {},
+                OUTBOX_BUCKET: {},
+            }
+            self.nodes[alias] = storage
+
+    def for_alias(self, endpoint_alias: str) -> tuple[str, InMemoryObjectStorage]:
+        """Get the permanent bucket ID and the storage of a node."""
+        return PERMANENT_BUCKET, self.nodes[endpoint_alias]
+
+
+class InMemoryCore:
+    """A file registry wired to in-memory stand-ins of its outbound dependencies."""
+
+    def __init__(
+        self,
+        *,
+        aliases: tuple[str, ...] = ("test",),
+        db_latency: float = 0,
+        storage_latency: float = 0,
+        jitter: float = 0,
+        multipart: bool = False,
+        config: Optional[FileRegistryConfig] = None,
+        storage_budget: Optional[StorageBudget] = None,
+        staging_cleanup_config: Optional[StagingCleanupConfig] = None,
+        registration_journal: bool = False,
+        metadata_cache: Optional[MetadataCache] = None,
+        outbox_capacity_config: Optional[OutboxCapacityConfig] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the stand-ins and the file registry. The jitter applies to the
+        database and the storage calls alike. If a staging cleanup config is given,
+        the registry queues staging objects for deletion, but nothing is flushed in
+        the background. Registrations in progress are only journaled if requested.
+        Likewise, outbox objects are only recorded if an outbox capacity config is
+        given, using the given clock, but nothing is evicted in the background.
+        """
+        self.dao = InMemoryFileMetadataDao(latency=db_latency, jitter=jitter)
+        self.object_storages = InMemoryObjectStorages(
+            aliases=aliases,
+            latency=storage_latency,
+            jitter=jitter,
+            multipart=multipart,
+        )
+        self.event_store = InMemEventStore()
+        self.config = config or FileRegistryConfig()
+        self.storage_budget = storage_budget or StorageBudget(
+            config=StorageBudgetConfig()
+        )
+        self.staging_object_dao = InMemoryDao[models.StagingObject](
+            id_field="cleanup_id", latency=db_latency, jitter=jitter
+        )
+        self.staging_cleanup = (
+            StagingCleanup(
+                config=staging_cleanup_config,
+                staging_object_dao=self.staging_object_dao,  # type: ignore
+                object_storages=self.object_storages,
+            )
+            if staging_cleanup_config
+            else None
+        )
+        self.registration_intent_dao = InMemoryDao[models.RegistrationIntent](
+            id_field="file_id", latency=db_latency, jitter=jitter
+        )
+        self.registration_journal = (
+            RegistrationJournal(
+                registration_intent_dao=self.registration_intent_dao  # type: ignore
+            )
+            if registration_journal
+            else None
+        )
+        self.outbox_object_dao = InMemoryOutboxObjectDao(
+            latency=db_latency, jitter=jitter
+        )
+        self.outbox_capacity = (
+            OutboxCapacity(
+                config=outbox_capacity_config,
+                outbox_object_dao=self.outbox_object_dao,  # type: ignore
+                outbox_usage_dao=self.outbox_object_dao,
+                object_storages=self.object_storages,
+                clock=clock,
+            )
+            if outbox_capacity_config
+            else None
+        )
+        self.file_registry = FileRegistry(
+            file_metadata_dao=self.dao,  # type: ignore
+            file_fingerprint_dao=self.dao,
+            pending_registration_dao=self.dao,
+            event_publisher=EventPubTranslator(
+                config=EVENT_PUB_CONFIG,
+                provider=InMemEventPublisher(event_store=self.event_store),
+            ),
+            object_storages=self.object_storages,
+            config=self.config,
+            storage_budget=self.storage_budget,
+            staging_cleanup=self.staging_cleanup,
+            registration_journal=self.registration_journal,
+            metadata_cache=metadata_cache,
+            outbox_capacity=self.outbox_capacity,
+        )
+
+    def published_events(self, topic: str) -> list[str]:
+        """Get the types of all events published to the given topic so far."""
+        return [event.type_ for event in self.event_store.topics[topic]]
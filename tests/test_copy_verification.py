@@ -0,0 +1,119 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests verifying copies against the stored checksums of the encrypted parts."""
+
+import hashlib
+import os
+
+import pytest
+
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.multipart_copy import MIN_PART_SIZE
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import PERMANENT_BUCKET, STAGING_BUCKET, InMemoryCore
+
+CONTENT = os.urandom(2 * MIN_PART_SIZE + 17)
+FILE = EXAMPLE_METADATA_BASE.model_copy(
+    update={
+        "content_offset": 0,
+        "encrypted_part_size": MIN_PART_SIZE,
+        "encrypted_parts_md5": [
+            hashlib.md5(CONTENT[first_byte : first_byte + MIN_PART_SIZE]).hexdigest()
+            for first_byte in range(0, len(CONTENT), MIN_PART_SIZE)
+        ],
+    }
+)
+
+
+def verifying_core(*, across_nodes: bool) -> InMemoryCore:
+    """Get a core that verifies copies with the content of the file in staging,
+    located on another node if requested.
+    """
+    staging_alias = "staging" if across_nodes else FILE.storage_alias
+    core = InMemoryCore(
+        aliases=(FILE.storage_alias, "staging"),
+        multipart=True,
+        config=FileRegistryConfig(
+            verify_copies=True,
+            streaming_copy_buffer_size=MIN_PART_SIZE,
+            bucket_storage_aliases={STAGING_BUCKET: staging_alias},
+        ),
+    )
+    core.object_storages.nodes[staging_alias].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=CONTENT
+    )
+    return core
+
+
+@pytest.mark.parametrize("across_nodes", [False, True])
+@pytest.mark.asyncio
+async def test_verified_copy(across_nodes: bool):
+    """Test that a copy matching the stored checksums is verified by its metadata."""
+    core = verifying_core(across_nodes=across_nodes)
+    storage = core.object_storages.nodes[FILE.storage_alias]
+
+    await core.file_registry.register_file(
+        file_without_object_id=FILE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+    registered_file = core.dao.documents[FILE.file_id]
+    assert storage.buckets[PERMANENT_BUCKET] == {registered_file.object_id: CONTENT}
+    assert storage.calls["get_object_etag"] == 1
+    assert storage.calls["download_range"] == 0
+
+
+@pytest.mark.parametrize("across_nodes", [False, True])
+@pytest.mark.asyncio
+async def test_mismatching_copy_is_removed(across_nodes: bool):
+    """Test that a copy not matching the stored checksums is removed and fails the
+    registration.
+    """
+    core = verifying_core(across_nodes=across_nodes)
+    storage = core.object_storages.nodes[FILE.storage_alias]
+    file = FILE.model_copy(
+        update={"encrypted_parts_md5": [*FILE.encrypted_parts_md5[:-1], "0" * 32]}
+    )
+
+    with pytest.raises(FileRegistryPort.CopyVerificationError):
+        await core.file_registry.register_file(
+            file_without_object_id=file,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+
+    assert not storage.buckets[PERMANENT_BUCKET]
+    assert not core.dao.documents
+
+
+@pytest.mark.asyncio
+async def test_unverifiable_copy():
+    """Test that files with content preceded by an envelope are copied unverified."""
+    core = verifying_core(across_nodes=False)
+    storage = core.object_storages.nodes[FILE.storage_alias]
+    file = FILE.model_copy(update={"content_offset": 124})
+
+    await core.file_registry.register_file(
+        file_without_object_id=file,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+    assert file.file_id in core.dao.documents
+    assert storage.calls["copy_object"] == 1
+    assert storage.calls["get_object_etag"] == 0
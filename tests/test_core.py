@@ -0,0 +1,517 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the core with in-memory stand-ins for its outbound dependencies."""
+
+import asyncio
+import time
+
+import pytest
+
+from ifrs.core import models
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.main import read_registration_requests
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA, EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import (
+    EVENT_PUB_CONFIG,
+    OUTBOX_BUCKET,
+    PERMANENT_BUCKET,
+    STAGING_BUCKET,
+    InMemoryCore,
+)
+
+
+@pytest.mark.parametrize("deduplicate", [False, True])
+@pytest.mark.asyncio
+async def test_concurrent_stage_requests_are_coalesced(deduplicate: bool):
+    """Test that concurrent requests to stage a file to the same outbox object result
+    in a single copy and, unless deduplicated, in one event per request.
+    """
+    core = InMemoryCore(
+        storage_latency=0.01,
+        config=FileRegistryConfig(deduplicate_staged_events=deduplicate),
+    )
+    await core.dao.insert(EXAMPLE_METADATA)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+    storage.put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=EXAMPLE_METADATA.object_id,
+        content=b"content",
+    )
+
+    await asyncio.gather(
+        *(
+            core.file_registry.stage_registered_file(
+                file_id=EXAMPLE_METADATA.file_id,
+                decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+                outbox_object_id="outbox-object",
+                outbox_bucket_id=OUTBOX_BUCKET,
+            )
+            for _ in range(3)
+        )
+    )
+
+    assert storage.calls["copy_object"] == 1
+    assert storage.buckets[OUTBOX_BUCKET]["outbox-object"] == b"content"
+    assert core.published_events(EVENT_PUB_CONFIG.file_staged_event_topic) == [
+        EVENT_PUB_CONFIG.file_staged_event_type
+    ] * (1 if deduplicate else 3)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_stage_request_does_not_affect_others():
+    """Test that cancelling the request that started a coalesced staging operation
+    cancels only that request, while the others still complete the staging.
+    """
+    core = InMemoryCore(storage_latency=0.01)
+    await core.dao.insert(EXAMPLE_METADATA)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+    storage.put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=EXAMPLE_METADATA.object_id,
+        content=b"content",
+    )
+    requests = [
+        asyncio.create_task(
+            core.file_registry.stage_registered_file(
+                file_id=EXAMPLE_METADATA.file_id,
+                decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+                outbox_object_id="outbox-object",
+                outbox_bucket_id=OUTBOX_BUCKET,
+            )
+        )
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.005)
+
+    requests[0].cancel()
+    results = await asyncio.gather(*requests, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [None, None]
+    assert storage.calls["copy_object"] == 1
+    assert storage.buckets[OUTBOX_BUCKET]["outbox-object"] == b"content"
+
+
+@pytest.mark.asyncio
+async def test_register_file_looks_up_concurrently():
+    """Test that the database lookup and the check of the staging bucket of a
+    registration are in flight at the same time.
+    """
+    core = InMemoryCore()
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    storage.put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    staging_checked = asyncio.Event()
+    does_object_exist = storage._does_object_exist
+    get_fingerprints = core.dao.get_fingerprints
+
+    async def checking_staging(**kwargs):
+        staging_checked.set()
+        return await does_object_exist(**kwargs)
+
+    async def waiting_for_staging_check(**kwargs):
+        # would time out if the staging bucket was only checked after the lookup
+        await asyncio.wait_for(staging_checked.wait(), timeout=1)
+        return await get_fingerprints(**kwargs)
+
+    storage._does_object_exist = checking_staging  # type: ignore
+    core.dao.get_fingerprints = waiting_for_staging_check  # type: ignore
+
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+    assert len(core.dao.documents) == 1
+    assert core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic) == [
+        EVENT_PUB_CONFIG.file_registered_event_type
+    ]
+
+
+@pytest.mark.asyncio
+async def test_register_file_again_cancels_staging_check():
+    """Test that the check of the staging bucket is cancelled instead of awaited if
+    the file turns out to be registered already.
+    """
+    core = InMemoryCore()
+    await core.dao.insert(EXAMPLE_METADATA)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    cancelled = asyncio.Event()
+
+    async def hanging_staging_check(**kwargs):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    storage._does_object_exist = hanging_staging_check  # type: ignore
+
+    await asyncio.wait_for(
+        core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        ),
+        timeout=1,
+    )
+
+    assert cancelled.is_set()
+    assert not core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic)
+
+
+@pytest.mark.asyncio
+async def test_register_file_without_staged_content():
+    """Test that missing staged content is only an error for files that are not
+    registered yet.
+    """
+    core = InMemoryCore()
+
+    with pytest.raises(FileRegistryPort.FileContentNotInStagingError):
+        await core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+
+    await core.dao.insert(EXAMPLE_METADATA)
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+    assert not core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic)
+
+
+@pytest.mark.asyncio
+async def test_optimistic_registration():
+    """Test that an optimistic registration of a new file performs no database read
+    and that registering it again neither copies nor publishes anything.
+    """
+    core = InMemoryCore(config=FileRegistryConfig(optimistic_registration=True))
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    storage.put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+
+    for expected_calls in (
+        {"insert": 1, "complete": 1},
+        {"insert": 2, "complete": 1, "get_by_id": 1},
+    ):
+        await core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+        assert core.dao.calls == expected_calls
+
+    assert storage.calls["copy_object"] == 1
+    registered_file = core.dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert registered_file.pending_since is None
+    assert storage.buckets[PERMANENT_BUCKET] == {registered_file.object_id: b"content"}
+    assert core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic) == [
+        EVENT_PUB_CONFIG.file_registered_event_type
+    ]
+
+
+@pytest.mark.asyncio
+async def test_optimistic_registration_after_interruption():
+    """Test that an optimistic registration interrupted during the copy is taken over
+    by a retry once its claim has timed out, which copies the content and publishes
+    the registration.
+    """
+    config = FileRegistryConfig(
+        optimistic_registration=True, registration_claim_timeout=60
+    )
+    core = InMemoryCore(config=config)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    storage.put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    # the pending metadata has been inserted, but the service stopped during the copy
+    await core.dao.insert(
+        EXAMPLE_METADATA.model_copy(update={"pending_since": time.time() - 61})
+    )
+    storage.put_object(
+        bucket_id=PERMANENT_BUCKET, object_id=EXAMPLE_METADATA.object_id, content=b"c"
+    )
+
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+    registered_file = core.dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert registered_file.pending_since is None
+    assert registered_file.object_id != EXAMPLE_METADATA.object_id
+    assert storage.buckets[PERMANENT_BUCKET] == {registered_file.object_id: b"content"}
+    assert core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic) == [
+        EVENT_PUB_CONFIG.file_registered_event_type
+    ]
+
+
+@pytest.mark.asyncio
+async def test_optimistic_registration_in_progress():
+    """Test that a file whose optimistic registration is in progress is treated as
+    not registered and that other registration attempts neither copy nor publish.
+    """
+    core = InMemoryCore(config=FileRegistryConfig(optimistic_registration=True))
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    storage.put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    pending_file = EXAMPLE_METADATA.model_copy(update={"pending_since": time.time()})
+    await core.dao.insert(pending_file)
+
+    with pytest.raises(FileRegistryPort.RegistrationInProgressError):
+        await core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+    with pytest.raises(FileRegistryPort.FileNotInRegistryError):
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA.file_id,
+            decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+            outbox_object_id="outbox-object",
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+
+    assert core.dao.documents[EXAMPLE_METADATA.file_id] == pending_file
+    assert storage.calls["copy_object"] == 0
+    assert not core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic)
+
+
+@pytest.mark.asyncio
+async def test_optimistic_registration_with_failed_copy():
+    """Test that the metadata inserted by an optimistic registration is removed again
+    if the content cannot be copied.
+    """
+    core = InMemoryCore(config=FileRegistryConfig(optimistic_registration=True))
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    storage.put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    del storage.buckets[PERMANENT_BUCKET]
+
+    with pytest.raises(storage.BucketNotFoundError):
+        await core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+
+    assert not core.dao.documents
+    assert not core.published_events(EVENT_PUB_CONFIG.file_registered_event_topic)
+
+
+@pytest.mark.asyncio
+async def test_bulk_registration_report():
+    """Test that a bulk registration reports the outcome per request in order and
+    bounds the copies in flight per storage alias.
+    """
+    config = FileRegistryConfig(bulk_registration_concurrency_per_storage=2)
+    core = InMemoryCore(aliases=("test", "test2"), storage_latency=0.001, config=config)
+    await core.dao.insert(EXAMPLE_METADATA)
+    running = max_running = 0
+    for storage in core.object_storages.nodes.values():
+        copy_object = storage.copy_object
+
+        async def counting_copy_object(copy_object=copy_object, **kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(running, max_running)
+            try:
+                return await copy_object(**kwargs)
+            finally:
+                running -= 1
+
+        storage.copy_object = counting_copy_object  # type: ignore
+
+    requests = [
+        models.FileRegistrationRequest(
+            file_without_object_id=file,
+            staging_object_id=file.file_id,
+            staging_bucket_id=STAGING_BUCKET,
+        )
+        for file in (
+            EXAMPLE_METADATA_BASE,
+            EXAMPLE_METADATA_BASE.model_copy(update={"decrypted_size": 1}),
+            *(
+                EXAMPLE_METADATA_BASE.model_copy(
+                    update={"file_id": f"new{index}", "storage_alias": alias}
+                )
+                for index, alias in enumerate(["test", "test2"] * 3)
+            ),
+        )
+    ]
+    for request in requests[2:-1]:
+        core.object_storages.nodes[
+            request.file_without_object_id.storage_alias
+        ].put_object(
+            bucket_id=STAGING_BUCKET,
+            object_id=request.staging_object_id,
+            content=b"content",
+        )
+
+    outcomes = await core.file_registry.register_files(
+        requests=requests, raise_on_failure=False
+    )
+
+    assert [outcome.outcome for outcome in outcomes] == [
+        "already_registered",
+        "rejected",
+        *["registered"] * 5,
+        "rejected",
+    ]
+    assert outcomes[0].object_id == EXAMPLE_METADATA.object_id
+    assert outcomes[2].object_id == core.dao.documents["new0"].object_id
+    assert max_running == 4
+    with pytest.raises(FileRegistryPort.FileContentNotInStagingError):
+        await core.file_registry.register_files(requests=requests[-1:])
+
+
+@pytest.mark.asyncio
+async def test_bulk_registration_discards_uninserted_copies():
+    """Test that the copy of a file is removed from the permanent storage if its
+    metadata cannot be inserted, unless the file is registered with that copy.
+    """
+    core = InMemoryCore()
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    requests = [
+        models.FileRegistrationRequest(
+            file_without_object_id=EXAMPLE_METADATA_BASE.model_copy(
+                update={"file_id": file_id}
+            ),
+            staging_object_id=file_id,
+            staging_bucket_id=STAGING_BUCKET,
+        )
+        for file_id in ("broken", "concurrent", "inserted")
+    ]
+    for request in requests:
+        storage.put_object(
+            bucket_id=STAGING_BUCKET, object_id=request.staging_object_id, content=b"0"
+        )
+    insert = core.dao.insert
+
+    async def failing_insert(dto: models.FileMetadata) -> None:
+        if dto.file_id == "broken":
+            raise RuntimeError("Database unavailable")
+        if dto.file_id == "concurrent":
+            await insert(dto.model_copy(update={"object_id": "other"}))
+        await insert(dto)
+        if dto.file_id == "inserted":
+            raise RuntimeError("Connection lost after the insert")
+
+    core.dao.insert = failing_insert  # type: ignore[method-assign]
+
+    outcomes = await core.file_registry.register_files(
+        requests=requests, raise_on_failure=False
+    )
+
+    assert [outcome.outcome for outcome in outcomes] == ["failed"] * 3
+    assert list(storage.buckets[PERMANENT_BUCKET]) == [
+        core.dao.documents["inserted"].object_id
+    ]
+
+
+def test_invalid_registration_requests_rejected():
+    """Test that invalid lines of a bulk registration are rejected in place of their
+    request with their line number, without stopping the parsing of further lines.
+    """
+    request = models.FileRegistrationRequest(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staged",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+    lines = [
+        request.model_dump_json(),
+        "",
+        '{"file_without_object_id": {"file_id": "invalid"}}',
+        "not json",
+        request.model_dump_json(),
+    ]
+
+    batches = list(read_registration_requests(lines, batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert batches[0][0] == batches[1][1] == request
+    rejected = [batches[0][1], batches[1][0]]
+    for outcome, file_id, line_number in zip(rejected, ["invalid", None], [3, 4]):
+        assert isinstance(outcome, models.FileRegistrationOutcome)
+        assert outcome.outcome == "rejected"
+        assert outcome.file_id == file_id
+        assert f"line {line_number}:" in str(outcome.error)
+
+
+@pytest.mark.asyncio
+async def test_bulk_staging_report():
+    """Test that a bulk staging looks up all files at once, reports the outcome per
+    request in order, and publishes an event per staged file.
+    """
+    config = FileRegistryConfig(bulk_staging_concurrency_per_storage=1)
+    core = InMemoryCore(aliases=("test", "test2"), storage_latency=0.001, config=config)
+    files = [
+        EXAMPLE_METADATA.model_copy(
+            update={"file_id": f"file{index}", "storage_alias": alias}
+        )
+        for index, alias in enumerate(["test", "test2"] * 2)
+    ]
+    for file in files:
+        await core.dao.insert(file)
+        core.object_storages.nodes[file.storage_alias].put_object(
+            bucket_id=PERMANENT_BUCKET, object_id=file.object_id, content=b"content"
+        )
+    core.object_storages.nodes["test"].put_object(
+        bucket_id=OUTBOX_BUCKET, object_id="file0-outbox", content=b"content"
+    )
+
+    requests = [
+        models.FileStagingRequest(
+            file_id=file_id,
+            decrypted_sha256=decrypted_sha256,
+            outbox_object_id=f"{file_id}-outbox",
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+        for file_id, decrypted_sha256 in (
+            *((file.file_id, file.decrypted_sha256) for file in files),
+            ("file1", "wrong-checksum"),
+            ("unknown", EXAMPLE_METADATA.decrypted_sha256),
+        )
+    ]
+
+    outcomes = await core.file_registry.stage_registered_files(
+        requests=requests, raise_on_failure=False
+    )
+
+    assert [outcome.outcome for outcome in outcomes] == [
+        "already_staged",
+        *["staged"] * 3,
+        "rejected",
+        "rejected",
+    ]
+    assert core.dao.calls["find_all"] == 1
+    assert core.dao.calls["get_by_id"] == 0
+    assert (
+        core.published_events(EVENT_PUB_CONFIG.file_staged_event_topic)
+        == [EVENT_PUB_CONFIG.file_staged_event_type] * 3
+    )
+    with pytest.raises(FileRegistryPort.FileNotInRegistryError):
+        await core.file_registry.stage_registered_files(requests=requests[-1:])
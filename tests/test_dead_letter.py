@@ -0,0 +1,179 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests moving failed events to the dead-letter topic and replaying them."""
+
+from datetime import timedelta
+
+import pytest
+from ghga_service_commons.utils.utc_dates import now_as_utc
+from hexkit.providers.testing.eventpub import InMemEventPublisher, InMemEventStore
+
+from ifrs.adapters.inbound.dead_letter import (
+    DeadLetterEvent,
+    DeadLetterReplayTranslator,
+    ReplayCaughtUpError,
+)
+from ifrs.adapters.inbound.event_sub import EventSubTranslator
+from tests.fixtures.fake_registry import (
+    EVENT_SUB_CONFIG,
+    FakeFileRegistry,
+    files_to_register_payload,
+    files_to_stage_payload,
+)
+
+DEAD_LETTER_CONFIG = EVENT_SUB_CONFIG.model_copy(
+    update={"dead_letter_topic": "dead_letters"}
+)
+
+
+def dead_letter_events(event_store: InMemEventStore) -> list[DeadLetterEvent]:
+    """Get the payloads of all events on the dead-letter topic."""
+    return [
+        DeadLetterEvent.model_validate(event.payload)
+        for event in event_store.topics[DEAD_LETTER_CONFIG.dead_letter_topic or ""]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_permanent_failures_are_dead_lettered():
+    """Test that events failing permanently are moved to the dead-letter topic
+    instead of being raised.
+    """
+    event_store = InMemEventStore()
+    file_registry = FakeFileRegistry(fail_for="file001")
+
+    async with EventSubTranslator.construct(
+        config=DEAD_LETTER_CONFIG,
+        file_registry=file_registry,
+        dead_letter_publisher=InMemEventPublisher(event_store=event_store),
+    ) as translator:
+        for file_id in ("file001", "file002"):
+            await translator.consume(
+                payload=files_to_stage_payload(file_id),
+                type_=DEAD_LETTER_CONFIG.files_to_stage_type,
+                topic=DEAD_LETTER_CONFIG.files_to_stage_topic,
+            )
+
+    assert [file_id for _, file_id in file_registry.calls] == ["file002"]
+    (event,) = event_store.topics[DEAD_LETTER_CONFIG.dead_letter_topic or ""]
+    assert event.type_ == DEAD_LETTER_CONFIG.files_to_stage_type
+    dead_letter_event = DeadLetterEvent.model_validate(event.payload)
+    assert dead_letter_event.original_topic == DEAD_LETTER_CONFIG.files_to_stage_topic
+    assert dead_letter_event.original_payload == files_to_stage_payload("file001")
+    assert dead_letter_event.error_class == "FileContentNotInStagingError"
+    assert dead_letter_event.consumed_at <= dead_letter_event.dead_lettered_at
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_are_dead_lettered():
+    """Test that events still failing after their last retry are dead-lettered."""
+    config = DEAD_LETTER_CONFIG.model_copy(
+        update={"max_retries": 1, "retry_initial_delay_ms": 1}
+    )
+    event_store = InMemEventStore()
+
+    async with EventSubTranslator.construct(
+        config=config,
+        file_registry=FakeFileRegistry(transient_failures={"file001": 2}),
+        dead_letter_publisher=InMemEventPublisher(event_store=event_store),
+    ) as translator:
+        await translator.consume(
+            payload=files_to_stage_payload("file001"),
+            type_=config.files_to_stage_type,
+            topic=config.files_to_stage_topic,
+        )
+
+    assert [event.error_class for event in dead_letter_events(event_store)] == [
+        "ConnectionError"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_registered_one_by_one():
+    """Test that the events of a failed registration batch are processed one by one,
+    so that only the failing event is dead-lettered.
+    """
+    config = DEAD_LETTER_CONFIG.model_copy(update={"registration_batch_size": 3})
+    event_store = InMemEventStore()
+    file_registry = FakeFileRegistry(fail_for="file002")
+
+    async with EventSubTranslator.construct(
+        config=config,
+        file_registry=file_registry,
+        dead_letter_publisher=InMemEventPublisher(event_store=event_store),
+    ) as translator:
+        for file_id in ("file001", "file002", "file003"):
+            await translator.consume(
+                payload=files_to_register_payload(file_id),
+                type_=config.files_to_register_type,
+                topic=config.files_to_register_topic,
+            )
+
+    assert sorted(file_id for _, file_id in file_registry.calls) == [
+        "file001",
+        "file001",
+        "file003",
+    ]
+    assert [
+        event.original_payload["file_id"] for event in dead_letter_events(event_store)
+    ] == ["file002"]
+
+
+def dead_letter_payload(file_id: str, dead_lettered_ago: timedelta) -> dict:
+    """Get the payload of a dead-lettered files_to_stage event."""
+    dead_lettered_at = now_as_utc() - dead_lettered_ago
+    return DeadLetterEvent(
+        original_topic=EVENT_SUB_CONFIG.files_to_stage_topic,
+        original_payload=files_to_stage_payload(file_id),
+        error_class="ConnectionError",
+        error_message="Simulated failure.",
+        consumed_at=dead_lettered_at,
+        dead_lettered_at=dead_lettered_at,
+    ).model_dump(mode="json")
+
+
+@pytest.mark.asyncio
+async def test_replay_dead_letters():
+    """Test that dead-lettered events are replayed concurrently up to the limit and
+    that the replay stops at events dead-lettered after it started.
+    """
+    file_registry = FakeFileRegistry(latency=0.01)
+    file_ids = [f"file{index:03}" for index in range(10)]
+
+    async with EventSubTranslator.construct(
+        config=DEAD_LETTER_CONFIG, file_registry=file_registry
+    ) as translator, DeadLetterReplayTranslator.construct(
+        dead_letter_topic=DEAD_LETTER_CONFIG.dead_letter_topic or "",
+        target=translator,
+        concurrency=4,
+    ) as replay_translator:
+        for file_id in file_ids:
+            await replay_translator.consume(
+                payload=dead_letter_payload(file_id, timedelta(minutes=5)),
+                type_=DEAD_LETTER_CONFIG.files_to_stage_type,
+                topic=DEAD_LETTER_CONFIG.dead_letter_topic or "",
+            )
+
+        with pytest.raises(ReplayCaughtUpError):
+            await replay_translator.consume(
+                payload=dead_letter_payload("file999", -timedelta(minutes=5)),
+                type_=DEAD_LETTER_CONFIG.files_to_stage_type,
+                topic=DEAD_LETTER_CONFIG.dead_letter_topic or "",
+            )
+
+    assert sorted(file_id for _, file_id in file_registry.calls) == file_ids
+    assert file_registry.max_running == 4
+    assert replay_translator.stats.replayed == len(file_ids)
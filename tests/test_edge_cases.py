@@ -20,6 +20,7 @@ import logging
 import pytest
 from hexkit.providers.s3.testutils import FileObject, file_fixture  # noqa: F401
 
+from ifrs.core.models import FileRegistrationRequest
 from ifrs.ports.inbound.file_registry import FileRegistryPort
 from tests.fixtures.example_data import EXAMPLE_METADATA, EXAMPLE_METADATA_BASE
 from tests.fixtures.module_scope_fixtures import (  # noqa: F401
@@ -234,3 +235,60 @@ async def test_storage_db_inconsistency(
             outbox_object_id=EXAMPLE_METADATA.object_id,
             outbox_bucket_id=joint_fixture.outbox_bucket,
         )
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_register_files_batch(
+    caplog,
+    joint_fixture: JointFixture,  # noqa: F811
+    file_fixture: FileObject,  # noqa: F811
+):
+    """Check that a batch registration registers all new files, skips files that are
+    already registered, and raises the error for content missing in the staging only
+    after the other files have been registered.
+    """
+    file_object = file_fixture.model_copy(
+        update={
+            "bucket_id": joint_fixture.staging_bucket,
+            "object_id": EXAMPLE_METADATA.object_id,
+        }
+    )
+    await joint_fixture.s3.populate_file_objects(file_objects=[file_object])
+
+    # one file is already registered with different metadata:
+    await joint_fixture.file_metadata_dao.insert(EXAMPLE_METADATA)
+    updated_file = EXAMPLE_METADATA_BASE.model_copy(update={"decrypted_size": 4321})
+    new_file = EXAMPLE_METADATA_BASE.model_copy(update={"file_id": "examplefile002"})
+    missing_file = EXAMPLE_METADATA_BASE.model_copy(
+        update={"file_id": "examplefile003"}
+    )
+
+    requests = [
+        FileRegistrationRequest(
+            file_without_object_id=file,
+            staging_object_id=staging_object_id,
+            staging_bucket_id=joint_fixture.staging_bucket,
+        )
+        for file, staging_object_id in (
+            (updated_file, EXAMPLE_METADATA.object_id),
+            (new_file, EXAMPLE_METADATA.object_id),
+            (missing_file, "missing"),
+        )
+    ]
+
+    async with joint_fixture.kafka.record_events(
+        in_topic=joint_fixture.config.file_registered_event_topic
+    ) as recorder:
+        with caplog.at_level(level=logging.ERROR, logger="ifrs.core.file_registry"):
+            with pytest.raises(FileRegistryPort.FileContentNotInStagingError):
+                await joint_fixture.file_registry.register_files(requests=requests)
+            assert (
+                str(FileRegistryPort.FileUpdateError(file_id=updated_file.file_id))
+                in caplog.messages
+            )
+
+    assert [event.payload["file_id"] for event in recorder.recorded_events] == [
+        new_file.file_id
+    ]
+    registered_file = await joint_fixture.file_metadata_dao.get_by_id(new_file.file_id)
+    assert registered_file.decrypted_size == new_file.decrypted_size
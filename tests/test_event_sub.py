@@ -0,0 +1,467 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the event subscriber translator in isolation from the infrastructure."""
+
+import asyncio
+
+import pytest
+from ghga_event_schemas.validation import EventSchemaValidationError
+
+from ifrs.adapters.inbound.acknowledgement import DeliveryTracker
+from ifrs.adapters.inbound.event_sub import EventSubTranslator
+from ifrs.core.storage_budget import StorageBudget, StorageBudgetConfig
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.fake_registry import (
+    EVENT_SUB_CONFIG,
+    FakeFileRegistry,
+    files_to_register_payload,
+    files_to_stage_payload,
+)
+from tests.fixtures.in_memory import STAGING_BUCKET, InMemoryCore
+
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_keep_order_per_file():
+    """Test that events of different files are processed concurrently while events
+    of the same type and file are processed in the order they were consumed.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(update={"event_workers": 8})
+    file_registry = FakeFileRegistry(latency=0.01)
+    file_ids = [f"file{index:03}" for index in range(8)]
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for file_id in file_ids:
+            for attempt in range(2):
+                await translator.consume(
+                    payload=files_to_stage_payload(
+                        file_id, target_object_id=f"{file_id}-{attempt}"
+                    ),
+                    type_=config.files_to_stage_type,
+                    topic=config.files_to_stage_topic,
+                )
+
+    assert file_registry.max_running > 1
+    assert len(file_registry.outbox_object_ids) == 2 * len(file_ids)
+    for file_id in file_ids:
+        attempts = [
+            object_id
+            for object_id in file_registry.outbox_object_ids
+            if object_id.startswith(file_id)
+        ]
+        assert attempts == [f"{file_id}-0", f"{file_id}-1"]
+
+
+@pytest.mark.asyncio
+async def test_worker_failures_are_not_acknowledged():
+    """Test that an event failing in a worker without being dead-lettered does not
+    stop the workers, but stays unacknowledged, so that the offsets of later events
+    are not committed past it, and that no event is acknowledged before it has been
+    processed.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(update={"event_workers": 2})
+    file_registry = FakeFileRegistry(fail_for="broken", latency=0.01)
+    tracker: DeliveryTracker[int] = DeliveryTracker()
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for offset, file_id in enumerate(("file001", "broken", "file002")):
+            delivery = tracker.start(partition=0, offset=offset)
+            await translator.consume(
+                payload=files_to_stage_payload(file_id),
+                type_=config.files_to_stage_type,
+                topic=config.files_to_stage_topic,
+            )
+            delivery.release()
+        assert not tracker.get_committable()
+
+    assert sorted(file_id for _, file_id in file_registry.calls) == [
+        "file001",
+        "file002",
+    ]
+    assert tracker.get_committable() == {0: 1}
+
+
+@pytest.mark.asyncio
+async def test_registration_batches():
+    """Test that files_to_register events are collected into batches that are flushed
+    either when full or when the timeout expires.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(
+        update={"registration_batch_size": 3, "registration_batch_timeout_ms": 10}
+    )
+    file_registry = FakeFileRegistry()
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for index in range(4):
+            await translator.consume(
+                payload=files_to_register_payload(f"file{index:03}"),
+                type_=config.files_to_register_type,
+                topic=config.files_to_register_topic,
+            )
+        assert file_registry.batches == [["file000", "file001", "file002"]]
+
+        await asyncio.sleep(0.05)
+        assert file_registry.batches[1:] == [["file003"]]
+
+
+@pytest.mark.asyncio
+async def test_staging_batches():
+    """Test that files_to_stage events are staged in batches and that the files that
+    fail as part of a batch are staged one by one afterwards.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(
+        update={"staging_batch_size": 3, "staging_batch_timeout_ms": 10}
+    )
+    file_registry = FakeFileRegistry(transient_failures={"file001": 1})
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for index in range(4):
+            await translator.consume(
+                payload=files_to_stage_payload(f"file{index:03}"),
+                type_=config.files_to_stage_type,
+                topic=config.files_to_stage_topic,
+            )
+        assert file_registry.batches == [["file000", "file001", "file002"]]
+
+        await asyncio.sleep(0.05)
+        assert file_registry.batches[1:] == [["file003"]]
+
+    assert sorted(file_registry.outbox_object_ids) == [
+        f"file{index:03}-outbox" for index in range(4)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batches_processed_in_lanes():
+    """Test that a slow registration batch is processed in its lane without holding
+    back files_to_stage events, and that a failed batch neither affects later
+    batches nor loses the events of the files that can be registered.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(
+        update={"event_workers": 4, "registration_batch_size": 2}
+    )
+    file_registry = FakeFileRegistry(
+        fail_for="broken", latency_by_method={"register_file": 0.05}
+    )
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for file_id in ("file001", "broken", "file002", "file003"):
+            await translator.consume(
+                payload=files_to_register_payload(file_id),
+                type_=config.files_to_register_type,
+                topic=config.files_to_register_topic,
+            )
+        await translator.consume(
+            payload=files_to_stage_payload("file999"),
+            type_=config.files_to_stage_type,
+            topic=config.files_to_stage_topic,
+        )
+        await asyncio.sleep(0.01)
+
+        assert file_registry.calls == [("stage_registered_file", "file999")]
+
+    assert file_registry.batches == [["file001", "broken"], ["file002", "file003"]]
+    # the files of the failed batch are registered one by one
+    assert sorted(file_id for _, file_id in file_registry.calls) == [
+        "file001",
+        "file001",
+        "file002",
+        "file003",
+        "file999",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_staging_lane_not_blocked_by_registrations():
+    """Test that files_to_stage events are processed by their own lane and thus do not
+    wait for a backlog of slow registrations.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(update={"event_workers": 4})
+    file_registry = FakeFileRegistry(latency_by_method={"register_file": 0.05})
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for index in range(5):
+            await translator.consume(
+                payload=files_to_register_payload(f"file{index:03}"),
+                type_=config.files_to_register_type,
+                topic=config.files_to_register_topic,
+            )
+        await translator.consume(
+            payload=files_to_stage_payload("file999"),
+            type_=config.files_to_stage_type,
+            topic=config.files_to_stage_topic,
+        )
+        await asyncio.sleep(0.01)
+
+        assert file_registry.calls == [("stage_registered_file", "file999")]
+        stats = translator.lane_stats()
+        assert stats[config.files_to_register_type].queued >= 3
+        assert stats[config.files_to_stage_type].completed == 1
+
+    assert len(file_registry.calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_redelivered_events_are_skipped():
+    """Test that exact redeliveries of processed events are skipped by the
+    idempotency cache, while events with a different payload are not.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(update={"idempotency_cache_size": 2})
+    file_registry = FakeFileRegistry()
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for file_id in ("file001", "file001", "file002", "file001"):
+            await translator.consume(
+                payload=files_to_stage_payload(file_id),
+                type_=config.files_to_stage_type,
+                topic=config.files_to_stage_topic,
+            )
+
+        stats = translator.idempotency_cache_stats()
+
+    assert [file_id for _, file_id in file_registry.calls] == ["file001", "file002"]
+    assert stats is not None
+    assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "update",
+    [
+        {"upload_date": "not a date"},
+        {"encrypted_parts_md5": "not a list"},
+        {"s3_endpoint_alias": None},
+    ],
+)
+async def test_invalid_files_to_register_payload(update: dict):
+    """Test that files_to_register payloads violating the event schema are rejected."""
+    payload = {**files_to_register_payload("file001"), **update}
+    file_registry = FakeFileRegistry()
+
+    async with EventSubTranslator.construct(
+        config=EVENT_SUB_CONFIG, file_registry=file_registry
+    ) as translator:
+        with pytest.raises(EventSchemaValidationError):
+            await translator.consume(
+                payload=payload,
+                type_=EVENT_SUB_CONFIG.files_to_register_type,
+                topic=EVENT_SUB_CONFIG.files_to_register_topic,
+            )
+
+    assert not file_registry.calls
+
+
+@pytest.mark.asyncio
+async def test_consumption_paused_while_storage_budget_exceeded():
+    """Test that new events are not accepted while the copies in flight exceed the
+    budget of their storage and that consumption resumes once it has drained.
+    """
+    config = EVENT_SUB_CONFIG.model_copy(update={"event_workers": 4})
+    core = InMemoryCore(
+        storage_latency=0.02,
+        storage_budget=StorageBudget(
+            config=StorageBudgetConfig(max_copies_in_flight_per_storage=1)
+        ),
+    )
+    storage_alias = files_to_register_payload("file001")["s3_endpoint_alias"]
+    assert isinstance(storage_alias, str)
+    storage = core.object_storages.nodes[storage_alias]
+    for file_id in ("file001", "file002"):
+        storage.put_object(
+            bucket_id=STAGING_BUCKET, object_id=f"{file_id}-staged", content=b"content"
+        )
+
+    async with EventSubTranslator.construct(
+        config=config,
+        file_registry=core.file_registry,
+        storage_budget=core.storage_budget,
+    ) as translator:
+        await translator.consume(
+            payload=files_to_register_payload("file001"),
+            type_=config.files_to_register_type,
+            topic=config.files_to_register_topic,
+        )
+        while not translator.storage_budget_usage():
+            await asyncio.sleep(0.001)
+
+        second_event = asyncio.create_task(
+            translator.consume(
+                payload=files_to_register_payload("file002"),
+                type_=config.files_to_register_type,
+                topic=config.files_to_register_topic,
+            )
+        )
+        await asyncio.sleep(0.005)
+        assert not second_event.done()
+        assert translator.storage_budget_usage()[storage_alias].exceeded
+
+        await second_event
+
+    assert storage.calls["copy_object"] == 2
+    usage = translator.storage_budget_usage()[storage_alias]
+    assert (usage.copies_in_flight, usage.bytes_in_flight) == (0, 0)
+
+
+RETRY_CONFIG = EVENT_SUB_CONFIG.model_copy(
+    update={"max_retries": 2, "retry_initial_delay_ms": 1, "retry_max_delay_ms": 2}
+)
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried_later():
+    """Test that an event failing due to a transient error is retried after a delay
+    without holding back the events consumed in the meantime.
+    """
+    file_registry = FakeFileRegistry(transient_failures={"file001": 2})
+
+    async with EventSubTranslator.construct(
+        config=RETRY_CONFIG, file_registry=file_registry
+    ) as translator:
+        for file_id in ("file001", "file002"):
+            await translator.consume(
+                payload=files_to_stage_payload(file_id),
+                type_=RETRY_CONFIG.files_to_stage_type,
+                topic=RETRY_CONFIG.files_to_stage_topic,
+            )
+
+    assert [file_id for _, file_id in file_registry.calls] == ["file002", "file001"]
+    stats = translator.retry_stats()
+    assert stats is not None
+    assert (stats.retried, stats.recovered, stats.exhausted) == (2, 1, 0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("event_workers", [1, 4])
+async def test_retries_keep_order_per_file(event_workers: int):
+    """Test that events consumed while an earlier event of the same file awaits its
+    retry are held back until the retry is done.
+    """
+    config = RETRY_CONFIG.model_copy(update={"event_workers": event_workers})
+    file_registry = FakeFileRegistry(transient_failures={"file001": 1})
+
+    async with EventSubTranslator.construct(
+        config=config, file_registry=file_registry
+    ) as translator:
+        for file_id, attempt in (("file001", 0), ("file001", 1), ("file002", 0)):
+            await translator.consume(
+                payload=files_to_stage_payload(
+                    file_id, target_object_id=f"{file_id}-{attempt}"
+                ),
+                type_=config.files_to_stage_type,
+                topic=config.files_to_stage_topic,
+            )
+
+    assert [
+        object_id
+        for object_id in file_registry.outbox_object_ids
+        if object_id.startswith("file001")
+    ] == ["file001-0", "file001-1"]
+    assert file_registry.outbox_object_ids[0] == "file002-0"
+    stats = translator.retry_stats()
+    assert stats is not None
+    assert (stats.retried, stats.recovered, stats.pending) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_invalid_requests_are_not_retried():
+    """Test that events rejected by the core as invalid requests are not retried."""
+    file_registry = FakeFileRegistry(fail_for="file001")
+
+    async with EventSubTranslator.construct(
+        config=RETRY_CONFIG, file_registry=file_registry
+    ) as translator:
+        with pytest.raises(FileRegistryPort.FileContentNotInStagingError):
+            await translator.consume(
+                payload=files_to_stage_payload("file001"),
+                type_=RETRY_CONFIG.files_to_stage_type,
+                topic=RETRY_CONFIG.files_to_stage_topic,
+            )
+
+    stats = translator.retry_stats()
+    assert stats is not None
+    assert stats.retried == 0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_are_raised():
+    """Test that the error of an event that still fails after its last retry is
+    raised.
+    """
+    file_registry = FakeFileRegistry(transient_failures={"file001": 3})
+
+    with pytest.raises(ConnectionError):
+        async with EventSubTranslator.construct(
+            config=RETRY_CONFIG, file_registry=file_registry
+        ) as translator:
+            await translator.consume(
+                payload=files_to_stage_payload("file001"),
+                type_=RETRY_CONFIG.files_to_stage_type,
+                topic=RETRY_CONFIG.files_to_stage_topic,
+            )
+
+    assert not file_registry.calls
+
+
+@pytest.mark.asyncio
+async def test_staging_held_back_only_for_its_storage():
+    """Test that files_to_stage events are only held back while the budget of the
+    storage of their file is exceeded, not that of other storages.
+    """
+    storage_budget = StorageBudget(
+        config=StorageBudgetConfig(max_copies_in_flight_per_storage=1)
+    )
+    file_registry = FakeFileRegistry()
+    payload = files_to_stage_payload("file001")
+
+    async with EventSubTranslator.construct(
+        config=EVENT_SUB_CONFIG,
+        file_registry=file_registry,
+        storage_budget=storage_budget,
+    ) as translator, storage_budget.track_copy(storage_alias="other", size=1):
+        await asyncio.wait_for(
+            translator.consume(
+                payload=payload,
+                type_=EVENT_SUB_CONFIG.files_to_stage_type,
+                topic=EVENT_SUB_CONFIG.files_to_stage_topic,
+            ),
+            timeout=1,
+        )
+
+        held_back = asyncio.create_task(
+            translator.consume(
+                payload={**payload, "s3_endpoint_alias": "other"},
+                type_=EVENT_SUB_CONFIG.files_to_stage_type,
+                topic=EVENT_SUB_CONFIG.files_to_stage_topic,
+            )
+        )
+        await asyncio.sleep(0.01)
+        assert not held_back.done()
+        assert file_registry.calls == [("stage_registered_file", "file001")]
+
+    await held_back
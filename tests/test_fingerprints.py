@@ -0,0 +1,84 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests comparing file metadata by stored fingerprints."""
+
+import pytest
+
+from ifrs.core.fingerprints import backfill_fingerprints, compute_fingerprint
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA, EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import STAGING_BUCKET, InMemoryCore
+
+
+def test_fingerprint_ignores_object_id():
+    """Test that the fingerprint only covers the base metadata."""
+    assert compute_fingerprint(EXAMPLE_METADATA) == compute_fingerprint(
+        EXAMPLE_METADATA_BASE
+    )
+    assert compute_fingerprint(EXAMPLE_METADATA_BASE) != compute_fingerprint(
+        EXAMPLE_METADATA_BASE.model_copy(update={"decrypted_size": 1})
+    )
+
+
+@pytest.mark.asyncio
+async def test_registered_files_compared_by_fingerprint():
+    """Test that registering a file again only reads the stored fingerprint and that
+    changed metadata is still rejected.
+    """
+    core = InMemoryCore()
+    core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    for _ in range(2):
+        await core.file_registry.register_file(
+            file_without_object_id=EXAMPLE_METADATA_BASE,
+            staging_object_id="staging-object",
+            staging_bucket_id=STAGING_BUCKET,
+        )
+
+    registered_file = core.dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert registered_file.fingerprint == compute_fingerprint(EXAMPLE_METADATA_BASE)
+    assert core.dao.calls["get_fingerprints"] == 2
+    assert core.dao.calls["get_by_id"] == 0
+
+    with pytest.raises(FileRegistryPort.FileUpdateError):
+        await core.file_registry._is_file_registered(
+            file_without_object_id=EXAMPLE_METADATA_BASE.model_copy(
+                update={"decrypted_size": 1}
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_files_without_fingerprint():
+    """Test that files registered without fingerprint are compared by their full
+    metadata until their fingerprints have been backfilled.
+    """
+    core = InMemoryCore()
+    await core.dao.insert(EXAMPLE_METADATA)
+
+    assert await core.file_registry._is_file_registered(
+        file_without_object_id=EXAMPLE_METADATA_BASE
+    )
+    assert core.dao.calls["get_by_id"] == 1
+
+    assert await backfill_fingerprints(file_metadata_dao=core.dao) == 1  # type: ignore
+    assert await backfill_fingerprints(file_metadata_dao=core.dao) == 0  # type: ignore
+
+    assert await core.file_registry._is_file_registered(
+        file_without_object_id=EXAMPLE_METADATA_BASE
+    )
+    assert core.dao.calls["get_by_id"] == 1
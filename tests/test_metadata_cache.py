@@ -0,0 +1,161 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the cache of the metadata of registered files."""
+
+import pytest
+
+from ifrs.adapters.outbound.metrics import InMemoryMetricsSink
+from ifrs.core.metadata_cache import MetadataCache, MetadataCacheConfig
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from ifrs.ports.outbound.metrics import (
+    METADATA_CACHE_ENTRIES,
+    METADATA_CACHE_EVICTIONS,
+    METADATA_CACHE_LOOKUPS,
+)
+from tests.fixtures.example_data import EXAMPLE_METADATA
+from tests.fixtures.in_memory import OUTBOX_BUCKET, PERMANENT_BUCKET, InMemoryCore
+
+
+@pytest.mark.asyncio
+async def test_staging_requests_use_cache():
+    """Test that repeated staging requests look up the metadata only once and that
+    deleting the file invalidates the cached metadata.
+    """
+    cache = MetadataCache(config=MetadataCacheConfig(metadata_cache_max_entries=10))
+    core = InMemoryCore(metadata_cache=cache)
+    await core.dao.insert(EXAMPLE_METADATA)
+    core.object_storages.nodes[EXAMPLE_METADATA.storage_alias].put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=EXAMPLE_METADATA.object_id,
+        content=b"content",
+    )
+
+    for index in range(3):
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA.file_id,
+            decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+            outbox_object_id=f"outbox-object{index}",
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+    assert core.dao.calls["get_by_id"] == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    await core.file_registry.delete_file(file_id=EXAMPLE_METADATA.file_id)
+    assert not len(cache)
+
+    with pytest.raises(FileRegistryPort.FileNotInRegistryError):
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA.file_id,
+            decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+            outbox_object_id="outbox-object",
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+
+
+@pytest.mark.asyncio
+async def test_outdated_cached_metadata():
+    """Test that cached metadata whose permanent object is missing is read again, so
+    that a file registered again is staged and a deleted file is reported as not in
+    the registry instead of as inconsistent.
+    """
+    cache = MetadataCache(config=MetadataCacheConfig(metadata_cache_max_entries=10))
+    core = InMemoryCore(metadata_cache=cache)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+    await core.dao.insert(EXAMPLE_METADATA)
+    storage.put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=EXAMPLE_METADATA.object_id,
+        content=b"content",
+    )
+
+    async def stage(outbox_object_id: str) -> None:
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA.file_id,
+            decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+            outbox_object_id=outbox_object_id,
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+
+    await stage("outbox-object1")
+
+    # another instance deletes the file and registers it again
+    reregistered = EXAMPLE_METADATA.model_copy(update={"object_id": "new-object"})
+    await core.dao.delete(id_=EXAMPLE_METADATA.file_id)
+    await core.dao.insert(reregistered)
+    del storage.buckets[PERMANENT_BUCKET][EXAMPLE_METADATA.object_id]
+    storage.put_object(
+        bucket_id=PERMANENT_BUCKET, object_id="new-object", content=b"new content"
+    )
+
+    await stage("outbox-object2")
+    assert storage.buckets[OUTBOX_BUCKET]["outbox-object2"] == b"new content"
+    assert cache.get(EXAMPLE_METADATA.file_id) == reregistered
+
+    # another instance deletes the file for good
+    await core.dao.delete(id_=EXAMPLE_METADATA.file_id)
+    del storage.buckets[PERMANENT_BUCKET]["new-object"]
+    core.file_registry._presence.forget(
+        storage_alias=EXAMPLE_METADATA.storage_alias,
+        bucket_id=PERMANENT_BUCKET,
+        object_id="new-object",
+    )
+
+    with pytest.raises(FileRegistryPort.FileNotInRegistryError):
+        await stage("outbox-object3")
+    assert not len(cache)
+
+
+def test_eviction():
+    """Test that entries are evicted by count, size, and age and that this is
+    recorded in the metrics.
+    """
+    now = 0.0
+    metrics_sink = InMemoryMetricsSink()
+    size = len(EXAMPLE_METADATA.model_dump_json())
+    cache = MetadataCache(
+        config=MetadataCacheConfig(
+            metadata_cache_max_entries=3,
+            metadata_cache_max_bytes=int(2.5 * size),
+            metadata_cache_ttl=10,
+        ),
+        metrics_sink=metrics_sink,
+        clock=lambda: now,
+    )
+    files = [
+        EXAMPLE_METADATA.model_copy(update={"file_id": f"file{index}"})
+        for index in range(3)
+    ]
+
+    for file in files:
+        cache.put(file)
+    # the size limit only leaves room for two entries
+    assert cache.get("file0") is None
+    assert cache.get("file1") == files[1]
+
+    cache.put(files[0])
+    # file2 is least recently used as file1 has just been looked up
+    assert cache.get("file2") is None
+    assert len(cache) == 2
+    assert cache.size <= int(2.5 * size)
+
+    now = 10
+    assert cache.get("file1") is None
+
+    assert metrics_sink.get_counter(METADATA_CACHE_EVICTIONS, reason="capacity") == 2
+    assert metrics_sink.get_counter(METADATA_CACHE_EVICTIONS, reason="expired") == 1
+    assert metrics_sink.get_counter(METADATA_CACHE_LOOKUPS, result="hit") == 1
+    assert metrics_sink.get_counter(METADATA_CACHE_LOOKUPS, result="miss") == 3
+    assert metrics_sink.gauges[METADATA_CACHE_ENTRIES][()] == 1
@@ -0,0 +1,254 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the metrics recorded on consumed and processed events."""
+
+import asyncio
+import socket
+from dataclasses import dataclass, field
+
+import pytest
+from aiokafka import TopicPartition
+from hexkit.providers.akafka import KafkaConfig
+
+from ifrs.adapters.inbound.akafka import InstrumentedKafkaEventSubscriber
+from ifrs.adapters.inbound.event_sub import EventSubTranslator
+from ifrs.adapters.outbound.metrics import InMemoryMetricsSink, PrometheusMetricsSink
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from ifrs.ports.outbound.metrics import (
+    CONSUMER_LAG,
+    EVENT_PROCESSING_SECONDS,
+    EVENTS_CONSUMED,
+    EVENTS_PROCESSED,
+)
+from tests.fixtures.fake_registry import (
+    EVENT_SUB_CONFIG,
+    FakeFileRegistry,
+    files_to_stage_payload,
+)
+
+
+def test_prometheus_rendering():
+    """Test rendering counters, gauges, and histograms in the text format."""
+    sink = PrometheusMetricsSink(buckets=(0.1, 1.0))
+    sink.increment_counter(EVENTS_PROCESSED, labels={"type": "a", "outcome": "ok"})
+    sink.increment_counter(
+        EVENTS_PROCESSED, labels={"type": "a", "outcome": "ok"}, value=2
+    )
+    sink.set_gauge(CONSUMER_LAG, labels={"topic": 'x"y', "partition": "0"}, value=7)
+    for value in (0.05, 0.5, 5):
+        sink.observe_histogram(
+            EVENT_PROCESSING_SECONDS, labels={"type": "a"}, value=value
+        )
+
+    lines = sink.render().splitlines()
+
+    assert f"# TYPE {EVENTS_PROCESSED} counter" in lines
+    assert f'{EVENTS_PROCESSED}{{outcome="ok",type="a"}} 3.0' in lines
+    assert f'{CONSUMER_LAG}{{partition="0",topic="x\\"y"}} 7.0' in lines
+    assert f"# TYPE {EVENT_PROCESSING_SECONDS} histogram" in lines
+    assert f'{EVENT_PROCESSING_SECONDS}_bucket{{le="0.1",type="a"}} 1.0' in lines
+    assert f'{EVENT_PROCESSING_SECONDS}_bucket{{le="1.0",type="a"}} 2.0' in lines
+    assert f'{EVENT_PROCESSING_SECONDS}_bucket{{le="+Inf",type="a"}} 3.0' in lines
+    assert f'{EVENT_PROCESSING_SECONDS}_sum{{type="a"}} 5.55' in lines
+    assert f'{EVENT_PROCESSING_SECONDS}_count{{type="a"}} 3.0' in lines
+
+
+@pytest.mark.asyncio
+async def test_prometheus_serving():
+    """Test serving the metrics over HTTP at '/metrics' only."""
+    sink = PrometheusMetricsSink()
+    sink.increment_counter(EVENTS_CONSUMED, labels={"topic": "t", "type": "a"})
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+
+    async def get(path: str) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+        response = (await reader.read()).decode()
+        writer.close()
+        return response
+
+    async with sink.serve(host="127.0.0.1", port=port, request_timeout=0.5):
+        response = await get("/metrics")
+        assert (await get("/other")).startswith("HTTP/1.0 404")
+
+        # idle connections are closed once the request timeout has passed
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        assert await asyncio.wait_for(reader.read(), timeout=5) == b""
+        writer.close()
+
+    assert response.startswith("HTTP/1.0 200 OK")
+    assert f'{EVENTS_CONSUMED}{{topic="t",type="a"}} 1.0' in response
+
+
+@pytest.mark.asyncio
+async def test_processing_metrics():
+    """Test that the translator records the outcome and duration of processing."""
+    config = EVENT_SUB_CONFIG.model_copy(update={"idempotency_cache_size": 10})
+    sink = InMemoryMetricsSink()
+    stage_type = config.files_to_stage_type
+
+    async with EventSubTranslator.construct(
+        config=config,
+        file_registry=FakeFileRegistry(fail_for="file002"),
+        metrics_sink=sink,
+    ) as translator:
+        for file_id in ("file001", "file001", "file002"):
+            try:
+                await translator.consume(
+                    payload=files_to_stage_payload(file_id),
+                    type_=stage_type,
+                    topic=config.files_to_stage_topic,
+                )
+            except FileRegistryPort.FileContentNotInStagingError:
+                pass
+
+    for outcome in ("success", "skipped", "failure"):
+        assert sink.get_counter(EVENTS_PROCESSED, outcome=outcome, type=stage_type) == 1
+    assert (
+        len(sink.observations[EVENT_PROCESSING_SECONDS][(("type", stage_type),)]) == 2
+    )
+
+
+@dataclass
+class FakeConsumerEvent:
+    """A consumed event as provided by the fake consumer."""
+
+    topic: str
+    partition: int
+    offset: int
+    value: dict
+    key: str = "key"
+    headers: list[tuple[str, bytes]] = field(default_factory=list)
+
+
+class FakeConsumer:
+    """A Kafka consumer stand-in delivering the events of a class-level list, then
+    waiting forever, and reporting a fixed highwater offset.
+    """
+
+    events: list[FakeConsumerEvent] = []
+    commits: list[dict] = []
+    highwater_offset = 10
+
+    def __init__(self, *topics, **kwargs):
+        """Accept the arguments of the actual consumer."""
+        self._events = iter(self.events)
+
+    async def start(self) -> None:
+        """Nothing to start."""
+
+    async def stop(self) -> None:
+        """Nothing to stop."""
+
+    async def commit(self, offsets=None) -> None:
+        """Record the committed offsets."""
+        self.commits.append(offsets)
+
+    def highwater(self, partition) -> int:
+        """Get the highwater offset of a partition."""
+        return self.highwater_offset
+
+    async def __anext__(self) -> FakeConsumerEvent:
+        """Deliver the next event or wait forever if there is none."""
+        event = next(self._events, None)
+        if event is None:
+            await asyncio.Event().wait()
+        assert event
+        return event
+
+
+KAFKA_CONFIG = KafkaConfig(  # type: ignore
+    service_name="ifrs", service_instance_id="1", kafka_servers=["localhost:9092"]
+)
+
+
+def files_to_stage_event(file_id: str, *, offset: int) -> FakeConsumerEvent:
+    """Get a files_to_stage event for the given file at the given offset."""
+    return FakeConsumerEvent(
+        topic=EVENT_SUB_CONFIG.files_to_stage_topic,
+        partition=3,
+        offset=offset,
+        value=files_to_stage_payload(file_id),
+        headers=[
+            ("type", EVENT_SUB_CONFIG.files_to_stage_type.encode()),
+            ("correlation_id", b"9b3b7a7e-ebc4-4c2f-94c4-a79c06e5d1b6"),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_consumer_metrics():
+    """Test that the subscriber counts the consumed events, records the lag, and
+    commits the offsets of the processed events.
+    """
+    FakeConsumer.events = [
+        files_to_stage_event(f"file00{offset}", offset=offset) for offset in (4, 5)
+    ]
+    FakeConsumer.commits = []
+    sink = InMemoryMetricsSink()
+
+    async with EventSubTranslator.construct(
+        config=EVENT_SUB_CONFIG, file_registry=FakeFileRegistry()
+    ) as translator, InstrumentedKafkaEventSubscriber.construct(
+        config=KAFKA_CONFIG,
+        translator=translator,
+        kafka_consumer_cls=FakeConsumer,  # type: ignore
+        metrics_sink=sink,
+    ) as subscriber:
+        for _ in FakeConsumer.events:
+            await subscriber.run(forever=False)
+
+    assert (
+        sink.get_counter(
+            EVENTS_CONSUMED,
+            topic=EVENT_SUB_CONFIG.files_to_stage_topic,
+            type=EVENT_SUB_CONFIG.files_to_stage_type,
+        )
+        == 2
+    )
+    partition = TopicPartition(EVENT_SUB_CONFIG.files_to_stage_topic, 3)
+    assert FakeConsumer.commits == [{partition: 5}, {partition: 6}]
+    lag = sink.gauges[CONSUMER_LAG][
+        (("partition", "3"), ("topic", EVENT_SUB_CONFIG.files_to_stage_topic))
+    ]
+    assert lag == 4
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout():
+    """Test that a subscriber with an idle timeout stops once no further event
+    arrives, without interrupting an event that takes longer than the timeout to
+    process.
+    """
+    FakeConsumer.events = [files_to_stage_event("file001", offset=0)]
+    FakeConsumer.commits = []
+    file_registry = FakeFileRegistry(latency=0.1)
+
+    async with EventSubTranslator.construct(
+        config=EVENT_SUB_CONFIG, file_registry=file_registry
+    ) as translator, InstrumentedKafkaEventSubscriber.construct(
+        config=KAFKA_CONFIG,
+        translator=translator,
+        kafka_consumer_cls=FakeConsumer,  # type: ignore
+        idle_timeout=0.05,
+    ) as subscriber:
+        await asyncio.wait_for(subscriber.run(forever=True), timeout=5)
+
+    assert file_registry.calls == [("stage_registered_file", "file001")]
+    partition = TopicPartition(EVENT_SUB_CONFIG.files_to_stage_topic, 3)
+    assert FakeConsumer.commits == [{partition: 1}]
@@ -0,0 +1,182 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests copying objects in parallel parts."""
+
+import os
+
+import pytest
+
+from ifrs.core.multipart_copy import (
+    MAX_PARTS,
+    MIN_PART_SIZE,
+    MultipartCopier,
+    MultipartCopyConfig,
+    plan_copy_parts,
+)
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import (
+    PERMANENT_BUCKET,
+    STAGING_BUCKET,
+    InMemoryMultipartObjectStorage,
+    InMemoryObjectStorage,
+)
+
+MiB = 1024**2
+SMALL_PART_CONFIG = MultipartCopyConfig(
+    multipart_copy_threshold=0,
+    multipart_copy_part_size=MIN_PART_SIZE,
+    multipart_copy_concurrency_per_object=2,
+)
+
+
+@pytest.mark.parametrize(
+    "object_size, content_offset, encrypted_part_size, target_part_size",
+    [
+        (1000 * MiB + 12345, 124, 64 * 1024 + 28, 64 * MiB),
+        (17 * MiB, 16 * MiB, 16 * MiB, 5 * MiB),
+        (10 * MiB, 124, 3 * MiB, 5 * MiB),
+        (MAX_PARTS * 6 * MiB, 0, MiB, 5 * MiB),
+    ],
+)
+def test_plan_copy_parts(
+    object_size: int,
+    content_offset: int,
+    encrypted_part_size: int,
+    target_part_size: int,
+):
+    """Test that the planned parts cover the object, line up with the encrypted
+    parts, and respect the part limits.
+    """
+    parts = plan_copy_parts(
+        object_size=object_size,
+        content_offset=content_offset,
+        encrypted_part_size=encrypted_part_size,
+        target_part_size=target_part_size,
+    )
+
+    assert parts[0].first_byte == 0
+    assert parts[-1].last_byte == object_size - 1
+    assert len(parts) <= MAX_PARTS
+    for part, next_part in zip(parts, parts[1:]):
+        assert next_part.first_byte == part.last_byte + 1
+        assert (part.last_byte + 1 - content_offset) % encrypted_part_size == 0
+        assert part.last_byte + 1 - part.first_byte >= MIN_PART_SIZE
+
+
+@pytest.mark.asyncio
+async def test_copy_in_parts():
+    """Test that a large object is copied in parts with limited concurrency."""
+    storage = InMemoryMultipartObjectStorage(latency=0.001)
+    content = os.urandom(23 * MiB)
+    storage.buckets = {STAGING_BUCKET: {"source": content}, PERMANENT_BUCKET: {}}
+    running = max_running = 0
+    upload_part_copy = storage.upload_part_copy
+
+    async def counting_upload_part_copy(**kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(running, max_running)
+        try:
+            return await upload_part_copy(**kwargs)
+        finally:
+            running -= 1
+
+    storage.upload_part_copy = counting_upload_part_copy  # type: ignore
+    file = EXAMPLE_METADATA_BASE.model_copy(
+        update={"content_offset": 124, "encrypted_part_size": MiB}
+    )
+
+    await MultipartCopier(config=SMALL_PART_CONFIG).copy_object(
+        file=file,
+        object_storage=storage,
+        source_bucket_id=STAGING_BUCKET,
+        source_object_id="source",
+        dest_bucket_id=PERMANENT_BUCKET,
+        dest_object_id="dest",
+    )
+
+    assert storage.buckets[PERMANENT_BUCKET]["dest"] == content
+    assert storage.calls["upload_part_copy"] == 5
+    assert storage.calls["copy_object"] == 0
+    assert max_running == SMALL_PART_CONFIG.multipart_copy_concurrency_per_object
+    assert not storage.uploads
+
+
+@pytest.mark.parametrize(
+    "storage, threshold",
+    [
+        (InMemoryObjectStorage(), 0),
+        (InMemoryMultipartObjectStorage(), EXAMPLE_METADATA_BASE.decrypted_size + 1),
+    ],
+)
+@pytest.mark.asyncio
+async def test_copy_falls_back_to_single_request(
+    storage: InMemoryObjectStorage, threshold: int
+):
+    """Test that objects are copied with a single request if the storage does not
+    support part copies or if the file is below the size threshold.
+    """
+    storage.buckets = {STAGING_BUCKET: {"source": b"content"}, PERMANENT_BUCKET: {}}
+    config = SMALL_PART_CONFIG.model_copy(
+        update={"multipart_copy_threshold": threshold}
+    )
+
+    await MultipartCopier(config=config).copy_object(
+        file=EXAMPLE_METADATA_BASE,
+        object_storage=storage,
+        source_bucket_id=STAGING_BUCKET,
+        source_object_id="source",
+        dest_bucket_id=PERMANENT_BUCKET,
+        dest_object_id="dest",
+    )
+
+    assert storage.buckets[PERMANENT_BUCKET]["dest"] == b"content"
+    assert set(storage.calls) == {"copy_object"}
+
+
+@pytest.mark.asyncio
+async def test_failed_part_aborts_copy():
+    """Test that the multipart upload is aborted if a part cannot be copied."""
+    storage = InMemoryMultipartObjectStorage()
+    storage.buckets = {
+        STAGING_BUCKET: {"source": os.urandom(12 * MiB)},
+        PERMANENT_BUCKET: {},
+    }
+    upload_part_copy = storage.upload_part_copy
+
+    async def failing_upload_part_copy(**kwargs):
+        if kwargs["part_number"] == 2:
+            raise storage.ObjectError("Simulated failure.")
+        return await upload_part_copy(**kwargs)
+
+    storage.upload_part_copy = failing_upload_part_copy  # type: ignore
+    file = EXAMPLE_METADATA_BASE.model_copy(
+        update={"content_offset": 0, "encrypted_part_size": MiB}
+    )
+
+    with pytest.raises(storage.ObjectError):
+        await MultipartCopier(config=SMALL_PART_CONFIG).copy_object(
+            file=file,
+            object_storage=storage,
+            source_bucket_id=STAGING_BUCKET,
+            source_object_id="source",
+            dest_bucket_id=PERMANENT_BUCKET,
+            dest_object_id="dest",
+        )
+
+    assert storage.calls["abort_multipart_upload"] == 1
+    assert not storage.uploads
+    assert not storage.buckets[PERMANENT_BUCKET]
@@ -0,0 +1,73 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the generation of object IDs."""
+
+import re
+import uuid
+
+import pytest
+
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.object_ids import ObjectIdConfig, get_object_id_generator
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import STAGING_BUCKET, InMemoryCore
+
+
+def test_uuid7_object_ids_are_time_ordered():
+    """Test that uuid7 object IDs are valid version 7 UUIDs in generation order, also
+    when many are generated within the same millisecond.
+    """
+    generate = get_object_id_generator(ObjectIdConfig(object_id_scheme="uuid7"))
+
+    object_ids = [generate() for _ in range(10_000)]
+
+    assert object_ids == sorted(object_ids)
+    assert len(set(object_ids)) == len(object_ids)
+    for object_id in object_ids:
+        parsed = uuid.UUID(object_id)
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+
+
+@pytest.mark.parametrize("scheme", ["uuid4", "uuid7"])
+def test_prefixed_object_ids(scheme):
+    """Test that the hashed prefix precedes the UUID and is derived from it."""
+    generate = get_object_id_generator(
+        ObjectIdConfig(object_id_scheme=scheme, object_id_prefix_length=4)
+    )
+
+    prefix, object_uuid = generate().split("-", 1)
+
+    assert re.fullmatch("[0-9a-f]{4}", prefix)
+    assert str(uuid.UUID(object_uuid)) == object_uuid
+
+
+@pytest.mark.asyncio
+async def test_register_with_configured_object_ids():
+    """Test that registered files get object IDs of the configured scheme."""
+    core = InMemoryCore(config=FileRegistryConfig(object_id_scheme="uuid7"))
+    core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+    registered_file = core.dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert uuid.UUID(registered_file.object_id).version == 7
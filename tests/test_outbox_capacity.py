@@ -0,0 +1,153 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests evicting the least recently staged objects from the outbox."""
+
+from typing import Any, Callable
+
+import pytest
+from pydantic import ValidationError
+
+from ifrs.core.outbox_capacity import OutboxCapacityConfig
+from tests.fixtures.config import DEFAULT_CONFIG, get_config
+from tests.fixtures.example_data import EXAMPLE_METADATA
+from tests.fixtures.in_memory import OUTBOX_BUCKET, PERMANENT_BUCKET, InMemoryCore
+
+SIZE = EXAMPLE_METADATA.decrypted_size
+
+
+async def prepare_core(*, clock: Callable[[], float]) -> InMemoryCore:
+    """Prepare a core with room for two and a half copies of the example file in the
+    outbox of its node and register the example file.
+    """
+    core = InMemoryCore(
+        outbox_capacity_config=OutboxCapacityConfig(
+            outbox_capacities={EXAMPLE_METADATA.storage_alias: int(2.5 * SIZE)},
+            outbox_eviction_min_age=5,
+        ),
+        clock=clock,
+    )
+    await core.dao.insert(EXAMPLE_METADATA)
+    core.object_storages.nodes[EXAMPLE_METADATA.storage_alias].put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=EXAMPLE_METADATA.object_id,
+        content=b"content",
+    )
+    return core
+
+
+async def stage(core: InMemoryCore, outbox_object_id: str) -> None:
+    """Stage the example file to the given outbox object."""
+    await core.file_registry.stage_registered_file(
+        file_id=EXAMPLE_METADATA.file_id,
+        decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+        outbox_object_id=outbox_object_id,
+        outbox_bucket_id=OUTBOX_BUCKET,
+    )
+
+
+@pytest.mark.asyncio
+async def test_evict_least_recently_staged():
+    """Test that the least recently staged objects are evicted once they are old
+    enough, while objects requested again are kept.
+    """
+    now = 0.0
+    core = await prepare_core(clock=lambda: now)
+    assert core.outbox_capacity
+    outbox = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias].buckets[
+        OUTBOX_BUCKET
+    ]
+
+    for outbox_object_id in ("outbox1", "outbox2", "outbox3", "outbox1"):
+        await stage(core, outbox_object_id)
+        now += 1
+
+    # all objects have been staged too recently to be evicted
+    assert not await core.outbox_capacity.evict(storage_alias="test")
+    assert len(outbox) == 3
+
+    now = 7
+    assert await core.outbox_capacity.evict(storage_alias="test") == SIZE
+    assert set(outbox) == {"outbox1", "outbox3"}
+    assert set(core.outbox_object_dao.documents) == {
+        "test/outbox/outbox1",
+        "test/outbox/outbox3",
+    }
+    # only the record of the evicted object has been read, not all of them
+    assert core.outbox_object_dao.read["test"] == 1
+    assert not core.outbox_object_dao.calls["find_all"]
+
+    # the capacity is met, so nothing is evicted anymore and no records are read
+    now = 100
+    assert not await core.outbox_capacity.evict(storage_alias="test")
+    assert core.outbox_object_dao.read["test"] == 1
+
+
+@pytest.mark.asyncio
+async def test_restaged_objects_are_kept():
+    """Test that an object selected for eviction is kept if requested again before
+    it is evicted, and that evicted objects are staged again on request.
+    """
+    now = 0.0
+    core = await prepare_core(clock=lambda: now)
+    assert core.outbox_capacity
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+
+    for outbox_object_id in ("outbox1", "outbox2", "outbox3"):
+        await stage(core, outbox_object_id)
+    now = 10
+    # simulate a staging request arriving between reading and checking the records
+    select = core.outbox_capacity._select_for_eviction
+
+    async def select_and_restage(*, storage_alias: str):
+        selected = await select(storage_alias=storage_alias)
+        await stage(core, "outbox1")
+        return selected
+
+    core.outbox_capacity._select_for_eviction = select_and_restage  # type: ignore
+    assert not await core.outbox_capacity.evict(storage_alias="test")
+    assert len(storage.buckets[OUTBOX_BUCKET]) == 3
+
+    core.outbox_capacity._select_for_eviction = select  # type: ignore
+    now = 20
+    assert await core.outbox_capacity.evict(storage_alias="test") == SIZE
+    assert "outbox1" in storage.buckets[OUTBOX_BUCKET]
+
+    copies = storage.calls["copy_object"]
+    await stage(core, "outbox2")
+    assert storage.calls["copy_object"] == copies + 1
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"outbox_presence_ttl": 3600},
+        {"idempotency_cache_size": 100, "idempotency_cache_ttl_seconds": 7200},
+    ],
+)
+def test_eviction_min_age_validation(overrides: dict[str, Any]):
+    """Test that a minimum age for eviction that is shorter than the time outbox
+    objects are assumed to be present is rejected if outbox capacities are limited.
+    """
+    config = DEFAULT_CONFIG.model_copy(update=overrides)
+    outbox_capacity_config = OutboxCapacityConfig(
+        outbox_capacities={"test": SIZE}, outbox_eviction_min_age=3600
+    )
+
+    with pytest.raises(ValidationError):
+        get_config(sources=[config, outbox_capacity_config])
+
+    # the minimum age does not matter if outbox capacities are not limited
+    get_config(sources=[config])
@@ -0,0 +1,110 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests skipping checks for objects known to be present."""
+
+import pytest
+
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.presence_tracker import PresenceTracker, PresenceTrackerConfig
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import (
+    OUTBOX_BUCKET,
+    PERMANENT_BUCKET,
+    STAGING_BUCKET,
+    InMemoryCore,
+)
+
+TRACKING_CONFIG = FileRegistryConfig(outbox_presence_ttl=60, permanent_presence_ttl=60)
+
+
+async def register_and_stage(core: InMemoryCore, *outbox_object_ids: str) -> None:
+    """Register the example file and stage it to the given outbox objects."""
+    core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+    for outbox_object_id in outbox_object_ids:
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA_BASE.file_id,
+            decrypted_sha256=EXAMPLE_METADATA_BASE.decrypted_sha256,
+            outbox_object_id=outbox_object_id,
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+
+
+@pytest.mark.asyncio
+async def test_known_objects_are_not_checked():
+    """Test that the permanent object copied by the registration and the staged
+    outbox objects are not checked again.
+    """
+    core = InMemoryCore(config=TRACKING_CONFIG)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+
+    await register_and_stage(core, "outbox1", "outbox2", "outbox1", "outbox2")
+
+    # one check of the staging object and one per new outbox object
+    assert storage.calls["does_object_exist"] == 3
+    assert storage.calls["copy_object"] == 3
+
+
+@pytest.mark.asyncio
+async def test_missing_permanent_object_is_detected():
+    """Test that a permanent object that vanished despite being tracked as present
+    is still reported as missing.
+    """
+    core = InMemoryCore(config=TRACKING_CONFIG)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    await register_and_stage(core)
+    storage.buckets[PERMANENT_BUCKET].clear()
+
+    with pytest.raises(FileRegistryPort.FileInRegistryButNotInStorageError):
+        await core.file_registry.stage_registered_file(
+            file_id=EXAMPLE_METADATA_BASE.file_id,
+            decrypted_sha256=EXAMPLE_METADATA_BASE.decrypted_sha256,
+            outbox_object_id="outbox",
+            outbox_bucket_id=OUTBOX_BUCKET,
+        )
+
+
+def test_expiry_and_capacity():
+    """Test that tracked objects are forgotten once expired or least recently
+    confirmed.
+    """
+    now = 0.0
+    tracker = PresenceTracker(
+        config=PresenceTrackerConfig(presence_tracker_max_entries=2),
+        clock=lambda: now,
+    )
+    for object_id, ttl in (("a", 10), ("b", 20), ("c", 20), ("d", 0)):
+        tracker.mark_present(
+            storage_alias="test", bucket_id="outbox", object_id=object_id, ttl=ttl
+        )
+
+    assert len(tracker) == 2
+    assert not tracker.is_present(
+        storage_alias="test", bucket_id="outbox", object_id="a"
+    )
+    assert tracker.is_present(storage_alias="test", bucket_id="outbox", object_id="b")
+
+    now = 20
+    assert not tracker.is_present(
+        storage_alias="test", bucket_id="outbox", object_id="c"
+    )
@@ -0,0 +1,179 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests staging byte ranges of the decrypted content of files."""
+
+from typing import Optional
+
+import pytest
+
+from ifrs.core import models
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.multipart_copy import MIN_PART_SIZE
+from ifrs.core.range_staging import CRYPT4GH_CIPHER_SEGMENT_SIZE, CRYPT4GH_SEGMENT_SIZE
+from ifrs.ports.inbound.file_registry import FileRegistryPort
+from tests.fixtures.example_data import EXAMPLE_METADATA
+from tests.fixtures.in_memory import OUTBOX_BUCKET, PERMANENT_BUCKET, InMemoryCore
+
+SEGMENTS_PER_PART = 80
+ENCRYPTED_PART_SIZE = SEGMENTS_PER_PART * CRYPT4GH_CIPHER_SEGMENT_SIZE
+# three full encrypted parts followed by a single partial segment
+DECRYPTED_SIZE = 3 * SEGMENTS_PER_PART * CRYPT4GH_SEGMENT_SIZE + 1000
+CONTENT_SIZE = 3 * ENCRYPTED_PART_SIZE + 1000 + 28
+
+
+async def prepare_core(
+    *, content_offset: int, config: Optional[FileRegistryConfig] = None
+) -> tuple[InMemoryCore, bytes]:
+    """Register a file with the given envelope size and return the core along with
+    the encrypted content of the file, excluding the envelope.
+    """
+    core = InMemoryCore(aliases=("test", "outbox"), multipart=True, config=config)
+    file = EXAMPLE_METADATA.model_copy(
+        update={
+            "decrypted_size": DECRYPTED_SIZE,
+            "encrypted_part_size": ENCRYPTED_PART_SIZE,
+            "content_offset": content_offset,
+        }
+    )
+    await core.dao.insert(file)
+    content = bytes(index % 251 for index in range(CONTENT_SIZE))
+    core.object_storages.nodes[file.storage_alias].put_object(
+        bucket_id=PERMANENT_BUCKET,
+        object_id=file.object_id,
+        content=b"e" * content_offset + content,
+    )
+    return core, content
+
+
+async def stage_range(
+    core: InMemoryCore, *, first_byte: int, last_byte: int
+) -> models.StagedRange:
+    """Stage a range of the example file to the outbox object 'range'."""
+    return await core.file_registry.stage_registered_file_range(
+        file_id=EXAMPLE_METADATA.file_id,
+        decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+        outbox_object_id="range",
+        outbox_bucket_id=OUTBOX_BUCKET,
+        first_byte=first_byte,
+        last_byte=last_byte,
+    )
+
+
+@pytest.mark.asyncio
+async def test_stage_range_with_envelope():
+    """Test that a range within the second encrypted part is staged as the envelope
+    followed by that part only, without publishing a staged event.
+    """
+    core, content = await prepare_core(content_offset=100)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+
+    first_byte = 100 * CRYPT4GH_SEGMENT_SIZE + 10
+    staged_range = await stage_range(
+        core, first_byte=first_byte, last_byte=first_byte + 200_000
+    )
+
+    assert staged_range == models.StagedRange(
+        file_id=EXAMPLE_METADATA.file_id,
+        decrypted_first_byte=SEGMENTS_PER_PART * CRYPT4GH_SEGMENT_SIZE,
+        decrypted_last_byte=2 * SEGMENTS_PER_PART * CRYPT4GH_SEGMENT_SIZE - 1,
+        encrypted_first_byte=ENCRYPTED_PART_SIZE,
+        encrypted_last_byte=2 * ENCRYPTED_PART_SIZE - 1,
+        staged_size=100 + ENCRYPTED_PART_SIZE,
+    )
+    assert (
+        storage.buckets[OUTBOX_BUCKET]["range"]
+        == b"e" * 100 + content[ENCRYPTED_PART_SIZE : 2 * ENCRYPTED_PART_SIZE]
+    )
+    assert storage.calls["upload_part"] == 1
+    assert not core.published_events("file_staged_for_download")
+
+    # an existing outbox object is not staged again
+    await stage_range(core, first_byte=first_byte, last_byte=first_byte)
+    assert storage.calls["init_multipart_upload"] == 1
+
+    # unless it holds a range of another size, which is rejected
+    with pytest.raises(FileRegistryPort.OutboxObjectMismatchError):
+        await stage_range(
+            core, first_byte=DECRYPTED_SIZE - 1, last_byte=DECRYPTED_SIZE - 1
+        )
+    assert storage.calls["init_multipart_upload"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stage_last_range():
+    """Test that a range at the end of a file without envelope is copied server-side
+    and ends with the end of the content.
+    """
+    core, content = await prepare_core(content_offset=0)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA.storage_alias]
+
+    staged_range = await stage_range(
+        core, first_byte=DECRYPTED_SIZE - 1500, last_byte=DECRYPTED_SIZE - 1
+    )
+
+    # the range starts within the last full encrypted part
+    assert staged_range.decrypted_first_byte == (
+        2 * SEGMENTS_PER_PART * CRYPT4GH_SEGMENT_SIZE
+    )
+    assert staged_range.decrypted_last_byte == DECRYPTED_SIZE - 1
+    assert staged_range.encrypted_last_byte == CONTENT_SIZE - 1
+    assert (
+        storage.buckets[OUTBOX_BUCKET]["range"]
+        == content[staged_range.encrypted_first_byte :]
+    )
+    assert storage.calls["upload_part_copy"] == 1
+    assert not storage.calls["upload_part"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "first_byte, last_byte",
+    [(-1, 10), (10, 9), (0, DECRYPTED_SIZE)],
+)
+async def test_invalid_range(first_byte: int, last_byte: int):
+    """Test that ranges outside of the decrypted content are rejected."""
+    core, _ = await prepare_core(content_offset=100)
+
+    with pytest.raises(FileRegistryPort.InvalidRangeError):
+        await stage_range(core, first_byte=first_byte, last_byte=last_byte)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("server_side", [True, False])
+async def test_stage_range_through_buffers(server_side: bool):
+    """Test that the parts of a range that are downloaded, i.e. the part carrying the
+    envelope or all parts if copied across nodes, fit into the pooled buffers.
+    """
+    config = FileRegistryConfig(
+        streaming_copy_buffer_size=MIN_PART_SIZE,
+        bucket_storage_aliases={} if server_side else {OUTBOX_BUCKET: "outbox"},
+    )
+    core, content = await prepare_core(content_offset=100, config=config)
+    outbox_node = core.object_storages.nodes["test" if server_side else "outbox"]
+
+    staged_range = await stage_range(core, first_byte=0, last_byte=DECRYPTED_SIZE - 1)
+
+    assert staged_range.staged_size == 100 + CONTENT_SIZE
+    assert outbox_node.buckets[OUTBOX_BUCKET]["range"] == b"e" * 100 + content
+    if server_side:
+        # only the first part is downloaded to prepend the envelope
+        assert outbox_node.calls["upload_part"] == 1
+        assert outbox_node.calls["upload_part_copy"] == 1
+    else:
+        assert outbox_node.calls["upload_part"] == 4
+        assert not outbox_node.calls["upload_part_copy"]
+    pool = core.file_registry._streaming_copier.pool
+    assert 1 <= pool.allocated <= pool.buffer_count
@@ -0,0 +1,109 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests resuming interrupted registrations from the registration journal."""
+
+import pytest
+
+from ifrs.core import models
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import PERMANENT_BUCKET, STAGING_BUCKET, InMemoryCore
+
+
+class Crash(Exception):
+    """Simulates the process dying at some point of a registration."""
+
+
+def prepare_core() -> InMemoryCore:
+    """Get a core journaling registrations with file content in staging."""
+    core = InMemoryCore(registration_journal=True)
+    core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=b"content"
+    )
+    return core
+
+
+async def register(core: InMemoryCore) -> None:
+    """Register the example file from the staging object."""
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+
+
+@pytest.mark.asyncio
+async def test_resume_after_copy():
+    """Test that a registration interrupted after the copy reuses the object ID and
+    the copied content.
+    """
+    core = prepare_core()
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    insert = core.dao.insert
+
+    async def crashing_insert(dto):
+        raise Crash()
+
+    core.dao.insert = crashing_insert  # type: ignore
+    with pytest.raises(Crash):
+        await register(core)
+    intent = core.registration_intent_dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert intent.phase == "copied"
+
+    core.dao.insert = insert  # type: ignore
+    await register(core)
+
+    assert storage.calls["copy_object"] == 1
+    assert list(storage.buckets[PERMANENT_BUCKET]) == [intent.object_id]
+    assert core.dao.documents[EXAMPLE_METADATA_BASE.file_id].object_id == (
+        intent.object_id
+    )
+    assert not core.registration_intent_dao.documents
+
+
+@pytest.mark.asyncio
+async def test_resume_during_copy():
+    """Test that a registration interrupted during the copy copies the content again
+    to the same object, also within bulk registrations.
+    """
+    core = prepare_core()
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    copy_object = storage.copy_object
+
+    async def crashing_copy_object(**kwargs):
+        await copy_object(**kwargs)
+        raise Crash()
+
+    storage.copy_object = crashing_copy_object  # type: ignore
+    with pytest.raises(Crash):
+        await register(core)
+    intent = core.registration_intent_dao.documents[EXAMPLE_METADATA_BASE.file_id]
+    assert intent.phase == "copying"
+
+    storage.copy_object = copy_object  # type: ignore
+    [outcome] = await core.file_registry.register_files(
+        requests=[
+            models.FileRegistrationRequest(
+                file_without_object_id=EXAMPLE_METADATA_BASE,
+                staging_object_id="staging-object",
+                staging_bucket_id=STAGING_BUCKET,
+            )
+        ]
+    )
+
+    assert outcome.object_id == intent.object_id
+    assert storage.calls["copy_object"] == 2
+    assert list(storage.buckets[PERMANENT_BUCKET]) == [intent.object_id]
+    assert not core.registration_intent_dao.documents
@@ -0,0 +1,147 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests the batched deletion of staging objects after registration."""
+
+import asyncio
+
+import pytest
+
+from ifrs.core import models
+from ifrs.core.staging_cleanup import StagingCleanup, StagingCleanupConfig
+from tests.fixtures.example_data import EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import STAGING_BUCKET, InMemoryCore
+
+CLEANUP_CONFIG = StagingCleanupConfig(
+    staging_cleanup_enabled=True, staging_cleanup_flush_size=2
+)
+
+
+def stage_files(core: InMemoryCore, count: int) -> list[models.FileRegistrationRequest]:
+    """Place content in the staging bucket and get registration requests for it."""
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    requests = []
+    for index in range(count):
+        storage.put_object(
+            bucket_id=STAGING_BUCKET, object_id=f"object{index}", content=b"content"
+        )
+        requests.append(
+            models.FileRegistrationRequest(
+                file_without_object_id=EXAMPLE_METADATA_BASE.model_copy(
+                    update={"file_id": f"file{index}"}
+                ),
+                staging_object_id=f"object{index}",
+                staging_bucket_id=STAGING_BUCKET,
+            )
+        )
+    return requests
+
+
+@pytest.mark.parametrize("multipart", [False, True])
+@pytest.mark.asyncio
+async def test_staging_objects_deleted_in_batches(multipart: bool):
+    """Test that the staging objects of registered files are deleted in batches if the
+    storage supports it and one by one otherwise.
+    """
+    core = InMemoryCore(multipart=multipart, staging_cleanup_config=CLEANUP_CONFIG)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    requests = stage_files(core, 5)
+    assert core.staging_cleanup
+
+    await core.file_registry.register_file(
+        file_without_object_id=requests[0].file_without_object_id,
+        staging_object_id=requests[0].staging_object_id,
+        staging_bucket_id=requests[0].staging_bucket_id,
+    )
+    await core.file_registry.register_files(requests=requests[1:])
+
+    assert len(storage.buckets[STAGING_BUCKET]) == 5
+    assert len(core.staging_object_dao.documents) == 5
+
+    await core.staging_cleanup.flush()
+
+    assert not storage.buckets[STAGING_BUCKET]
+    assert not core.staging_object_dao.documents
+    assert core.staging_cleanup.queued == 0
+    if multipart:
+        assert storage.calls["delete_objects"] == 3
+    else:
+        assert storage.calls["delete_object"] == 5
+
+
+@pytest.mark.asyncio
+async def test_queue_survives_restart():
+    """Test that queued staging objects are deleted after a restart and that objects
+    that could not be deleted stay queued.
+    """
+    core = InMemoryCore(multipart=True, staging_cleanup_config=CLEANUP_CONFIG)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    await core.file_registry.register_files(requests=stage_files(core, 3))
+
+    restarted = StagingCleanup(
+        config=CLEANUP_CONFIG,
+        staging_object_dao=core.staging_object_dao,  # type: ignore
+        object_storages=core.object_storages,
+    )
+    await restarted.restore()
+    assert restarted.queued == 3
+
+    delete_objects = storage.delete_objects
+
+    async def partially_failing_delete_objects(*, bucket_id, object_ids):
+        await delete_objects(bucket_id=bucket_id, object_ids=object_ids[1:])
+        return object_ids[:1]
+
+    storage.delete_objects = partially_failing_delete_objects  # type: ignore
+    await restarted.flush()
+
+    # the first batch failed partially, so the second batch stays queued as well
+    assert sorted(storage.buckets[STAGING_BUCKET]) == ["object0", "object2"]
+    assert restarted.queued == 2
+    assert len(core.staging_object_dao.documents) == 2
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_early():
+    """Test that a full batch is flushed in the background before the interval."""
+    core = InMemoryCore(multipart=True)
+    storage = core.object_storages.nodes[EXAMPLE_METADATA_BASE.storage_alias]
+    stage_files(core, 3)
+    config = CLEANUP_CONFIG.model_copy(update={"staging_cleanup_flush_interval": 60})
+
+    async with StagingCleanup.construct(
+        config=config,
+        staging_object_dao=core.staging_object_dao,  # type: ignore
+        object_storages=core.object_storages,
+    ) as cleanup:
+        for object_id in ("object0", "object1"):
+            await cleanup.enqueue(
+                storage_alias=EXAMPLE_METADATA_BASE.storage_alias,
+                bucket_id=STAGING_BUCKET,
+                object_id=object_id,
+            )
+        await asyncio.sleep(0.01)
+        assert list(storage.buckets[STAGING_BUCKET]) == ["object2"]
+
+        await cleanup.enqueue(
+            storage_alias=EXAMPLE_METADATA_BASE.storage_alias,
+            bucket_id=STAGING_BUCKET,
+            object_id="object2",
+        )
+        await asyncio.sleep(0.01)
+        assert cleanup.queued == 1
+
+    assert not storage.buckets[STAGING_BUCKET]
+    assert not core.staging_object_dao.documents
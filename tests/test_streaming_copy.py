@@ -0,0 +1,114 @@
+# Copyright 2021 - 2023 Universität Tübingen, DKFZ, EMBL, and Universität zu Köln
+# for the German Human Genome-Phenome Archive (GHGA)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests streaming objects between storage nodes."""
+
+import math
+import os
+
+import pytest
+
+from ifrs.core.file_registry import FileRegistryConfig
+from ifrs.core.multipart_copy import MIN_PART_SIZE
+from ifrs.core.streaming_copy import StreamingCopier, StreamingCopyConfig
+from tests.fixtures.example_data import EXAMPLE_METADATA, EXAMPLE_METADATA_BASE
+from tests.fixtures.in_memory import (
+    EVENT_PUB_CONFIG,
+    OUTBOX_BUCKET,
+    PERMANENT_BUCKET,
+    STAGING_BUCKET,
+    InMemoryCore,
+    InMemoryMultipartObjectStorage,
+)
+
+STREAMING_CONFIG = StreamingCopyConfig(
+    streaming_copy_buffer_size=MIN_PART_SIZE,
+    streaming_copy_buffer_count=2,
+    streaming_copy_concurrency_per_object=4,
+)
+
+
+@pytest.mark.parametrize("size", [0, 3 * MIN_PART_SIZE + 17])
+@pytest.mark.asyncio
+async def test_streaming_copy_uses_bounded_buffers(size: int):
+    """Test that an object is streamed through no more than the pooled buffers."""
+    source = InMemoryMultipartObjectStorage(latency=0.001)
+    dest = InMemoryMultipartObjectStorage(latency=0.001)
+    content = os.urandom(size)
+    source.buckets = {STAGING_BUCKET: {"source": content}}
+    dest.buckets = {PERMANENT_BUCKET: {}}
+    copier = StreamingCopier(config=STREAMING_CONFIG)
+
+    await copier.copy_object(
+        source_storage=source,
+        source_bucket_id=STAGING_BUCKET,
+        source_object_id="source",
+        dest_storage=dest,
+        dest_bucket_id=PERMANENT_BUCKET,
+        dest_object_id="dest",
+    )
+
+    assert dest.buckets[PERMANENT_BUCKET]["dest"] == content
+    assert dest.calls["upload_part"] == max(1, math.ceil(size / MIN_PART_SIZE))
+    assert copier.pool.allocated == min(
+        dest.calls["upload_part"], STREAMING_CONFIG.streaming_copy_buffer_count
+    )
+
+
+@pytest.mark.asyncio
+async def test_register_and_stage_across_nodes():
+    """Test registering a file from a staging bucket and staging it to an outbox that
+    are located on other nodes than the permanent storage.
+    """
+    config = FileRegistryConfig(
+        **STREAMING_CONFIG.model_dump(exclude={"bucket_storage_aliases"}),
+        bucket_storage_aliases={STAGING_BUCKET: "staging", OUTBOX_BUCKET: "outbox"},
+    )
+    core = InMemoryCore(
+        aliases=("test", "staging", "outbox"), multipart=True, config=config
+    )
+    nodes = core.object_storages.nodes
+    content = os.urandom(2 * MIN_PART_SIZE + 1)
+    nodes["staging"].put_object(
+        bucket_id=STAGING_BUCKET, object_id="staging-object", content=content
+    )
+
+    await core.file_registry.register_file(
+        file_without_object_id=EXAMPLE_METADATA_BASE,
+        staging_object_id="staging-object",
+        staging_bucket_id=STAGING_BUCKET,
+    )
+    await core.file_registry.stage_registered_file(
+        file_id=EXAMPLE_METADATA.file_id,
+        decrypted_sha256=EXAMPLE_METADATA.decrypted_sha256,
+        outbox_object_id="outbox-object",
+        outbox_bucket_id=OUTBOX_BUCKET,
+    )
+
+    registered_file = core.dao.documents[EXAMPLE_METADATA.file_id]
+    assert nodes["test"].buckets[PERMANENT_BUCKET] == {
+        registered_file.object_id: content
+    }
+    assert nodes["outbox"].buckets[OUTBOX_BUCKET] == {"outbox-object": content}
+    assert not nodes["test"].buckets[STAGING_BUCKET]
+    assert not nodes["test"].buckets[OUTBOX_BUCKET]
+    assert nodes["test"].calls["copy_object"] == 0
+    # the staged event points to the node hosting the outbox
+    (staged_event,) = (
+        event
+        for event in core.event_store.topics[EVENT_PUB_CONFIG.file_staged_event_topic]
+        if event.type_ == EVENT_PUB_CONFIG.file_staged_event_type
+    )
+    assert staged_event.payload["s3_endpoint_alias"] == "outbox"